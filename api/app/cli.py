@@ -0,0 +1,105 @@
+"""
+Maintenance commands for the API database
+
+Usage:
+    python -m app.cli backfill-rollups [--batch-size N]
+    python -m app.cli advise-indexes
+    python -m app.cli check-rewrites [--offline]
+"""
+import argparse
+import asyncio
+import sys
+from .services.database import db
+from .services.index_advisor import index_advisor
+from .services.rollups import rollup_maintainer
+from .services.sql_rewriter import REWRITE_CORPUS, rewrite_sql
+
+
+async def backfill_rollups(batch_size: int):
+    await db.connect()
+    try:
+        await rollup_maintainer.initialize()
+        total = await rollup_maintainer.backfill(batch_size=batch_size)
+        print(f"Rollups are up to date ({total} momentums folded in)")
+    finally:
+        await db.disconnect()
+
+
+async def advise_indexes():
+    await db.connect()
+    try:
+        await index_advisor.initialize()
+        report = await index_advisor.advise()
+    finally:
+        await db.disconnect()
+
+    print(f"Analyzed {report['statements_analyzed']} statements")
+    if not report["hypopg_installed"]:
+        print("HypoPG is not installed (CREATE EXTENSION hypopg), candidates are ranked by workload runtime only")
+    elif not report["hypothetical"]:
+        print("HypoPG is not available, candidates are ranked by workload runtime only")
+    for recommendation in report["recommendations"]:
+        if report["hypothetical"]:
+            print(
+                f"-- saves ~{recommendation['estimated_time_saved_ms']:.0f} ms of recorded runtime, "
+                f"up to {recommendation['estimated_cost_reduction']:.0%} lower cost, "
+                f"{recommendation['statements']} statements"
+            )
+        else:
+            print(f"-- {recommendation['workload_ms']:.0f} ms of recorded runtime, {recommendation['statements']} statements")
+        print(recommendation["create_statement"] + ";")
+
+
+async def check_rewrites(offline: bool) -> int:
+    failures = 0
+    for original, expected in REWRITE_CORPUS:
+        rewritten, _ = rewrite_sql(original)
+        if rewritten != expected:
+            failures += 1
+            print(f"FAIL rewrite\n  query:    {original}\n  expected: {expected}\n  got:      {rewritten}")
+    if offline:
+        print(f"Checked {len(REWRITE_CORPUS)} rewrites, {failures} failed")
+        return failures
+
+    await db.connect()
+    try:
+        async with db.pool.acquire() as connection:
+            for original, _ in REWRITE_CORPUS:
+                rewritten, _ = rewrite_sql(original)
+                before = sorted(tuple(row) for row in await connection.fetch(original))
+                after = sorted(tuple(row) for row in await connection.fetch(rewritten))
+                if before != after:
+                    failures += 1
+                    print(f"FAIL results\n  query: {original}\n  before: {before}\n  after:  {after}")
+    finally:
+        await db.disconnect()
+    print(f"Checked {len(REWRITE_CORPUS)} rewrites against the database, {failures} failed")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-rollups", help="Fold all indexed history into the rollup tables")
+    backfill.add_argument(
+        "--batch-size", type=int, default=None,
+        help="Momentums folded in per transaction (default: ROLLUP_BATCH_MOMENTUMS)"
+    )
+
+    commands.add_parser("advise-indexes", help="Recommend indexes for the recorded query workload")
+
+    check = commands.add_parser("check-rewrites", help="Verify the SQL rewrites preserve query results")
+    check.add_argument("--offline", action="store_true", help="Only compare rewritten text, without a database")
+
+    args = parser.parse_args()
+    if args.command == "backfill-rollups":
+        asyncio.run(backfill_rollups(args.batch_size))
+    elif args.command == "advise-indexes":
+        asyncio.run(advise_indexes())
+    elif args.command == "check-rewrites":
+        sys.exit(1 if asyncio.run(check_rewrites(args.offline)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -9,6 +10,32 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str
     openai_model: str = "gpt-4-turbo-preview"
+    openai_base_url: Optional[str] = None
+    openai_timeout_seconds: float = 30.0
+    explanation_timeout_seconds: float = 10.0
+    
+    # Completion layer
+    openai_fast_model: Optional[str] = None
+    llm_hedge_enabled: bool = True
+    llm_hedge_quantile: float = 0.9
+    llm_hedge_min_samples: int = 20
+    llm_hedge_initial_delay_seconds: float = 5.0
+    llm_hedge_min_delay_seconds: float = 0.5
+    llm_latency_window: int = 200
+    llm_max_retries: int = 2
+    llm_retry_base_seconds: float = 0.5
+    llm_max_concurrency: int = 32
+    llm_tokens_per_minute: int = 0
+    
+    # Prompt construction
+    schema_retrieval_enabled: bool = True
+    prompt_top_tables: int = 4
+    prompt_top_examples: int = 3
+    
+    # Local question templates
+    templates_enabled: bool = True
+    template_min_confidence: float = 0.8
+    token_registry_ttl_seconds: int = 300
     
     # API Settings
     api_title: str = "NoM Natural Language Query API"
@@ -17,6 +44,110 @@ class Settings(BaseSettings):
     # Security
     query_timeout_seconds: int = 30
     max_query_results: int = 1000
+    stream_max_rows: int = 1000000
+    stream_chunk_size: int = 500
+    
+    # Batch queries
+    batch_max_questions: int = 50
+    batch_llm_concurrency: int = 8
+    batch_query_concurrency: int = 4
+    
+    # Live subscriptions
+    subscription_max: int = 500
+    subscription_poll_seconds: float = 1.0
+    subscription_concurrency: int = 8
+    subscription_queue_size: int = 100
+    subscription_keepalive_seconds: float = 15.0
+    
+    # Query jobs
+    job_concurrency: int = 2
+    job_timeout_seconds: int = 600
+    job_max_rows: int = 1000000
+    job_page_size: int = 1000
+    job_max_queued: int = 100
+    job_max_per_client: int = 5
+    job_result_ttl_seconds: int = 86400
+    job_poll_seconds: float = 1.0
+    job_max_wait_seconds: float = 30.0
+    job_cleanup_seconds: float = 300.0
+    
+    # Hot window of recent account blocks
+    hot_window_enabled: bool = False
+    hot_window_days: int = 30
+    hot_window_memory_mb: int = 512
+    hot_window_poll_seconds: float = 2.0
+    hot_window_batch_momentums: int = 8640
+    hot_window_max_staleness_seconds: float = 30.0
+    
+    # Approximate answers
+    approximate_max_relative_error: float = 0.01
+    approximate_min_rows: int = 1000000
+    approximate_sample_rows: int = 100000
+    approximate_max_sample_percent: float = 10.0
+    
+    # Connection setup
+    interactive_work_mem: str = "16MB"
+    analytical_work_mem: str = "256MB"
+    
+    # Read replicas
+    replica_database_urls: list[str] = []
+    replica_max_lag_momentums: int = 30
+    replica_check_seconds: float = 5.0
+    
+    # Structured lookups
+    lookup_page_size: int = 50
+    lookup_max_page_size: int = 500
+    
+    # Rollup tables
+    rollups_enabled: bool = True
+    rollup_interval_seconds: float = 10.0
+    rollup_batch_momentums: int = 10000
+    rollup_finality_margin: int = 10
+    
+    # Index advisor
+    index_advisor_enabled: bool = True
+    index_advisor_workload_size: int = 500
+    index_advisor_flush_seconds: float = 30.0
+    index_advisor_max_statements: int = 50
+    index_advisor_max_candidates: int = 40
+    index_advisor_min_gain: float = 0.1
+    
+    # Prepared statements
+    parameterize_queries: bool = True
+    prepared_statement_cache_size: int = 256
+    fingerprint_stats_size: int = 1000
+    
+    # Cost-based admission control
+    cost_gate_enabled: bool = True
+    heavy_query_cost: float = 100000.0
+    max_query_cost: float = 10000000.0
+    heavy_query_concurrency: int = 2
+    cost_log_size: int = 500
+    
+    # Query scheduler
+    interactive_query_concurrency: int = 16
+    scheduler_max_queue_depth: int = 100
+    scheduler_max_client_queue: int = 10
+    admin_token: Optional[str] = None
+    
+    # Translation cache
+    translation_cache_enabled: bool = True
+    translation_cache_persistent: bool = True
+    translation_cache_size: int = 1000
+    translation_cache_ttl_seconds: int = 86400
+    
+    # Result cache
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_max_entry_bytes: int = 8 * 1024 * 1024
+    result_cache_height_check_seconds: float = 1.0
+    result_cache_finality_margin: int = 10
+    
+    # Telemetry
+    slow_request_ms: float = 2000.0
+    slow_request_log_size: int = 100
+    slow_request_explain: bool = True
+    slow_request_explain_interval_seconds: float = 60.0
     
     # CORS
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:3001", "http://frontend:3000"]
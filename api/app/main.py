@@ -1,9 +1,18 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from contextlib import asynccontextmanager
 from .config import get_settings
-from .routers import query
+from .routers import query, admin, explorer, jobs
 from .services.database import db
-from .middleware import cors_middleware
+from .services.hot_window import hot_window
+from .services.index_advisor import index_advisor
+from .services.jobs import job_manager
+from .services.rollups import rollup_maintainer
+from .services.schema_retriever import schema_retriever
+from .services.subscriptions import subscription_manager
+from .services.translation_cache import translation_cache
+from .middleware import cors_middleware, timing_middleware
 
 settings = get_settings()
 
@@ -11,9 +20,26 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    schema_retriever.build()
     await db.connect()
+    db.replicas.start(db.get_indexed_height)
+    await translation_cache.initialize()
+    await rollup_maintainer.initialize()
+    rollup_maintainer.start()
+    await index_advisor.initialize()
+    index_advisor.start()
+    subscription_manager.start()
+    hot_window.start()
+    await job_manager.initialize()
+    job_manager.start()
     yield
     # Shutdown
+    await job_manager.stop()
+    await hot_window.stop()
+    await subscription_manager.stop()
+    await index_advisor.stop()
+    await rollup_maintainer.stop()
+    await db.replicas.stop()
     await db.disconnect()
 
 
@@ -26,9 +52,13 @@ app = FastAPI(
 
 # Add custom CORS middleware
 app.middleware("http")(cors_middleware)
+app.middleware("http")(timing_middleware)
 
 # Include routers
 app.include_router(query.router, prefix="/api/v1")
+app.include_router(explorer.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -36,6 +66,12 @@ async def root():
     return {"message": "NoM Natural Language Query API", "version": settings.api_version}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
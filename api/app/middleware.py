@@ -1,5 +1,10 @@
 from fastapi import Request
 from fastapi.responses import Response
+from .config import get_settings
+from .services.database import db
+from .services.telemetry import RequestTimer, slow_requests
+
+settings = get_settings()
 
 async def cors_middleware(request: Request, call_next):
     """Custom CORS middleware to handle all CORS requests"""
@@ -20,4 +25,25 @@ async def cors_middleware(request: Request, call_next):
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "*"
     
+    return response
+
+
+def _route_path(request: Request) -> str:
+    """Route template of the request, so metrics aren't labelled by addresses or hashes"""
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+async def timing_middleware(request: Request, call_next):
+    """Time each request by stage, expose the stages as Server-Timing and log slow requests"""
+    timer = RequestTimer(lambda: _route_path(request))
+    response = await call_next(request)
+    
+    length = response.headers.get("content-length")
+    summary = timer.finish(response.status_code, int(length) if length else None)
+    response.headers["Server-Timing"] = timer.server_timing(summary["total_ms"])
+    response.headers["Timing-Allow-Origin"] = "*"
+    
+    if summary["total_ms"] >= settings.slow_request_ms:
+        slow_requests.capture(summary, timer.queries, db.explain_analyze)
     return response
\ No newline at end of file
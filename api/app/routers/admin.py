@@ -0,0 +1,181 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from ..config import get_settings
+from ..services.admission import admission
+from ..services.approximation import approximator
+from ..services.completions import completions
+from ..services.hot_window import hot_window
+from ..services.index_advisor import index_advisor
+from ..services.jobs import job_manager
+from ..services.database import db, execution_flight
+from ..services.query_fingerprint import fingerprint_stats
+from ..services.query_processor import sql_generation_flight, explanation_flight
+from ..services.query_templates import template_engine
+from ..services.result_cache import result_cache
+from ..services.rollups import rollup_maintainer
+from ..services.scheduler import scheduler
+from ..services.subscriptions import subscription_manager
+from ..services.telemetry import slow_requests
+from ..services.translation_cache import translation_cache
+
+settings = get_settings()
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Only allow requests carrying the configured admin token"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/cache/translations")
+async def get_translation_cache_stats():
+    """
+    Get translation cache hit/miss counters
+    """
+    return translation_cache.get_stats()
+
+
+@router.delete("/cache/translations")
+async def purge_translation_cache():
+    """
+    Remove every cached NL→SQL translation
+    """
+    removed = await translation_cache.purge()
+    return {"removed": removed}
+
+
+@router.get("/cache/results")
+async def get_result_cache_stats():
+    """
+    Get query result cache counters and memory usage
+    """
+    return result_cache.get_stats()
+
+
+@router.delete("/cache/results")
+async def purge_result_cache():
+    """
+    Remove every cached query result
+    """
+    return {"removed": result_cache.clear()}
+
+
+@router.get("/queries/cost")
+async def get_query_cost_calibration():
+    """
+    Get recent planner cost estimates next to measured runtimes
+    """
+    return admission.get_calibration()
+
+
+@router.get("/queries/fingerprints")
+async def get_fingerprint_stats(limit: int = 50):
+    """
+    Get call counts and latency of each parameterized query shape, by total runtime
+    """
+    return fingerprint_stats.get_stats(limit)
+
+
+@router.get("/queries/slow")
+async def get_slow_requests():
+    """
+    Get recent requests slower than slow_request_ms, with stage timings, SQL and EXPLAIN ANALYZE plans
+    """
+    return slow_requests.get_entries()
+
+
+@router.get("/scheduler")
+async def get_scheduler_stats():
+    """
+    Get queue depth, wait time and utilization of each query lane
+    """
+    return scheduler.get_stats()
+
+
+@router.get("/replicas")
+async def get_replica_status():
+    """
+    Get the health and lag of each read replica
+    """
+    return db.replicas.get_stats()
+
+
+@router.get("/subscriptions")
+async def get_subscriptions():
+    """
+    Get the active live query subscriptions and their evaluation counters
+    """
+    return subscription_manager.get_stats()
+
+
+@router.get("/jobs")
+async def get_jobs():
+    """
+    Get query job counters and stored results per status
+    """
+    return await job_manager.get_stats()
+
+
+@router.get("/hot-window")
+async def get_hot_window():
+    """
+    Get the rows, memory use and hit rate of the in-memory hot window
+    """
+    return hot_window.get_stats()
+
+
+@router.get("/approximation")
+async def get_approximation_stats():
+    """
+    Get how many approximate queries were answered by each method or ran exactly
+    """
+    return approximator.get_stats()
+
+
+@router.get("/completions")
+async def get_completion_stats():
+    """
+    Get hedging, retry, escalation and rate limiter counters and recent latency per model
+    """
+    return completions.get_stats()
+
+
+@router.get("/coalescing")
+async def get_coalescing_stats():
+    """
+    Get how many translations and executions were shared between identical requests
+    """
+    return {
+        flight.name: flight.get_stats()
+        for flight in (sql_generation_flight, explanation_flight, execution_flight)
+    }
+
+
+@router.get("/templates")
+async def get_template_stats():
+    """
+    Get how many questions were answered by local templates instead of the language model
+    """
+    return template_engine.get_stats()
+
+
+@router.get("/rollups")
+async def get_rollup_status():
+    """
+    Get the watermark of each rollup table and how far it is behind the indexed tip
+    """
+    return await rollup_maintainer.get_status()
+
+
+@router.get("/indexes")
+async def get_index_advice():
+    """
+    Get CREATE INDEX recommendations for the recorded workload, ranked by estimated gain
+    """
+    return await index_advisor.advise()
@@ -0,0 +1,253 @@
+from fastapi import APIRouter, HTTPException, Path, Query, Request
+from pydantic import BaseModel
+from typing import List, Optional, Literal, Generic, TypeVar
+from ..services.explorer import ExplorerService, InvalidCursor
+from ..services.scheduler import SchedulerBusy
+from .query import _client_id
+
+router = APIRouter(tags=["explorer"])
+
+# Bech32 data characters
+ADDRESS_PATTERN = r"^z1[02-9ac-hj-np-z]{38}$"
+TOKEN_STANDARD_PATTERN = r"^zts1[02-9ac-hj-np-z]{22}$"
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class Account(BaseModel):
+    address: str
+    block_count: Optional[int] = None
+    public_key: Optional[str] = None
+    delegate: str
+    delegation_start_timestamp: int
+
+
+class Balance(BaseModel):
+    token_standard: str
+    symbol: Optional[str] = None
+    decimals: Optional[int] = None
+    balance: int
+
+
+class AccountDetail(Account):
+    balances: List[Balance]
+
+
+class AccountBlock(BaseModel):
+    hash: str
+    momentum_hash: Optional[str] = None
+    momentum_height: int
+    momentum_timestamp: Optional[int] = None
+    block_type: Optional[int] = None
+    height: Optional[int] = None
+    address: Optional[str] = None
+    to_address: Optional[str] = None
+    amount: Optional[int] = None
+    token_standard: Optional[str] = None
+    method: Optional[str] = None
+
+
+class Momentum(BaseModel):
+    height: int
+    hash: Optional[str] = None
+    timestamp: Optional[int] = None
+    tx_count: Optional[int] = None
+    producer: Optional[str] = None
+    producer_owner: Optional[str] = None
+    producer_name: Optional[str] = None
+
+
+class Token(BaseModel):
+    token_standard: str
+    name: Optional[str] = None
+    symbol: Optional[str] = None
+    domain: Optional[str] = None
+    decimals: Optional[int] = None
+    owner: Optional[str] = None
+    total_supply: Optional[int] = None
+    max_supply: Optional[int] = None
+    is_burnable: Optional[bool] = None
+    is_mintable: Optional[bool] = None
+    is_utility: Optional[bool] = None
+    total_burned: int
+    holder_count: int
+    transaction_count: int
+    last_update_timestamp: int
+
+
+class Pillar(BaseModel):
+    owner_address: str
+    producer_address: Optional[str] = None
+    withdraw_address: Optional[str] = None
+    name: Optional[str] = None
+    rank: Optional[int] = None
+    give_momentum_reward_percentage: Optional[int] = None
+    give_delegate_reward_percentage: Optional[int] = None
+    weight: Optional[int] = None
+    voting_activity: float
+    produced_momentum_count: int
+    spawn_timestamp: int
+    is_revoked: bool
+
+
+class Fusion(BaseModel):
+    id: str
+    address: Optional[str] = None
+    beneficiary: Optional[str] = None
+    momentum_hash: Optional[str] = None
+    momentum_height: int
+    momentum_timestamp: Optional[int] = None
+    qsr_amount: Optional[int] = None
+    expiration_height: Optional[int] = None
+    is_active: Optional[bool] = None
+
+
+class Stake(BaseModel):
+    id: str
+    address: Optional[str] = None
+    start_timestamp: int
+    expiration_timestamp: Optional[int] = None
+    znn_amount: Optional[int] = None
+    duration_in_sec: Optional[int] = None
+    is_active: Optional[bool] = None
+
+
+async def _lookup(call):
+    """Run a lookup and map its failures to HTTP errors"""
+    try:
+        return await call
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        print(f"Lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _found(item, what: str):
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"{what} not found")
+    return item
+
+
+@router.get("/accounts/{address}", response_model=AccountDetail)
+async def get_account(http_request: Request, address: str = Path(..., pattern=ADDRESS_PATTERN)):
+    """
+    Get an account and its non-zero balances
+    """
+    client_id = _client_id(http_request)
+    account = _found(await _lookup(ExplorerService.get_account(address, client_id)), "Account")
+    balances = await _lookup(ExplorerService.get_balances(address, client_id))
+    return {**account, "balances": balances}
+
+
+@router.get("/accounts/{address}/balances", response_model=List[Balance])
+async def get_account_balances(http_request: Request, address: str = Path(..., pattern=ADDRESS_PATTERN)):
+    """
+    Get the non-zero token balances of an account
+    """
+    return await _lookup(ExplorerService.get_balances(address, _client_id(http_request)))
+
+
+@router.get("/accounts/{address}/transactions", response_model=Page[AccountBlock])
+async def get_account_transactions(
+    http_request: Request,
+    address: str = Path(..., pattern=ADDRESS_PATTERN),
+    direction: Literal["all", "sent", "received"] = "all",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, gt=0)
+):
+    """
+    Page through an account's blocks, newest first
+
+    Pass next_cursor from a response as cursor to get the next page.
+    """
+    return await _lookup(ExplorerService.get_transactions(
+        address, direction, cursor, limit, _client_id(http_request)
+    ))
+
+
+@router.get("/accounts/{address}/fusions", response_model=Page[Fusion])
+async def get_account_fusions(
+    http_request: Request,
+    address: str = Path(..., pattern=ADDRESS_PATTERN),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, gt=0)
+):
+    """
+    Page through the plasma fusions made by an account, newest first
+    """
+    return await _lookup(ExplorerService.get_fusions(address, cursor, limit, _client_id(http_request)))
+
+
+@router.get("/accounts/{address}/stakes", response_model=Page[Stake])
+async def get_account_stakes(
+    http_request: Request,
+    address: str = Path(..., pattern=ADDRESS_PATTERN),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, gt=0)
+):
+    """
+    Page through the stakes of an account, newest first
+    """
+    return await _lookup(ExplorerService.get_stakes(address, cursor, limit, _client_id(http_request)))
+
+
+@router.get("/momentums", response_model=Page[Momentum])
+async def get_momentums(
+    http_request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, gt=0)
+):
+    """
+    Page through momentums, newest first
+    """
+    return await _lookup(ExplorerService.get_momentums(cursor, limit, _client_id(http_request)))
+
+
+@router.get("/momentums/{height_or_hash}", response_model=Momentum)
+async def get_momentum(
+    http_request: Request,
+    height_or_hash: str = Path(..., pattern=r"^(\d{1,18}|[0-9a-fA-F]{64})$")
+):
+    """
+    Get a momentum by height or hash
+    """
+    momentum = await _lookup(ExplorerService.get_momentum(height_or_hash, _client_id(http_request)))
+    return _found(momentum, "Momentum")
+
+
+@router.get("/tokens/{token_standard}", response_model=Token)
+async def get_token(http_request: Request, token_standard: str = Path(..., pattern=TOKEN_STANDARD_PATTERN)):
+    """
+    Get a token by its token standard
+    """
+    token = await _lookup(ExplorerService.get_token(token_standard, _client_id(http_request)))
+    return _found(token, "Token")
+
+
+@router.get("/pillars", response_model=List[Pillar])
+async def get_pillars(http_request: Request, include_revoked: bool = False):
+    """
+    List pillars by rank
+    """
+    return await _lookup(ExplorerService.get_pillars(include_revoked, _client_id(http_request)))
+
+
+@router.get("/pillars/{owner_address}", response_model=Pillar)
+async def get_pillar(http_request: Request, owner_address: str = Path(..., pattern=ADDRESS_PATTERN)):
+    """
+    Get a pillar by its owner address
+    """
+    pillar = await _lookup(ExplorerService.get_pillar(owner_address, _client_id(http_request)))
+    return _found(pillar, "Pillar")
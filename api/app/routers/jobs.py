@@ -0,0 +1,110 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Path, Query, Request
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+from ..services.jobs import job_manager
+from ..services.result_encoding import encode_json
+from ..services.scheduler import SchedulerBusy
+from .query import _client_id
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+JOB_ID_PATTERN = r"^[0-9a-f]{32}$"
+
+
+class JobRequest(BaseModel):
+    question: str = Field(..., description="Natural language question about the blockchain data")
+
+
+class Job(BaseModel):
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    question: str
+    sql_query: Optional[str] = None
+    explanation: Optional[str] = None
+    error: Optional[str] = None
+    row_count: int
+    truncated: bool
+    pages: int
+    result_bytes: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+def _require_jobs():
+    if not job_manager.enabled:
+        raise HTTPException(status_code=503, detail="Query jobs are unavailable")
+
+
+@router.post("", response_model=Job, status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    """
+    Queue a question to run in the background with the longer job timeout
+    """
+    _require_jobs()
+    try:
+        return await job_manager.submit(request.question, _client_id(http_request))
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN),
+    wait: float = Query(default=0, ge=0, description="Seconds to wait for the job to finish")
+):
+    """
+    Get the status of a job, optionally long-polling until it finishes
+    """
+    _require_jobs()
+    job = await job_manager.wait(job_id, wait) if wait else await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN),
+    page: int = Query(default=0, ge=0)
+):
+    """
+    Get one page of a finished job's results
+    """
+    _require_jobs()
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    rows = await job_manager.get_page(job_id, page) if page < job["pages"] else []
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Job results not found")
+    body = {
+        "id": job_id,
+        "page": page,
+        "pages": job["pages"],
+        "next_page": page + 1 if page + 1 < job["pages"] else None,
+        "row_count": job["row_count"],
+        "truncated": job["truncated"],
+        "results": rows
+    }
+    return Response(encode_json(body), media_type="application/json")
+
+
+@router.delete("/{job_id}", status_code=204)
+async def delete_job(job_id: str = Path(..., pattern=JOB_ID_PATTERN)):
+    """
+    Cancel a job if it is still running and delete it with its results
+    """
+    _require_jobs()
+    if not await job_manager.delete(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Response(status_code=204)
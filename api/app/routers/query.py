@@ -1,8 +1,29 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import csv
+import io
+import json
+from contextlib import nullcontext
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import AsyncContextManager, Awaitable, List, Dict, Any, Optional, Literal, Tuple
+from ..config import get_settings
+from ..services.approximation import approximator
 from ..services.database import db
+from ..services.hot_window import hot_window
 from ..services.query_processor import QueryProcessor
+from ..services.result_encoding import (
+    FORMAT_ARROW, FORMAT_COLUMNAR, ARROW_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE,
+    arrow_available, negotiate_format, encode_arrow, encode_columnar
+)
+from ..services.scheduler import SchedulerBusy
+from ..services.sql_rewriter import hoist_limit
+from ..services.subscriptions import Subscription, subscription_manager
+from ..services.telemetry import handler_done, observe_rows, span
+from ..services.translation_cache import normalize_question, translation_cache
+
+settings = get_settings()
 
 router = APIRouter(tags=["query"])
 
@@ -10,6 +31,25 @@ router = APIRouter(tags=["query"])
 class QueryRequest(BaseModel):
     question: str = Field(..., description="Natural language question about the blockchain data")
     include_sql: bool = Field(default=True, description="Include generated SQL in response")
+    llm_explanation: bool = Field(
+        default=False,
+        description="Explain newly generated SQL with the language model instead of locally"
+    )
+    format: Optional[Literal["rows", "columnar", "arrow"]] = Field(
+        default=None,
+        description="Result encoding; defaults to the Accept header, then rows"
+    )
+    approximate: bool = Field(
+        default=False,
+        description="Allow eligible counts and aggregates to be estimated, with an error bound"
+    )
+
+
+class Approximation(BaseModel):
+    method: Literal["planner_statistics", "tablesample", "hyperloglog"]
+    confidence: Optional[float] = None
+    sample_percent: Optional[float] = None
+    bounds: Dict[str, List[Any]]
 
 
 class QueryResponse(BaseModel):
@@ -18,20 +58,70 @@ class QueryResponse(BaseModel):
     explanation: str
     results: List[Dict[str, Any]]
     row_count: int
+    truncated: bool = False
+    rewrites: List[str] = []
+    approximation: Optional[Approximation] = None
     error: Optional[str] = None
 
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, description="Natural language questions about the blockchain data")
+    include_sql: bool = Field(default=True, description="Include generated SQL in each result")
+
+
+class StreamQueryRequest(BaseModel):
+    question: str = Field(..., description="Natural language question about the blockchain data")
+    format: Literal["ndjson", "csv"] = Field(default="ndjson", description="Output format of the stream")
+    max_rows: Optional[int] = Field(default=None, gt=0, description="Maximum number of rows to stream")
+
+
+def _client_id(http_request: Request) -> str:
+    """Identify the caller for fair queuing: explicit header first, then peer address"""
+    client_id = http_request.headers.get("x-client-id")
+    if client_id:
+        return client_id[:64]
+    return http_request.client.host if http_request.client else "unknown"
+
+
 @router.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
+async def process_query(request: QueryRequest, http_request: Request):
     """
     Process a natural language query and return results from the database
     """
+    client_id = _client_id(http_request)
+    result_format = negotiate_format(request.format, http_request.headers.get("accept"))
+    if result_format == FORMAT_ARROW and not arrow_available():
+        raise HTTPException(status_code=406, detail="Arrow responses require pyarrow on the server")
+    
     try:
-        # Convert natural language to SQL
-        sql_query, explanation = await QueryProcessor.natural_language_to_sql(request.question)
+        answer = await _answer(
+            request.question,
+            client_id,
+            llm_explanation=request.llm_explanation,
+            approximate=request.approximate
+        )
+        sql_query, explanation, results = answer["sql_query"], answer["explanation"], answer["results"]
+        truncated, rewrites = answer["truncated"], answer["rewrites"]
+        
+        observe_rows("query", len(results))
+        # Encoding the results from here on is timed as serialization
+        handler_done()
         
-        # Execute the query
-        results = await db.execute_query(sql_query)
+        if result_format in (FORMAT_COLUMNAR, FORMAT_ARROW):
+            # Large result sets skip per-row validation and generic JSON encoding
+            payload = {
+                "question": request.question,
+                "sql_query": sql_query if request.include_sql else None,
+                "explanation": explanation,
+                "row_count": len(results),
+                "truncated": truncated,
+                "rewrites": rewrites,
+                "approximation": answer["approximation"],
+                "error": None
+            }
+            if result_format == FORMAT_ARROW:
+                return Response(encode_arrow(payload, results), media_type=ARROW_MEDIA_TYPE)
+            return Response(encode_columnar(payload, results), media_type=COLUMNAR_MEDIA_TYPE)
         
         # Prepare response
         response = QueryResponse(
@@ -39,11 +129,29 @@ async def process_query(request: QueryRequest):
             sql_query=sql_query if request.include_sql else None,
             explanation=explanation,
             results=results,
-            row_count=len(results)
+            row_count=len(results),
+            truncated=truncated,
+            rewrites=rewrites,
+            approximation=answer["approximation"]
         )
         
         return response
         
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except asyncio.TimeoutError:
+        return QueryResponse(
+            question=request.question,
+            sql_query=None,
+            explanation="Failed to process query",
+            results=[],
+            row_count=0,
+            error="Query timeout exceeded"
+        )
     except ValueError as e:
         # Return error response for query issues
         return QueryResponse(
@@ -60,6 +168,317 @@ async def process_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+async def _answer(
+    question: str,
+    client_id: str,
+    llm_explanation: bool = False,
+    llm_slots: AsyncContextManager = nullcontext(),
+    db_slots: AsyncContextManager = nullcontext(),
+    approximate: bool = False
+) -> Dict[str, Any]:
+    """
+    Translate a question to SQL and run it
+    
+    Args:
+        question: Natural language question from user
+        client_id: Caller for fair queuing
+        llm_explanation: Explain newly generated SQL with the language model
+        llm_slots: Held while the language model generates SQL
+        db_slots: Held while the query executes
+        approximate: Estimate eligible aggregates instead of computing them exactly
+        
+    Returns:
+        Dict with sql_query, explanation, results, truncated, rewrites and
+        approximation (None for exact results)
+    """
+    translation = await QueryProcessor.translate(question, llm_explanation, llm_slots)
+    generated_sql, executed_sql = translation["generated_sql"], translation["executed_sql"]
+    explanation, rewrites = translation["explanation"], translation["rewrites"]
+    execution = _execute(translation, client_id, db_slots, approximate)
+    
+    if explanation is None:
+        # Explain the query while it executes
+        explanation, (results, truncated, approximation) = await _explain_and_execute(
+            question, generated_sql, execution
+        )
+    else:
+        results, truncated, approximation = await execution
+    if generated_sql is not None:
+        # The cache keeps the SQL as generated, so its literals can still be re-slotted
+        await translation_cache.put(question, generated_sql, explanation)
+    
+    if hoist_limit(executed_sql, settings.max_query_results) is not None:
+        rewrites = rewrites + ["row cap applied as LIMIT on the ORDER BY query"]
+    
+    return {
+        "sql_query": translation["sql_query"],
+        "explanation": explanation,
+        "results": results,
+        "truncated": truncated,
+        "rewrites": rewrites,
+        "approximation": approximation
+    }
+
+
+async def _execute(
+    translation: Dict[str, Any],
+    client_id: str,
+    db_slots: AsyncContextManager,
+    approximate: bool
+) -> Tuple[List[Dict[str, Any]], bool, Optional[Dict[str, Any]]]:
+    """
+    Answer a translated query from the hot window, an estimate or the database
+    
+    Returns:
+        Tuple of (results, truncated, approximation details or None)
+    """
+    executed_sql = translation["executed_sql"]
+    approximation = None
+    with span("hot_window"):
+        answered = hot_window.answer(translation["template"])
+    if answered is None and approximate:
+        with span("approximation"):
+            async with db_slots:
+                estimated = await asyncio.wait_for(
+                    approximator.answer(executed_sql, translation["params"], client_id=client_id),
+                    timeout=settings.query_timeout_seconds
+                )
+        if estimated is not None:
+            answered, approximation = (estimated[0], False), estimated[1]
+    if answered is not None:
+        results, truncated = answered
+    else:
+        async with db_slots:
+            results, truncated = await asyncio.wait_for(
+                db.execute_query(executed_sql, translation["params"], client_id=client_id),
+                timeout=settings.query_timeout_seconds
+            )
+    return results, truncated, approximation
+
+
+async def _explain_and_execute(question: str, sql_query: str, execution: Awaitable[Any]):
+    """Run the explanation completion concurrently with query execution"""
+    explanation_task = asyncio.create_task(
+        QueryProcessor.generate_explanation(question, sql_query)
+    )
+    try:
+        result = await execution
+    except BaseException:
+        # Don't keep paying for an explanation nobody will read
+        explanation_task.cancel()
+        raise
+    
+    explanation = await explanation_task
+    return explanation, result
+
+
+@router.post("/query/stream")
+async def stream_query(request: StreamQueryRequest, http_request: Request):
+    """
+    Process a natural language query and stream every result row as NDJSON or CSV
+    """
+    if request.max_rows and request.max_rows > settings.stream_max_rows:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_rows cannot exceed {settings.stream_max_rows}"
+        )
+    
+    # The cursor is opened before the response starts, so a failing query still gets a 400
+    try:
+        translation = await QueryProcessor.translate(request.question)
+        stream = await db.stream_query(
+            translation["executed_sql"],
+            translation["params"],
+            max_rows=request.max_rows,
+            client_id=_client_id(http_request)
+        )
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Closing again after the response also releases a stream the client never read
+    if request.format == "csv":
+        body, media_type = _encode_csv(stream), "text/csv"
+    else:
+        body, media_type = _encode_ndjson(stream), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, background=BackgroundTask(stream.close))
+
+
+async def _encode_ndjson(stream):
+    async for chunk in stream.chunks():
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
+
+
+async def _encode_csv(stream):
+    buffer = io.StringIO()
+    # The header comes from the statement's columns, so an empty result still has one
+    writer = csv.DictWriter(buffer, fieldnames=stream.columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    async for chunk in stream.chunks():
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+@router.post("/query/batch")
+async def process_batch(request: BatchQueryRequest, http_request: Request):
+    """
+    Answer many natural language queries, streaming each result as NDJSON as soon as it is ready
+    """
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch cannot have more than {settings.batch_max_questions} questions"
+        )
+    
+    items = _answer_batch(request.questions, request.include_sql, _client_id(http_request))
+    return StreamingResponse(items, media_type="application/x-ndjson")
+
+
+async def _answer_batch(questions: List[str], include_sql: bool, client_id: str):
+    """
+    Answer a batch of questions concurrently and yield one NDJSON line per question as it completes
+    
+    Identical questions (after normalization) are answered once. Each question
+    is translated and executed on its own, so a query can run while other
+    questions are still being translated, and a failure only affects its own
+    line. Completions and executions are capped per batch.
+    """
+    positions: Dict[Any, List[int]] = {}
+    for index, question in enumerate(questions):
+        template, slots = normalize_question(question)
+        positions.setdefault((template, tuple(slots)), []).append(index)
+    
+    llm_slots = asyncio.Semaphore(settings.batch_llm_concurrency)
+    db_slots = asyncio.Semaphore(settings.batch_query_concurrency)
+    
+    async def answer_one(indexes: List[int]):
+        item: Dict[str, Any] = {
+            "sql_query": None,
+            "explanation": "Failed to process query",
+            "results": [],
+            "row_count": 0,
+            "truncated": False,
+            "rewrites": [],
+            "approximation": None,
+            "error": None
+        }
+        try:
+            answer = await _answer(questions[indexes[0]], client_id, llm_slots=llm_slots, db_slots=db_slots)
+            observe_rows("batch", len(answer["results"]))
+            item.update(answer, row_count=len(answer["results"]))
+            if not include_sql:
+                item["sql_query"] = None
+        except SchedulerBusy as e:
+            item["error"] = str(e)
+        except asyncio.TimeoutError:
+            item["error"] = "Query timeout exceeded"
+        except ValueError as e:
+            item["error"] = str(e)
+        except Exception as e:
+            # Log the error and report a generic message for this question only
+            print(f"Batch query processing error: {str(e)}")
+            item["error"] = "Internal server error"
+        return indexes, item
+    
+    tasks = [asyncio.create_task(answer_one(indexes)) for indexes in positions.values()]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            indexes, item = await completed
+            yield "".join(
+                json.dumps({"index": index, "question": questions[index], **item}, default=str) + "\n"
+                for index in indexes
+            )
+    finally:
+        # The client went away; stop translating and querying for it
+        for task in tasks:
+            task.cancel()
+
+
+@router.get("/query/subscribe")
+async def subscribe_query(question: str, http_request: Request):
+    """
+    Answer a natural language query, then push its new results as server-sent events whenever momentums are indexed
+    """
+    if subscription_manager.full:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many active subscriptions",
+            headers={"Retry-After": str(int(settings.subscription_keepalive_seconds))}
+        )
+    
+    try:
+        translation = await QueryProcessor.translate(question)
+        subscription, results, truncated = await subscription_manager.subscribe(
+            translation["executed_sql"], translation["params"], client_id=_client_id(http_request)
+        )
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if translation["generated_sql"] is not None:
+        await translation_cache.put(question, translation["generated_sql"], translation["explanation"])
+    
+    snapshot = {
+        "event": "snapshot",
+        "question": question,
+        "sql_query": translation["sql_query"],
+        "explanation": translation["explanation"],
+        "mode": subscription.mode,
+        "height": subscription.height,
+        "results": results,
+        "row_count": len(results),
+        "truncated": truncated
+    }
+    return StreamingResponse(
+        _subscription_events(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _subscription_events(subscription: Subscription, snapshot: Dict[str, Any]):
+    """Send the first result, then every pushed change, until the client disconnects"""
+    try:
+        yield _encode_event(snapshot)
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.events.get(),
+                    timeout=settings.subscription_keepalive_seconds
+                )
+            except asyncio.TimeoutError:
+                # Keep proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield _encode_event(event)
+            if event["event"] == "error":
+                return
+    finally:
+        subscription_manager.unsubscribe(subscription)
+
+
+def _encode_event(event: Dict[str, Any]) -> str:
+    data = {key: value for key, value in event.items() if key != "event"}
+    message = f"event: {event['event']}\n"
+    if "height" in event:
+        message += f"id: {event['height']}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
 @router.get("/schema")
 async def get_schema_info():
     """
@@ -0,0 +1,115 @@
+import re
+import time
+from collections import deque
+from typing import Dict, Any, List
+from ..config import get_settings
+from .scheduler import LANE_INTERACTIVE, LANE_ANALYTICAL
+
+settings = get_settings()
+
+# Tables large enough that scanning them is an analytical workload
+LARGE_TABLES = ["accountblocks", "rewardtransactions", "votes", "momentums", "balances"]
+
+
+def plan_estimates(plan: Any) -> Dict[str, float]:
+    """
+    Extract the planner's estimates from EXPLAIN (FORMAT JSON) output
+
+    Args:
+        plan: Parsed EXPLAIN output (a one-element list holding the plan)
+
+    Returns:
+        Dictionary with total_cost and plan_rows of the top plan node
+    """
+    root = plan[0]["Plan"]
+    return {
+        "total_cost": float(root.get("Total Cost", 0.0)),
+        "plan_rows": float(root.get("Plan Rows", 0.0))
+    }
+
+
+class AdmissionController:
+    """
+    Cost-based admission control for generated SQL
+
+    Queries are classified from their planner estimates: cheap ones go to the
+    interactive lane, expensive ones to the low-concurrency analytical lane,
+    and anything above max_query_cost is rejected before it reaches the pool.
+    """
+
+    def __init__(self):
+        self._log: deque = deque(maxlen=settings.cost_log_size)
+        self.stats = {
+            LANE_INTERACTIVE: 0,
+            LANE_ANALYTICAL: 0,
+            "rejected": 0
+        }
+
+    def classify(self, estimates: Dict[str, float]) -> str:
+        """
+        Pick a lane for a query or reject it
+
+        Args:
+            estimates: Output of plan_estimates
+
+        Returns:
+            LANE_INTERACTIVE or LANE_ANALYTICAL
+
+        Raises:
+            ValueError: If the estimated cost exceeds max_query_cost
+        """
+        cost = estimates["total_cost"]
+        if cost > settings.max_query_cost:
+            self.stats["rejected"] += 1
+            raise ValueError(
+                f"Query is too expensive to run (estimated cost {cost:,.0f}, "
+                f"~{estimates['plan_rows']:,.0f} rows). Try narrowing it down, for example "
+                "with a shorter time range, a specific address or token, or a LIMIT."
+            )
+        lane = LANE_ANALYTICAL if cost > settings.heavy_query_cost else LANE_INTERACTIVE
+        self.stats[lane] += 1
+        return lane
+
+    def classify_shape(self, query: str) -> str:
+        """
+        Pick a lane from the shape of a query when no plan is available
+
+        Aggregations and unfiltered reads over the large chain tables are
+        treated as analytical, everything else as interactive.
+        """
+        lowered = query.lower()
+        touches_large = any(re.search(rf'\b{table}\b', lowered) for table in LARGE_TABLES)
+        aggregates = re.search(r'\b(group\s+by|count|sum|avg|min|max|distinct)\b', lowered)
+        filtered = re.search(r'\bwhere\b', lowered)
+        lane = LANE_ANALYTICAL if touches_large and (aggregates or not filtered) else LANE_INTERACTIVE
+        self.stats[lane] += 1
+        return lane
+
+    def record(self, query: str, estimates: Dict[str, float], lane: str, elapsed_ms: float, row_count: int):
+        """Store planner estimates next to the measured runtime for threshold calibration"""
+        self._log.append({
+            "timestamp": time.time(),
+            "sql_query": query,
+            "lane": lane,
+            "estimated_cost": estimates["total_cost"],
+            "estimated_rows": estimates["plan_rows"],
+            "elapsed_ms": round(elapsed_ms, 3),
+            "row_count": row_count
+        })
+
+    def get_calibration(self) -> Dict[str, Any]:
+        """Return recent cost/runtime samples and lane counters"""
+        samples: List[Dict[str, Any]] = list(self._log)
+        return {
+            "thresholds": {
+                "heavy_query_cost": settings.heavy_query_cost,
+                "max_query_cost": settings.max_query_cost,
+                "heavy_query_concurrency": settings.heavy_query_concurrency
+            },
+            "counters": dict(self.stats),
+            "samples": samples
+        }
+
+
+# Global admission controller instance
+admission = AdmissionController()
@@ -0,0 +1,392 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import get_settings
+from .database import db
+from .sql_rewriter import COLUMN_TYPES
+
+settings = get_settings()
+
+METHOD_STATISTICS = "planner_statistics"
+METHOD_TABLESAMPLE = "tablesample"
+METHOD_HYPERLOGLOG = "hyperloglog"
+
+# Two-sided 95% confidence
+CONFIDENCE = 0.95
+Z_SCORE = 1.96
+
+# Registers of each HyperLogLog sketch, as a power of two; the standard error is 1.04 / sqrt(2^16)
+HLL_LOG2M = 16
+HLL_RELATIVE_ERROR = Z_SCORE * 1.04 / math.sqrt(2 ** HLL_LOG2M)
+
+# Fewer matching rows in a sample than this give no usable variance estimate
+MIN_SAMPLE_ROWS = 100
+
+_SHAPE = re.compile(
+    r"^select\s+(?P<select>.+?)\s+from\s+(?P<table>[a-z_]\w*)(?:\s+(?:as\s+)?(?P<alias>(?!where\b|limit\b)[a-z_]\w*))?"
+    r"(?:\s+where\s+(?P<where>.+?))?(?:\s+limit\s+\d+)?$",
+    re.IGNORECASE | re.DOTALL
+)
+_NOT_ELIGIBLE = re.compile(
+    r"\b(join|group\s+by|having|order\s+by|over|filter|union|intersect|except|with|offset|fetch|"
+    r"min|max|array_agg|string_agg|json_agg|jsonb_agg|bool_and|bool_or|every|stddev|stddev_pop|stddev_samp|"
+    r"variance|var_pop|var_samp|percentile_cont|percentile_disc|mode)\b"
+)
+_AGGREGATE = re.compile(r"\b(count|sum|avg)\s*\(", re.IGNORECASE)
+_CALL = re.compile(r"^\s*([a-z_]\w*)\s*\(", re.IGNORECASE)
+_CASTS = re.compile(r"(?:::\s*\w+(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?\s*)+")
+_ALIAS = re.compile(r"^(?P<expression>.*?[\w)'\"])\s+(?:as\s+)?(?P<alias>\"[^\"]+\"|[a-z_]\w*)$", re.IGNORECASE | re.DOTALL)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a select list on the commas outside parentheses and strings"""
+    items, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(text[start:index].strip())
+            start = index + 1
+    items.append(text[start:].strip())
+    return items
+
+
+def _closing_paren(text: str, start: int) -> int:
+    """Index of the parenthesis closing the one at start"""
+    depth = 0
+    for index in range(start, len(text)):
+        if text[index] == "(":
+            depth += 1
+        elif text[index] == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced parentheses")
+
+
+class Aggregate:
+    """One COUNT, SUM or AVG in the select list and the column it ends up in"""
+
+    def __init__(self, item: str):
+        self.name = None
+        expression = item
+        alias = _ALIAS.match(item)
+        if alias and not re.search(r"[-+*/%^:(,]\s*$", alias.group("expression")):
+            expression, self.name = alias.group("expression"), alias.group("alias").strip('"')
+
+        found = list(_AGGREGATE.finditer(expression))
+        if len(found) != 1:
+            raise ValueError("Each column needs exactly one COUNT, SUM or AVG")
+        self.function = found[0].group(1).lower()
+        self.start = found[0].start()
+        self.end = _closing_paren(expression, found[0].end() - 1) + 1
+        self.argument = expression[found[0].end():self.end - 1].strip()
+        self.distinct = False
+        if self.argument.lower().startswith("distinct "):
+            if self.function != "count":
+                raise ValueError("Only COUNT(DISTINCT ...) is supported")
+            self.distinct = True
+            self.argument = self.argument[len("distinct "):].strip()
+        self.expression = expression
+        if self.name is None:
+            # The column name Postgres would pick: the outermost function, else ?column?
+            self.name = "?column?"
+            call = _CALL.match(expression)
+            if call:
+                rest = expression[_closing_paren(expression, call.end() - 1) + 1:].strip()
+                if not rest or _CASTS.fullmatch(rest):
+                    self.name = call.group(1).lower()
+
+    @property
+    def star(self) -> bool:
+        return self.function == "count" and self.argument == "*"
+
+    def substitute(self, literal: str) -> str:
+        """The column expression with the aggregate replaced by a value"""
+        return f"{self.expression[:self.start]}{literal}{self.expression[self.end:]}"
+
+
+class AggregateQuery:
+    """A single-table aggregate query that can be estimated instead of run exactly"""
+
+    def __init__(self, sql: str):
+        query = sql.strip().rstrip(';').strip()
+        lowered = query.lower()
+        if len(re.findall(r"\bselect\b", lowered)) != 1 or _NOT_ELIGIBLE.search(lowered):
+            raise ValueError("Not a single-table aggregate")
+        shape = _SHAPE.match(query)
+        if shape is None or shape.group("table").lower() not in COLUMN_TYPES:
+            raise ValueError("Not a single-table aggregate")
+        self.table = shape.group("table").lower()
+        self.alias = shape.group("alias")
+        self.where = shape.group("where")
+        self.aggregates = [Aggregate(item) for item in _split_top_level(shape.group("select"))]
+
+    def source(self, sample: str = "") -> str:
+        alias = f" {self.alias}" if self.alias else ""
+        where = f"\nWHERE {self.where}" if self.where else ""
+        return f"FROM {self.table}{alias}{sample}{where}"
+
+
+class Approximator:
+    """
+    Answer counts and aggregates approximately when the caller allows it
+
+    Only single-table queries whose columns each wrap one COUNT, SUM or AVG
+    are eligible. An unfiltered COUNT(*) is read from the table statistics;
+    other counts, sums and averages are estimated from a TABLESAMPLE SYSTEM
+    block sample, with a 95% confidence interval from the per-block totals;
+    COUNT(DISTINCT ...) uses HyperLogLog sketches when the hll extension is
+    installed. An estimate whose error bound is wider than
+    approximate_max_relative_error is not used: the sample is enlarged once,
+    up to approximate_max_sample_percent, and after that the query runs
+    exactly. So do ineligible queries and tables under approximate_min_rows.
+    """
+
+    def __init__(self):
+        self._hll: Optional[bool] = None
+        self.stats = {METHOD_STATISTICS: 0, METHOD_TABLESAMPLE: 0, METHOD_HYPERLOGLOG: 0, "exact": 0, "resamples": 0}
+
+    async def answer(
+        self,
+        sql: str,
+        params: Optional[List[Any]] = None,
+        client_id: str = "internal"
+    ) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """
+        Estimate the result of an aggregate query
+
+        Args:
+            sql: Validated SELECT query
+            params: Query parameters for parameterized queries
+            client_id: Client the query runs for, used for fair queuing
+
+        Returns:
+            Tuple of (the single result row, approximation details with the
+            method, confidence and each column's bounds), or None to run the
+            query exactly
+        """
+        try:
+            query = AggregateQuery(sql)
+        except ValueError:
+            self.stats["exact"] += 1
+            return None
+
+        try:
+            table = await self._table_stats(query.table)
+            if table is None or table["reltuples"] < settings.approximate_min_rows:
+                estimated = None
+            else:
+                estimated = await self._estimate_query(query, params, client_id, table)
+            if estimated is not None:
+                method, estimates, details = estimated
+                row, bounds = await self._evaluate(query, estimates)
+        except (ValueError, RuntimeError) as e:
+            # Running the query exactly is always an answer, even when the catalog lookups fail
+            print(f"Approximation failed, running exactly: {str(e)}")
+            estimated = None
+        if estimated is None:
+            self.stats["exact"] += 1
+            return None
+
+        self.stats[method] += 1
+        return [row], {"method": method, "bounds": bounds, **details}
+
+    async def _estimate_query(
+        self,
+        query: AggregateQuery,
+        params: Optional[List[Any]],
+        client_id: str,
+        table: Dict[str, Any]
+    ):
+        """Pick the estimation method for a query, or None if none is accurate enough"""
+        if query.where is None and all(aggregate.star for aggregate in query.aggregates):
+            estimated = self._from_statistics(query, table)
+            if estimated is not None:
+                return estimated
+        if all(aggregate.distinct for aggregate in query.aggregates):
+            if HLL_RELATIVE_ERROR <= settings.approximate_max_relative_error and await self._hll_available():
+                return await self._from_sketches(query, params, client_id)
+            return None
+        if any(aggregate.distinct for aggregate in query.aggregates):
+            return None
+        return await self._from_sample(query, params, client_id, table["reltuples"])
+
+    async def _table_stats(self, table: str) -> Optional[Dict[str, Any]]:
+        rows = await db.fetch_lookup(
+            """
+            SELECT c.reltuples::bigint AS reltuples,
+                   s.n_live_tup,
+                   s.n_mod_since_analyze,
+                   COALESCE(s.last_analyze, s.last_autoanalyze) IS NOT NULL AS analyzed
+            FROM pg_class c
+            JOIN pg_stat_user_tables s ON s.relid = c.oid
+            WHERE c.oid = to_regclass($1)
+            """,
+            [table]
+        )
+        return rows[0] if rows and rows[0]["analyzed"] else None
+
+    async def _hll_available(self) -> bool:
+        if self._hll is None:
+            rows = await db.fetch_lookup("SELECT 1 FROM pg_extension WHERE extname = $1", ["hll"])
+            self._hll = bool(rows)
+        return self._hll
+
+    @staticmethod
+    def _from_statistics(query: AggregateQuery, table: Dict[str, Any]):
+        """
+        Row count from the statistics collector
+
+        The live row count is kept up to date by every insert and delete; the
+        rows changed since the last ANALYZE bound how far it can be off.
+        """
+        estimate = table["n_live_tup"]
+        error = table["n_mod_since_analyze"]
+        if not estimate or error / estimate > settings.approximate_max_relative_error:
+            return None
+        interval = (estimate, max(estimate - error, 0), estimate + error)
+        return METHOD_STATISTICS, [interval] * len(query.aggregates), {"confidence": None}
+
+    async def _from_sketches(self, query: AggregateQuery, params: Optional[List[Any]], client_id: str):
+        """Distinct counts from HyperLogLog sketches built in one pass"""
+        columns = ",\n       ".join(
+            f"hll_cardinality(hll_add_agg(hll_hash_any({aggregate.argument}), {HLL_LOG2M})) AS a{i}"
+            for i, aggregate in enumerate(query.aggregates)
+        )
+        rows, _ = await db.execute_query(f"SELECT {columns}\n{query.source()}", params, client_id=client_id)
+        estimates = []
+        for i in range(len(query.aggregates)):
+            estimate = round(rows[0][f"a{i}"] or 0)
+            error = estimate * HLL_RELATIVE_ERROR
+            estimates.append((estimate, max(round(estimate - error), 0), round(estimate + error)))
+        return METHOD_HYPERLOGLOG, estimates, {"confidence": CONFIDENCE}
+
+    async def _from_sample(
+        self,
+        query: AggregateQuery,
+        params: Optional[List[Any]],
+        client_id: str,
+        table_rows: int
+    ):
+        """
+        Counts, sums and averages from a block sample
+
+        TABLESAMPLE SYSTEM keeps each block with probability q, so a total is
+        estimated by the sampled total / q, with variance (1 - q) / q^2 times
+        the sum of the squared per-block totals. Averages are ratios of two
+        such totals, with the variance of the linearized ratio.
+        """
+        percent = min(settings.approximate_sample_rows / table_rows * 100, settings.approximate_max_sample_percent)
+        for attempt in range(2):
+            totals = await self._sample(query, params, client_id, percent)
+            estimates = self._estimate(query, totals, percent / 100)
+            worst = max(self._relative_error(interval) for interval in estimates)
+            if worst <= settings.approximate_max_relative_error:
+                return METHOD_TABLESAMPLE, estimates, {"confidence": CONFIDENCE, "sample_percent": round(percent, 4)}
+            # The interval narrows with the square root of the sample size
+            needed = percent * (worst / settings.approximate_max_relative_error) ** 2 * 1.2
+            if attempt or needed > settings.approximate_max_sample_percent or math.isinf(needed):
+                return None
+            self.stats["resamples"] += 1
+            percent = needed
+        return None
+
+    async def _sample(
+        self,
+        query: AggregateQuery,
+        params: Optional[List[Any]],
+        client_id: str,
+        percent: float
+    ) -> Dict[str, float]:
+        """Sum the per-block counts and sums of a sample, and their squares and products"""
+        params = list(params or [])
+        params.append(percent)
+        inner = ["COUNT(*) AS n"]
+        outer = ["SUM(n) AS n", "SUM(n * n) AS nn"]
+        for i, aggregate in enumerate(query.aggregates):
+            if aggregate.star:
+                continue
+            inner.append(f"COUNT({aggregate.argument}) AS c{i}")
+            outer += [f"SUM(c{i}) AS c{i}", f"SUM(c{i} * c{i}) AS c{i}c{i}"]
+            if aggregate.function != "count":
+                inner.append(f"SUM({aggregate.argument}) AS s{i}")
+                outer += [f"SUM(s{i}) AS s{i}", f"SUM(s{i} * s{i}) AS s{i}s{i}", f"SUM(s{i} * c{i}) AS s{i}c{i}"]
+        sample = f" TABLESAMPLE SYSTEM (${len(params)})"
+        sql = (
+            f"SELECT {', '.join(outer)}\n"
+            f"FROM (\nSELECT (ctid::text::point)[0] AS block, {', '.join(inner)}\n"
+            f"{query.source(sample)}\nGROUP BY 1\n) AS blocks"
+        )
+        rows, _ = await db.execute_query(sql, params, client_id=client_id)
+        return {key: float(value or 0) for key, value in rows[0].items()}
+
+    @staticmethod
+    def _estimate(query: AggregateQuery, totals: Dict[str, float], q: float) -> List[Tuple[float, float, float]]:
+        """Estimate and 95% confidence interval of every aggregate"""
+        scale = (1 - q) / (q * q)
+        estimates = []
+        for i, aggregate in enumerate(query.aggregates):
+            count, squares = (totals["n"], totals["nn"]) if aggregate.star else (totals[f"c{i}"], totals[f"c{i}c{i}"])
+            if totals["n"] < MIN_SAMPLE_ROWS:
+                estimate, variance = 0.0, math.inf
+            elif aggregate.function == "count":
+                estimate, variance = count / q, scale * squares
+            elif aggregate.function == "sum":
+                estimate, variance = totals[f"s{i}"] / q, scale * totals[f"s{i}s{i}"]
+            else:
+                ratio = totals[f"s{i}"] / count if count else 0.0
+                residuals = totals[f"s{i}s{i}"] - 2 * ratio * totals[f"s{i}c{i}"] + ratio * ratio * squares
+                estimate = ratio
+                variance = scale * max(residuals, 0.0) / (count / q) ** 2 if count else math.inf
+            error = Z_SCORE * math.sqrt(variance)
+            if aggregate.function == "count":
+                estimates.append((round(estimate), max(round(estimate - error), 0), round(estimate + error)))
+            else:
+                estimates.append((estimate, estimate - error, estimate + error))
+        return estimates
+
+    @staticmethod
+    def _relative_error(interval: Tuple[float, float, float]) -> float:
+        estimate, lower, upper = interval
+        if not estimate or math.isinf(upper):
+            return math.inf
+        return (upper - lower) / 2 / abs(estimate)
+
+    @staticmethod
+    async def _evaluate(
+        query: AggregateQuery,
+        estimates: List[Tuple[float, float, float]]
+    ) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+        """
+        Compute each column from its aggregate's estimate and bounds
+
+        The column expressions (scaling, rounding, casts) are left to Postgres,
+        evaluated once at the estimate and once at each end of its interval.
+        """
+        columns = []
+        for i, (aggregate, interval) in enumerate(zip(query.aggregates, estimates)):
+            kind = "bigint" if aggregate.function == "count" else "numeric"
+            for suffix, value in zip(("", "_lower", "_upper"), interval):
+                columns.append(f"{aggregate.substitute(f'({value!r}::{kind})')} AS a{i}{suffix}")
+        rows = await db.fetch_lookup(f"SELECT {', '.join(columns)}", [])
+        row, bounds = {}, {}
+        for i, aggregate in enumerate(query.aggregates):
+            ends = [rows[0][f"a{i}_lower"], rows[0][f"a{i}_upper"]]
+            row[aggregate.name] = rows[0][f"a{i}"]
+            # A decreasing expression swaps the ends
+            bounds[aggregate.name] = ends if ends[0] is None or ends[1] is None else sorted(ends)
+        return row, bounds
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "hll_available": self._hll}
+
+
+# Global approximator instance
+approximator = Approximator()
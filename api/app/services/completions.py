@@ -0,0 +1,266 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import openai
+from ..config import get_settings
+from .schema_retriever import estimate_tokens
+from .telemetry import observe_llm
+
+settings = get_settings()
+
+# Failures worth sending the same request again for
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Limit the language model tokens spent per minute
+
+    Each request reserves its estimated prompt and completion tokens before
+    it is sent and settles the difference once the actual usage is known.
+    Waiters are served in arrival order. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.rate = tokens_per_minute / 60
+        self.capacity = float(tokens_per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int):
+        if not self.rate:
+            return
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def settle(self, reserved: int, used: int):
+        """Return unused tokens to the bucket, or take the overrun out of it"""
+        if not self.rate:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(reserved, self.capacity) - used)
+
+
+class LatencyTracker:
+    """Recent completion latencies per model, for choosing when to hedge"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float):
+        self._samples.setdefault(model, deque(maxlen=self.size)).append(seconds)
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        samples = self._samples.get(model)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self, model: str) -> float:
+        """
+        How long to wait for a completion before sending a duplicate
+
+        The llm_hedge_quantile of the model's recent latencies, so only the
+        slowest few percent of requests get hedged. Until there are enough
+        samples a fixed delay is used.
+        """
+        samples = self._samples.get(model)
+        if not samples or len(samples) < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_initial_delay_seconds
+        return max(self.quantile(model, settings.llm_hedge_quantile), settings.llm_hedge_min_delay_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            model: {
+                "samples": len(samples),
+                "p50": self.quantile(model, 0.5),
+                "p90": self.quantile(model, 0.9),
+                "p99": self.quantile(model, 0.99),
+                "hedge_delay": self.hedge_delay(model)
+            }
+            for model, samples in self._samples.items()
+        }
+
+
+class CompletionClient:
+    """
+    Chat completions with hedging, retries and rate limiting
+
+    A request that is still running after the model's hedge delay gets a
+    duplicate, and whichever returns a valid answer first wins; the other is
+    cancelled. Hedges are only sent while a concurrency slot is free, so they
+    never queue behind real requests. Connection errors, timeouts, rate
+    limits and server errors are retried with exponential backoff and full
+    jitter. At most llm_max_concurrency completions run at once and the
+    token rate is capped at llm_tokens_per_minute.
+    """
+
+    def __init__(self):
+        # Retries are done here, with hedging in mind, rather than in the SDK
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout_seconds,
+            max_retries=0
+        )
+        self.latency = LatencyTracker(settings.llm_latency_window)
+        self.tokens = TokenBucket(settings.llm_tokens_per_minute)
+        self._slots = asyncio.Semaphore(settings.llm_max_concurrency)
+        self.in_flight = 0
+        self.stats = {
+            "requests": 0,
+            "attempts": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "retries": 0,
+            "invalid": 0,
+            "failures": 0,
+            "escalations": 0
+        }
+
+    async def complete(
+        self,
+        purpose: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+        validate: Optional[Callable[[str], str]] = None
+    ) -> Tuple[str, Any]:
+        """
+        Get a completion, hedging and retrying within a time budget
+
+        Args:
+            purpose: What the completion is for, used to label metrics
+            model: Model to ask
+            messages: Chat messages
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            timeout: Seconds for the whole call, retries included
+            validate: Turns the raw answer into the result, raising ValueError
+                if it is unusable; an invalid answer loses to its hedge
+
+        Returns:
+            Tuple of (validated answer, token usage)
+
+        Raises:
+            asyncio.TimeoutError: If no answer arrived within timeout
+            ValueError: If the answer failed validation
+        """
+        self.stats["requests"] += 1
+        try:
+            return await asyncio.wait_for(
+                self._complete(purpose, model, messages, max_tokens, temperature, validate),
+                timeout=timeout
+            )
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+
+    async def _complete(self, purpose, model, messages, max_tokens, temperature, validate) -> Tuple[str, Any]:
+        for attempt in range(settings.llm_max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(random.uniform(0, settings.llm_retry_base_seconds * 2 ** (attempt - 1)))
+            try:
+                return await self._hedged(purpose, model, messages, max_tokens, temperature, validate)
+            except RETRYABLE_ERRORS as e:
+                if attempt == settings.llm_max_retries:
+                    raise
+                print(f"Completion failed ({type(e).__name__}), retrying: {str(e)}")
+
+    async def _hedged(self, purpose, model, messages, max_tokens, temperature, validate) -> Tuple[str, Any]:
+        request = (purpose, model, messages, max_tokens, temperature, validate)
+        first = asyncio.create_task(self._attempt(*request))
+        tasks = [first]
+        try:
+            if settings.llm_hedge_enabled:
+                await asyncio.wait(tasks, timeout=self.latency.hedge_delay(model))
+                if not first.done() and not self._slots.locked():
+                    self.stats["hedged"] += 1
+                    tasks.append(asyncio.create_task(self._attempt(*request, hedge=True)))
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, purpose, model, messages, max_tokens, temperature, validate, hedge=False) -> Tuple[str, Any]:
+        reserved = estimate_tokens("".join(message["content"] for message in messages)) + max_tokens
+        await self.tokens.acquire(reserved)
+        async with self._slots:
+            self.stats["attempts"] += 1
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            except asyncio.CancelledError:
+                # A cancelled original request would have taken at least this long; dropping it
+                # would leave only the fast completions and pull the hedge delay down. A cancelled
+                # hedge started late, so its elapsed time says nothing about the model's latency
+                if not hedge:
+                    self.latency.record(model, time.perf_counter() - started)
+                raise
+            finally:
+                self.in_flight -= 1
+            elapsed = time.perf_counter() - started
+        self.latency.record(model, elapsed)
+        self.tokens.settle(reserved, response.usage.total_tokens if response.usage else reserved)
+        observe_llm(purpose, elapsed, response.usage)
+
+        content = response.choices[0].message.content.strip()
+        if validate is not None:
+            try:
+                content = validate(content)
+            except ValueError:
+                self.stats["invalid"] += 1
+                raise
+        return content, response.usage
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "tokens_available": round(self.tokens.tokens) if self.tokens.rate else None,
+            "models": self.latency.get_stats()
+        }
+
+
+# Global completion client instance
+completions = CompletionClient()
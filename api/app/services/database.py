@@ -1,36 +1,278 @@
 import asyncpg
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 import asyncio
+import json
+import time
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
 from ..config import get_settings
+from .admission import admission, plan_estimates
+from .query_fingerprint import fingerprint_stats, parameterize_sql
+from .replicas import ReplicaSet
+from .result_cache import result_cache, normalize_sql
+from .scheduler import scheduler, LANE_INTERACTIVE, LANE_ANALYTICAL
+from .single_flight import SingleFlight
+from .sql_rewriter import hoist_limit
+from .telemetry import observe_query, observe_stage, span
+from .workload import workload
 
 settings = get_settings()
 
+# Identical SQL executed concurrently shares one database round-trip
+execution_flight = SingleFlight("execution")
+
+
+# Read pool for long-running query jobs
+JOB_POOL = "jobs"
+
+# Client that slow-request EXPLAIN ANALYZE runs are queued as
+TELEMETRY_CLIENT = "telemetry"
+
+# Failures of the connection rather than of the query
+_CONNECTION_ERRORS = (OSError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+
+def _dsn_name(dsn: str) -> str:
+    """Host and port of a DSN, without its credentials"""
+    parts = urlsplit(dsn)
+    return f"{parts.hostname}:{parts.port or 5432}"
+
+
+class QueryStream:
+    """
+    Results of a query read chunk by chunk from an open server-side cursor
+    
+    Holds its connection, transaction and scheduler slot until the chunks
+    are exhausted or close() is called.
+    """
+    
+    def __init__(
+        self,
+        resources: AsyncExitStack,
+        cursor: asyncpg.cursor.Cursor,
+        columns: List[str],
+        first_chunk: List[asyncpg.Record],
+        chunk_size: int,
+        timeout_seconds: int
+    ):
+        self.columns = columns
+        self._resources = resources
+        self._cursor = cursor
+        self._first_chunk = first_chunk
+        self._chunk_size = chunk_size
+        self._timeout_seconds = timeout_seconds
+    
+    async def chunks(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the rows as lists of dictionaries, at most chunk_size rows each
+        
+        The stream is closed when the rows run out or the iteration stops.
+        """
+        try:
+            rows = self._first_chunk
+            self._first_chunk = None
+            while rows:
+                yield [dict(row) for row in rows]
+                if len(rows) < self._chunk_size:
+                    break
+                rows = await self._cursor.fetch(self._chunk_size, timeout=self._timeout_seconds)
+        finally:
+            await self.close()
+    
+    async def close(self) -> None:
+        """Release the connection and the scheduler slot; safe to call more than once"""
+        await self._resources.aclose()
+
 
 class DatabaseService:
     def __init__(self):
+        # Read-write pool for the API's own tables and maintenance
         self.pool: Optional[asyncpg.Pool] = None
+        # Read-only pools for user queries, one per scheduler lane and one for query jobs
+        self._read_pools: Dict[str, asyncpg.Pool] = {}
+        self.replicas = ReplicaSet()
+        self._height: Optional[int] = None
+        self._height_checked_at = 0.0
+        self._height_lock = asyncio.Lock()
     
     async def connect(self):
-        """Create connection pool"""
+        """Create connection pools"""
         self.pool = await asyncpg.create_pool(
             settings.database_url,
-            min_size=10,
-            max_size=20,
-            command_timeout=settings.query_timeout_seconds
+            min_size=2,
+            max_size=10,
+            command_timeout=settings.query_timeout_seconds,
+            statement_cache_size=settings.prepared_statement_cache_size
         )
+        self._read_pools = {
+            LANE_INTERACTIVE: await self._create_read_pool(
+                settings.database_url, LANE_INTERACTIVE, settings.interactive_query_concurrency
+            ),
+            LANE_ANALYTICAL: await self._create_read_pool(
+                settings.database_url, LANE_ANALYTICAL, settings.heavy_query_concurrency
+            ),
+            # Query jobs get connections of their own so long reports never hold the lanes' connections
+            JOB_POOL: await self._create_read_pool(
+                settings.database_url, JOB_POOL, settings.job_concurrency,
+                min_size=0, timeout_seconds=settings.job_timeout_seconds
+            ),
+        }
+        for dsn in settings.replica_database_urls:
+            # Replicas connect lazily so one that is down doesn't stop the API from starting
+            pool = await self._create_read_pool(dsn, LANE_ANALYTICAL, settings.heavy_query_concurrency, min_size=0)
+            self.replicas.add(_dsn_name(dsn), pool)
     
     async def disconnect(self):
-        """Close connection pool"""
+        """Close connection pools"""
+        await self.replicas.close()
+        for pool in self._read_pools.values():
+            await pool.close()
+        self._read_pools = {}
         if self.pool:
             await self.pool.close()
     
-    async def execute_query(self, query: str, params: List[Any] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    async def _create_read_pool(
+        dsn: str,
+        lane: str,
+        max_size: int,
+        min_size: int = 1,
+        timeout_seconds: Optional[int] = None
+    ) -> asyncpg.Pool:
+        """
+        Create a read-only pool whose connections are set up once for a lane
+        
+        Session parameters are set when a connection is opened rather than
+        on every acquire: the statement timeout, read-only transactions, the
+        lane's work_mem, and no JIT compilation for short interactive queries.
+        """
+        work_mem = settings.interactive_work_mem if lane == LANE_INTERACTIVE else settings.analytical_work_mem
+        session = [
+            f"SET statement_timeout = {(timeout_seconds or settings.query_timeout_seconds) * 1000}",
+            "SET default_transaction_read_only = on",
+            f"SET work_mem = '{work_mem}'",
+        ]
+        if lane == LANE_INTERACTIVE:
+            session.append("SET jit = off")
+        
+        async def init(connection: asyncpg.Connection):
+            await connection.execute("; ".join(session))
+        
+        return await asyncpg.create_pool(
+            dsn,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            command_timeout=timeout_seconds or settings.query_timeout_seconds,
+            # Prepared statements are cached per connection by query text, least recently used first out
+            statement_cache_size=settings.prepared_statement_cache_size,
+            init=init
+        )
+    
+    async def execute_query(
+        self,
+        query: str,
+        params: List[Any] = None,
+        client_id: str = "internal"
+    ) -> Tuple[List[Dict[str, Any]], bool]:
         """
         Execute a SELECT query and return results
         
+        The row cap is enforced by the database: the query is wrapped with a
+        LIMIT of max_query_results + 1 so truncation can be detected without
+        fetching the full result.
+        
         Args:
             query: SQL query to execute
             params: Query parameters for parameterized queries
+            client_id: Client the query runs for, used for fair queuing
+            
+        Returns:
+            Tuple of (list of dictionaries containing query results, truncated)
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        
+        self._check_query(query)
+        
+        # Concurrent callers with the same SQL share one execution
+        results, truncated = await execution_flight.do(
+            normalize_sql(query, params),
+            lambda: self._execute_query(query, params, client_id)
+        )
+        return list(results), truncated
+    
+    async def _execute_query(
+        self,
+        query: str,
+        params: List[Any],
+        client_id: str
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        cache_key = None
+        height = None
+        if settings.result_cache_enabled:
+            with span("result_cache"):
+                height = await self.get_indexed_height()
+                cache_key = normalize_sql(query, params)
+                cached = result_cache.get(cache_key, height)
+            if cached is not None:
+                return cached
+        
+        # Queries differing only in their literals share one prepared statement and plan
+        statement, statement_params = self._parameterize(query, params)
+        
+        limit = settings.max_query_results
+        limited_query = self._limit_query(statement, limit + 1)
+        
+        # Ask the planner what the query will cost before letting it near the pool
+        estimates = None
+        if settings.cost_gate_enabled:
+            with span("cost_gate"):
+                estimates = await self.explain_query(limited_query, statement_params)
+            lane = admission.classify(estimates)
+        else:
+            lane = admission.classify_shape(query)
+        
+        queued = time.perf_counter()
+        async with scheduler.slot(lane, client_id):
+            observe_stage("queue_wait", time.perf_counter() - queued)
+            started = time.perf_counter()
+            rows, replica_height = await self._fetch(limited_query, statement_params, lane)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        fingerprint_stats.record(statement, elapsed_ms)
+        if replica_height is not None:
+            # The result is only as fresh as the replica that produced it
+            height = replica_height
+        
+        # Convert to list of dicts
+        truncated = len(rows) > limit
+        results = [dict(row) for row in rows[:limit]]
+        
+        if estimates is not None:
+            admission.record(query, estimates, lane, elapsed_ms, len(results))
+        workload.record(query, params, elapsed_ms)
+        
+        if cache_key is not None:
+            result_cache.put(cache_key, query, height, (results, truncated))
+        
+        return results, truncated
+    
+    async def fetch_lookup(
+        self,
+        query: str,
+        params: List[Any],
+        client_id: str = "internal"
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a fixed, index-backed lookup in the interactive lane
+        
+        Lookups skip the cost gate and the row cap: their SQL is written by
+        hand and bounded by its own LIMIT. The query text is constant, so
+        asyncpg reuses its prepared statement on every pooled connection.
+        
+        Args:
+            query: Parameterized SQL query
+            params: Query parameters
+            client_id: Client the query runs for, used for fair queuing
             
         Returns:
             List of dictionaries containing query results
@@ -38,6 +280,177 @@ class DatabaseService:
         if not self.pool:
             raise RuntimeError("Database not connected")
         
+        queued = time.perf_counter()
+        async with scheduler.slot(LANE_INTERACTIVE, client_id):
+            observe_stage("queue_wait", time.perf_counter() - queued)
+            started = time.perf_counter()
+            rows, _ = await self._fetch(query, params)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        workload.record(query, params, elapsed_ms)
+        fingerprint_stats.record(query, elapsed_ms)
+        return [dict(row) for row in rows]
+    
+    async def explain_query(self, query: str, params: List[Any] = None) -> Dict[str, float]:
+        """
+        Get the planner's cost and row estimates for a query without running it
+        
+        Args:
+            query: SQL query to explain
+            params: Query parameters for parameterized queries
+            
+        Returns:
+            Dictionary with total_cost and plan_rows
+        """
+        # Planning is cheap and read-only, so it shares the interactive lane's connections
+        async with self._read_pools[LANE_INTERACTIVE].acquire() as connection:
+            try:
+                plan = await connection.fetchval(
+                    f"EXPLAIN (FORMAT JSON) {query}", *params if params else []
+                )
+            except Exception as e:
+                raise ValueError(f"Query execution error: {str(e)}")
+        
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan_estimates(plan)
+    
+    async def explain_analyze(self, query: str, params: List[Any] = None) -> str:
+        """
+        Run a query under EXPLAIN ANALYZE in the analytical lane
+        
+        The query really runs, so it waits for an analytical slot like any
+        other heavy query.
+        
+        Returns:
+            The plan with actual row counts and timings, as text
+            
+        Raises:
+            SchedulerBusy: If the analytical lane is full
+        """
+        async with scheduler.slot(LANE_ANALYTICAL, TELEMETRY_CLIENT):
+            async with self._read_pools[LANE_ANALYTICAL].acquire() as connection:
+                rows = await connection.fetch(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) {query}", *params if params else []
+                )
+        return "\n".join(row[0] for row in rows)
+    
+    async def _fetch(
+        self,
+        query: str,
+        params: List[Any] = None,
+        lane: str = LANE_INTERACTIVE
+    ) -> Tuple[List[asyncpg.Record], Optional[int]]:
+        """
+        Run a read query on the lane's pool
+        
+        Analytical queries go to a healthy replica when there is one, and
+        fall back to the primary if the replica's connection fails.
+        
+        Returns:
+            Tuple of (rows, height of the replica that answered or None for the primary)
+        """
+        replica = self.replicas.pick() if lane == LANE_ANALYTICAL else None
+        if replica is not None:
+            try:
+                return await self._run(replica.pool, query, params, lane), replica.height
+            except _CONNECTION_ERRORS as e:
+                print(f"Replica {replica.name} failed, using the primary: {str(e)}")
+                replica.mark_down(e)
+        
+        try:
+            return await self._run(self._read_pools[lane], query, params, lane), None
+        except _CONNECTION_ERRORS as e:
+            raise ValueError(f"Query execution error: {str(e)}")
+    
+    @staticmethod
+    async def _run(pool: asyncpg.Pool, query: str, params: Optional[List[Any]], lane: str) -> List[asyncpg.Record]:
+        acquiring = time.perf_counter()
+        async with pool.acquire() as connection:
+            started = time.perf_counter()
+            try:
+                rows = await connection.fetch(query, *params if params else [])
+                observe_query(lane, query, params, started - acquiring, time.perf_counter() - started)
+                return rows
+            except asyncio.TimeoutError:
+                raise ValueError("Query timeout exceeded")
+            except _CONNECTION_ERRORS:
+                raise
+            except Exception as e:
+                raise ValueError(f"Query execution error: {str(e)}")
+    
+    async def stream_query(
+        self,
+        query: str,
+        params: List[Any] = None,
+        max_rows: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        timeout_seconds: Optional[int] = None,
+        pool_name: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> "QueryStream":
+        """
+        Open a server-side cursor over a SELECT query and fetch its first chunk
+        
+        The query is validated, prepared and started before this returns, so
+        errors surface here rather than part-way through a response. The
+        cursor runs inside a read-only transaction and only one chunk of rows
+        is held in memory at a time.
+        
+        Args:
+            query: SQL query to execute
+            params: Query parameters for parameterized queries
+            max_rows: Maximum number of rows to stream (defaults to stream_max_rows)
+            chunk_size: Rows per chunk (defaults to stream_chunk_size)
+            timeout_seconds: Statement timeout (defaults to query_timeout_seconds)
+            pool_name: Read pool to run on, such as JOB_POOL (defaults to the analytical pool)
+            client_id: Client the stream runs for; when given, the stream holds
+                a slot in the analytical lane until it is closed
+            
+        Returns:
+            The open stream, which must be closed once it is no longer read
+            
+        Raises:
+            SchedulerBusy: If the analytical lane is full
+            ValueError: If the query is rejected, fails or times out
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        
+        self._check_query(query)
+        
+        max_rows = max_rows or settings.stream_max_rows
+        chunk_size = chunk_size or settings.stream_chunk_size
+        timeout_seconds = timeout_seconds or settings.query_timeout_seconds
+        statement, params = self._parameterize(query, params)
+        limited_query = self._limit_query(statement, max_rows)
+        pool = self._read_pools[pool_name or LANE_ANALYTICAL]
+        
+        resources = AsyncExitStack()
+        try:
+            if client_id is not None:
+                await resources.enter_async_context(scheduler.slot(LANE_ANALYTICAL, client_id))
+            connection = await resources.enter_async_context(pool.acquire())
+            await resources.enter_async_context(connection.transaction(readonly=True))
+            await connection.execute(
+                f"SET LOCAL statement_timeout = {timeout_seconds * 1000}"
+            )
+            prepared = await connection.prepare(limited_query, timeout=timeout_seconds)
+            cursor = await prepared.cursor(*params if params else [], timeout=timeout_seconds)
+            first_chunk = await cursor.fetch(chunk_size, timeout=timeout_seconds)
+        except BaseException as e:
+            await resources.aclose()
+            if isinstance(e, asyncio.TimeoutError):
+                raise ValueError("Query timeout exceeded")
+            if isinstance(e, asyncpg.PostgresError):
+                raise ValueError(f"Query execution error: {str(e)}")
+            raise
+        
+        columns = [attribute.name for attribute in prepared.get_attributes()]
+        return QueryStream(resources, cursor, columns, first_chunk, chunk_size, timeout_seconds)
+    
+    @staticmethod
+    def _check_query(query: str) -> None:
+        """Reject anything that is not a plain SELECT"""
         # Basic SQL injection prevention - only allow SELECT queries
         normalized_query = query.strip().upper()
         if not normalized_query.startswith("SELECT"):
@@ -48,25 +461,49 @@ class DatabaseService:
         for keyword in dangerous_keywords:
             if keyword in normalized_query:
                 raise ValueError(f"Query contains forbidden keyword: {keyword}")
+    
+    @staticmethod
+    def _parameterize(query: str, params: Optional[List[Any]]) -> Tuple[str, Optional[List[Any]]]:
+        """Lift the literals of a query without bind parameters into parameters"""
+        if params or not settings.parameterize_queries:
+            return query, params
+        return parameterize_sql(query)
+    
+    @staticmethod
+    def _limit_query(query: str, limit: int) -> str:
+        """
+        Cap a query so the database stops producing rows after limit
+
+        A sorted query without a LIMIT of its own gets the cap appended
+        directly, so the planner can use a top-N sort or stop an ordered
+        index scan early; anything else is wrapped.
+        """
+        hoisted = hoist_limit(query, limit)
+        if hoisted is not None:
+            return hoisted
+        inner = query.strip().rstrip(';').strip()
+        return f"SELECT * FROM (\n{inner}\n) AS limited_query LIMIT {int(limit)}"
+    
+    async def get_indexed_height(self) -> int:
+        """
+        Return the latest indexed momentum height
+        
+        The value is re-read at most once per result_cache_height_check_seconds
+        and shared by all concurrent callers.
+        """
+        if time.monotonic() - self._height_checked_at < settings.result_cache_height_check_seconds:
+            return self._height
         
-        async with self.pool.acquire() as connection:
-            # Set statement timeout
-            await connection.execute(f"SET statement_timeout = {settings.query_timeout_seconds * 1000}")
+        async with self._height_lock:
+            # Another caller may have refreshed it while we waited
+            if time.monotonic() - self._height_checked_at < settings.result_cache_height_check_seconds:
+                return self._height
             
-            try:
-                # Execute query
-                rows = await connection.fetch(query, *params if params else [])
-                
-                # Convert to list of dicts
-                results = []
-                for row in rows[:settings.max_query_results]:  # Limit results
-                    results.append(dict(row))
-                
-                return results
-            except asyncio.TimeoutError:
-                raise ValueError("Query timeout exceeded")
-            except Exception as e:
-                raise ValueError(f"Query execution error: {str(e)}")
+            async with self.pool.acquire() as connection:
+                height = await connection.fetchval("SELECT MAX(height) FROM momentums")
+            self._height = height or 0
+            self._height_checked_at = time.monotonic()
+            return self._height
     
     async def test_connection(self) -> bool:
         """Test database connection"""
@@ -0,0 +1,337 @@
+import base64
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from ..config import get_settings
+from .database import db
+
+settings = get_settings()
+
+# Keyset start for the first page: sorts after every real (height, key) pair
+_FIRST_PAGE = (2 ** 63 - 1, "")
+
+_BLOCK_COLUMNS = """hash,
+       momentumhash AS momentum_hash,
+       momentumheight AS momentum_height,
+       momentumtimestamp AS momentum_timestamp,
+       blocktype AS block_type,
+       height,
+       address,
+       toaddress AS to_address,
+       amount,
+       tokenstandard AS token_standard,
+       method"""
+
+_MOMENTUM_COLUMNS = """height,
+       hash,
+       timestamp,
+       txcount AS tx_count,
+       producer,
+       producerowner AS producer_owner,
+       producername AS producer_name"""
+
+_PILLAR_COLUMNS = """owneraddress AS owner_address,
+       produceraddress AS producer_address,
+       withdrawaddress AS withdraw_address,
+       name,
+       rank,
+       givemomentumrewardpercentage AS give_momentum_reward_percentage,
+       givedelegaterewardpercentage AS give_delegate_reward_percentage,
+       weight,
+       votingactivity AS voting_activity,
+       producedmomentumcount AS produced_momentum_count,
+       spawntimestamp AS spawn_timestamp,
+       isrevoked AS is_revoked"""
+
+ACCOUNT_SQL = """
+SELECT address,
+       blockcount AS block_count,
+       publickey AS public_key,
+       delegate,
+       delegationstarttimestamp AS delegation_start_timestamp
+FROM accounts
+WHERE address = $1"""
+
+BALANCES_SQL = """
+SELECT b.tokenstandard AS token_standard,
+       t.symbol,
+       t.decimals,
+       b.balance
+FROM balances b
+LEFT JOIN tokens t ON t.tokenstandard = b.tokenstandard
+WHERE b.address = $1
+  AND b.balance > 0
+ORDER BY b.tokenstandard"""
+
+# Each direction is served by its own (address, momentumheight, hash) index
+SENT_TRANSACTIONS_SQL = f"""
+SELECT {_BLOCK_COLUMNS}
+FROM accountblocks
+WHERE address = $1
+  AND (momentumheight, hash) < ($2, $3)
+ORDER BY momentumheight DESC, hash DESC
+LIMIT $4"""
+
+RECEIVED_TRANSACTIONS_SQL = f"""
+SELECT {_BLOCK_COLUMNS}
+FROM accountblocks
+WHERE toaddress = $1
+  AND (momentumheight, hash) < ($2, $3)
+ORDER BY momentumheight DESC, hash DESC
+LIMIT $4"""
+
+# OR across two columns can't use either index, so merge two index scans instead
+ALL_TRANSACTIONS_SQL = f"""
+SELECT * FROM (
+    (SELECT {_BLOCK_COLUMNS}
+     FROM accountblocks
+     WHERE address = $1
+       AND (momentumheight, hash) < ($2, $3)
+     ORDER BY momentumheight DESC, hash DESC
+     LIMIT $4)
+    UNION ALL
+    (SELECT {_BLOCK_COLUMNS}
+     FROM accountblocks
+     WHERE toaddress = $1
+       AND address <> $1
+       AND (momentumheight, hash) < ($2, $3)
+     ORDER BY momentumheight DESC, hash DESC
+     LIMIT $4)
+) blocks
+ORDER BY momentum_height DESC, hash DESC
+LIMIT $4"""
+
+TRANSACTIONS_SQL = {
+    "sent": SENT_TRANSACTIONS_SQL,
+    "received": RECEIVED_TRANSACTIONS_SQL,
+    "all": ALL_TRANSACTIONS_SQL,
+}
+
+FUSIONS_SQL = """
+SELECT id,
+       address,
+       beneficiary,
+       momentumhash AS momentum_hash,
+       momentumheight AS momentum_height,
+       momentumtimestamp AS momentum_timestamp,
+       qsramount AS qsr_amount,
+       expirationheight AS expiration_height,
+       isactive AS is_active
+FROM fusions
+WHERE address = $1
+  AND (momentumheight, id) < ($2, $3)
+ORDER BY momentumheight DESC, id DESC
+LIMIT $4"""
+
+STAKES_SQL = """
+SELECT id,
+       address,
+       starttimestamp AS start_timestamp,
+       expirationtimestamp AS expiration_timestamp,
+       znnamount AS znn_amount,
+       durationinsec AS duration_in_sec,
+       isactive AS is_active
+FROM stakes
+WHERE address = $1
+  AND (starttimestamp, id) < ($2, $3)
+ORDER BY starttimestamp DESC, id DESC
+LIMIT $4"""
+
+MOMENTUM_BY_HEIGHT_SQL = f"""
+SELECT {_MOMENTUM_COLUMNS}
+FROM momentums
+WHERE height = $1"""
+
+MOMENTUM_BY_HASH_SQL = f"""
+SELECT {_MOMENTUM_COLUMNS}
+FROM momentums
+WHERE hash = $1"""
+
+MOMENTUMS_SQL = f"""
+SELECT {_MOMENTUM_COLUMNS}
+FROM momentums
+WHERE height < $1
+ORDER BY height DESC
+LIMIT $2"""
+
+TOKEN_SQL = """
+SELECT tokenstandard AS token_standard,
+       name,
+       symbol,
+       domain,
+       decimals,
+       owner,
+       totalsupply AS total_supply,
+       maxsupply AS max_supply,
+       isburnable AS is_burnable,
+       ismintable AS is_mintable,
+       isutility AS is_utility,
+       totalburned AS total_burned,
+       holdercount AS holder_count,
+       transactioncount AS transaction_count,
+       lastupdatetimestamp AS last_update_timestamp
+FROM tokens
+WHERE tokenstandard = $1"""
+
+PILLARS_SQL = f"""
+SELECT {_PILLAR_COLUMNS}
+FROM pillars
+WHERE $1 OR NOT isrevoked
+ORDER BY rank"""
+
+PILLAR_SQL = f"""
+SELECT {_PILLAR_COLUMNS}
+FROM pillars
+WHERE owneraddress = $1"""
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that was not produced by encode_cursor"""
+
+
+def encode_cursor(values: Tuple[Any, ...]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Tuple[type, ...]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor from a previous page, or None for the first page
+        types: Expected type of each sort key value
+
+    Returns:
+        The keyset position to continue after
+    """
+    if not cursor:
+        return _FIRST_PAGE
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(isinstance(value, kind) for value, kind in zip(values, types))
+    ):
+        raise InvalidCursor("Invalid cursor")
+    return tuple(values)
+
+
+def page_size(limit: Optional[int]) -> int:
+    return min(limit or settings.lookup_page_size, settings.lookup_max_page_size)
+
+
+async def _page(
+    query: str,
+    key: Tuple[str, str],
+    params: List[Any],
+    cursor: Optional[str],
+    limit: Optional[int],
+    client_id: str
+) -> Dict[str, Any]:
+    """Fetch one keyset page; one extra row tells whether there is a next page"""
+    size = page_size(limit)
+    position = decode_cursor(cursor, (int, str))
+    rows = await db.fetch_lookup(query, [*params, *position, size + 1], client_id=client_id)
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor((rows[-1][key[0]], rows[-1][key[1]]))
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+class ExplorerService:
+    """Fixed lookups over the indexed tables for explorers and bots"""
+
+    @staticmethod
+    async def get_account(address: str, client_id: str = "internal") -> Optional[Dict[str, Any]]:
+        rows = await db.fetch_lookup(ACCOUNT_SQL, [address], client_id=client_id)
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def get_balances(address: str, client_id: str = "internal") -> List[Dict[str, Any]]:
+        return await db.fetch_lookup(BALANCES_SQL, [address], client_id=client_id)
+
+    @staticmethod
+    async def get_transactions(
+        address: str,
+        direction: str = "all",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        client_id: str = "internal"
+    ) -> Dict[str, Any]:
+        """
+        Page through an account's blocks, newest first
+
+        Args:
+            address: Account address
+            direction: sent, received or all
+            cursor: next_cursor of the previous page
+            limit: Page size
+
+        Returns:
+            Dictionary with items and next_cursor (None on the last page)
+        """
+        return await _page(
+            TRANSACTIONS_SQL[direction], ("momentum_height", "hash"), [address], cursor, limit, client_id
+        )
+
+    @staticmethod
+    async def get_fusions(
+        address: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        client_id: str = "internal"
+    ) -> Dict[str, Any]:
+        return await _page(FUSIONS_SQL, ("momentum_height", "id"), [address], cursor, limit, client_id)
+
+    @staticmethod
+    async def get_stakes(
+        address: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        client_id: str = "internal"
+    ) -> Dict[str, Any]:
+        return await _page(STAKES_SQL, ("start_timestamp", "id"), [address], cursor, limit, client_id)
+
+    @staticmethod
+    async def get_momentum(height_or_hash: str, client_id: str = "internal") -> Optional[Dict[str, Any]]:
+        if height_or_hash.isdigit():
+            rows = await db.fetch_lookup(MOMENTUM_BY_HEIGHT_SQL, [int(height_or_hash)], client_id=client_id)
+        else:
+            rows = await db.fetch_lookup(MOMENTUM_BY_HASH_SQL, [height_or_hash.lower()], client_id=client_id)
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def get_momentums(
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        client_id: str = "internal"
+    ) -> Dict[str, Any]:
+        size = page_size(limit)
+        (height,) = decode_cursor(cursor, (int,)) if cursor else (_FIRST_PAGE[0],)
+        rows = await db.fetch_lookup(MOMENTUMS_SQL, [height, size + 1], client_id=client_id)
+
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = encode_cursor((rows[-1]["height"],))
+        return {"items": rows, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def get_token(token_standard: str, client_id: str = "internal") -> Optional[Dict[str, Any]]:
+        rows = await db.fetch_lookup(TOKEN_SQL, [token_standard], client_id=client_id)
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def get_pillars(include_revoked: bool = False, client_id: str = "internal") -> List[Dict[str, Any]]:
+        return await db.fetch_lookup(PILLARS_SQL, [include_revoked], client_id=client_id)
+
+    @staticmethod
+    async def get_pillar(owner_address: str, client_id: str = "internal") -> Optional[Dict[str, Any]]:
+        rows = await db.fetch_lookup(PILLAR_SQL, [owner_address], client_id=client_id)
+        return rows[0] if rows else None
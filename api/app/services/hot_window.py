@@ -0,0 +1,347 @@
+import asyncio
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..config import get_settings
+from .database import db
+from .query_templates import MOMENTUMS_PER_DAY, TemplateMatch, template_engine
+from .tokens import token_registry
+
+settings = get_settings()
+
+DAY_MS = 86400000
+
+# momentumtimestamp, momentumheight, amount (int64), tokenstandard and address ids (int32)
+ROW_BYTES = 8 + 8 + 8 + 4 + 4
+
+# Amounts are summed as two 32-bit halves so int64 sums stay exact
+_LOW_BITS = 32
+_LOW_MASK = (1 << _LOW_BITS) - 1
+_MAX_AMOUNT = (1 << 63) - 1
+
+_EPOCH = date(1970, 1, 1)
+
+
+class Dictionary:
+    """Dictionary encoding of a string column"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: str) -> int:
+        encoded = self.ids.get(value)
+        if encoded is None:
+            encoded = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return encoded
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _group_sums(groups: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count and exactly sum amounts per group
+
+    Returns:
+        Tuple of (group ids, row counts, high and low 32-bit halves of the sums,
+        normalized so the low half fits in 32 bits)
+    """
+    if not len(groups):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    order = np.argsort(groups, kind="stable")
+    ordered = groups[order]
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    counts = np.diff(np.append(starts, len(ordered)))
+    amounts = amounts[order]
+    high = np.add.reduceat(amounts >> _LOW_BITS, starts)
+    low = np.add.reduceat(amounts & _LOW_MASK, starts)
+    return ordered[starts], counts, high + (low >> _LOW_BITS), low & _LOW_MASK
+
+
+def _total(high: int, low: int) -> int:
+    return (int(high) << _LOW_BITS) + int(low)
+
+
+class HotWindow:
+    """
+    The last hot_window_days of account blocks as NumPy columns, for aggregates
+
+    The window holds every account block with momentumtimestamp above since:
+    its timestamp, momentum height and amount, with token standards and
+    addresses dictionary-encoded. It is loaded in the background at startup
+    and extended by tailing new momentum heights; rows falling out of the
+    window, or beyond the hot_window_memory_mb budget, are dropped from the
+    old end. Aggregate templates whose time range the window covers are
+    answered with vectorized filters and group-bys instead of a scan in
+    Postgres; everything else, and any question while the window is loading
+    or lagging, goes to the database.
+    """
+
+    def __init__(self):
+        self.since = 0
+        self.height: Optional[int] = None
+        self.rows = 0
+        self.tokens = Dictionary()
+        self.addresses = Dictionary()
+        # Tokens with an amount too large for int64, answered by the database
+        self.wide_tokens: set = set()
+        self._columns = self._allocate(0)
+        self._start = 0
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "loaded_rows": 0, "evicted_rows": 0, "errors": 0}
+
+    @staticmethod
+    def _allocate(capacity: int) -> Dict[str, np.ndarray]:
+        return {
+            "timestamp": np.zeros(capacity, dtype=np.int64),
+            "height": np.zeros(capacity, dtype=np.int64),
+            "amount": np.zeros(capacity, dtype=np.int64),
+            "token": np.zeros(capacity, dtype=np.int32),
+            "address": np.zeros(capacity, dtype=np.int32),
+        }
+
+    def _column(self, name: str) -> np.ndarray:
+        return self._columns[name][self._start:self._start + self.rows]
+
+    @property
+    def max_rows(self) -> int:
+        return settings.hot_window_memory_mb * 1024 * 1024 // ROW_BYTES
+
+    def _append(self, rows: List[Any]):
+        """Append rows in momentum height order, growing the columns by doubling"""
+        end = self._start + self.rows
+        capacity = len(self._columns["timestamp"])
+        if end + len(rows) > capacity:
+            grown = self._allocate(max(2 * self.rows, self.rows + len(rows), 1024))
+            for name, column in self._columns.items():
+                grown[name][:self.rows] = column[self._start:end]
+            self._columns, self._start, end = grown, 0, self.rows
+
+        amounts = []
+        for row in rows:
+            amount = int(row["amount"] or 0)
+            if amount > _MAX_AMOUNT:
+                self.wide_tokens.add(self.tokens.encode(row["tokenstandard"]))
+                amount = 0
+            amounts.append(amount)
+        span = slice(end, end + len(rows))
+        self._columns["timestamp"][span] = [row["momentumtimestamp"] for row in rows]
+        self._columns["height"][span] = [row["momentumheight"] for row in rows]
+        self._columns["amount"][span] = amounts
+        self._columns["token"][span] = [self.tokens.encode(row["tokenstandard"]) for row in rows]
+        self._columns["address"][span] = [self.addresses.encode(row["address"]) for row in rows]
+        self.rows += len(rows)
+        self.stats["loaded_rows"] += len(rows)
+
+    def _evict(self):
+        """Drop rows older than the window or beyond the memory budget, a whole momentum at a time"""
+        timestamps = self._column("timestamp")
+        since = max(self.since, int(time.time() * 1000) - settings.hot_window_days * DAY_MS)
+        if self.rows > self.max_rows:
+            since = max(since, int(timestamps[self.rows - self.max_rows - 1]))
+        drop = int(np.searchsorted(timestamps, since, side="right"))
+        self.since = since
+        if not drop:
+            return
+        self._start += drop
+        self.rows -= drop
+        self.stats["evicted_rows"] += drop
+        if self._start > self.rows:
+            self._compact()
+
+    def _compact(self):
+        """Copy the live rows to fresh columns and re-encode the addresses still in use"""
+        columns = self._allocate(max(2 * self.rows, 1024))
+        for name in columns:
+            columns[name][:self.rows] = self._column(name)
+        used, encoded = np.unique(columns["address"][:self.rows], return_inverse=True)
+        addresses = Dictionary()
+        for address_id in used:
+            addresses.encode(self.addresses.values[address_id])
+        columns["address"][:self.rows] = encoded
+        self._columns, self._start, self.addresses = columns, 0, addresses
+
+    async def _load(self, low: int, high: int):
+        """Append the account blocks of momentums in the height range (low, high]"""
+        async with db.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT momentumheight, momentumtimestamp, tokenstandard, address, amount
+                FROM accountblocks
+                WHERE momentumheight > $1 AND momentumheight <= $2
+                ORDER BY momentumheight
+                """,
+                low, high
+            )
+        self._append(rows)
+        self.height = high
+
+    async def _begin(self, tip: int):
+        """Start the window about hot_window_days of momentums below the tip"""
+        start = max(tip - settings.hot_window_days * MOMENTUMS_PER_DAY, 0)
+        async with db.pool.acquire() as connection:
+            timestamp = await connection.fetchval("SELECT timestamp FROM momentums WHERE height = $1", start)
+        self.height = start
+        self.since = timestamp or 0
+
+    async def refresh(self):
+        """Tail new momentums up to the indexed tip"""
+        tip = await db.get_indexed_height()
+        if self.height is None:
+            await self._begin(tip)
+        while self.height < tip:
+            await self._load(self.height, min(tip, self.height + settings.hot_window_batch_momentums))
+            self._evict()
+        self._evict()
+        if not self._loaded:
+            self._loaded = True
+            print(f"Hot window loaded: {self.rows} account blocks since momentum {self.height}")
+        self._refreshed_at = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Hot window refresh error: {str(e)}")
+            await asyncio.sleep(settings.hot_window_poll_seconds)
+
+    def start(self):
+        """Load the window and keep tailing the chain in the background"""
+        if settings.hot_window_enabled and self._task is None:
+            template_engine.window_covers = self.covers
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def covers(self, days: int) -> bool:
+        """Whether every account block of the last days is in the window and it is up to date"""
+        if not self._loaded or time.monotonic() - self._refreshed_at > settings.hot_window_max_staleness_seconds:
+            return False
+        return int(time.time() * 1000) - days * DAY_MS >= self.since
+
+    def answer(self, template: Optional[TemplateMatch]) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Answer a template match from the window
+
+        Args:
+            template: Template the question matched, if any
+
+        Returns:
+            Tuple of (results, truncated) like Database.execute_query, or None
+            if the query has to run in the database
+        """
+        if template is None or template.name not in _HANDLERS:
+            return None
+        results = _HANDLERS[template.name](self, *template.params)
+        if results is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return results[:settings.max_query_results], len(results) > settings.max_query_results
+
+    def _recent(self, days: int) -> Optional[np.ndarray]:
+        """Mask of the rows from the last days, or None if the window doesn't cover them"""
+        if not self.covers(days):
+            return None
+        return self._column("timestamp") > int(time.time() * 1000) - days * DAY_MS
+
+    def _daily_transactions(self, days: int) -> Optional[List[Dict[str, Any]]]:
+        recent = self._recent(days)
+        if recent is None:
+            return None
+        day_numbers, counts = np.unique(self._column("timestamp")[recent] // DAY_MS, return_counts=True)
+        return [
+            {"day": _EPOCH + timedelta(days=int(day)), "transaction_count": int(count)}
+            for day, count in zip(day_numbers, counts)
+        ]
+
+    def _token_volume(self, days: int) -> Optional[List[Dict[str, Any]]]:
+        recent = self._recent(days)
+        if recent is None or self.wide_tokens:
+            return None
+        selected = recent & (self._column("amount") > 0)
+        token_ids, counts, high, low = _group_sums(self._column("token")[selected], self._column("amount")[selected])
+
+        results = []
+        for token_id, count, high_sum, low_sum in zip(token_ids, counts, high, low):
+            standard = self.tokens.values[token_id]
+            token = token_registry.by_standard(standard)
+            if token is None:
+                # Not in the token registry yet; the join in the database knows it
+                return None
+            results.append({
+                "tokenstandard": standard,
+                "symbol": token["symbol"],
+                "transfer_count": int(count),
+                "volume": Decimal(_total(high_sum, low_sum)) / Decimal(10) ** token["decimals"]
+            })
+        results.sort(key=lambda row: (-row["transfer_count"], row["tokenstandard"]))
+        return results
+
+    def _top_senders(self, token_standard: str, n: int, days: int, scale: Decimal) -> Optional[List[Dict[str, Any]]]:
+        token_id = self.tokens.ids.get(token_standard)
+        recent = self._recent(days)
+        if recent is None or token_id in self.wide_tokens:
+            return None
+        if token_id is None:
+            return []
+        selected = recent & (self._column("token") == token_id) & (self._column("amount") > 0)
+        address_ids, counts, high, low = _group_sums(
+            self._column("address")[selected], self._column("amount")[selected]
+        )
+        addresses = np.array([self.addresses.values[address_id] for address_id in address_ids], dtype=str)
+        top = np.lexsort((addresses, -low, -high))[:n]
+        return [
+            {
+                "address": addresses[i],
+                "transfer_count": int(counts[i]),
+                "amount_sent": Decimal(_total(high[i], low[i])) / scale
+            }
+            for i in top
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": settings.hot_window_enabled,
+            "loaded": self._loaded,
+            **self.stats,
+            "hit_rate": self.stats["hits"] / total if total else 0.0,
+            "rows": self.rows,
+            "height": self.height,
+            "since": self.since,
+            "tokens": len(self.tokens),
+            "addresses": len(self.addresses),
+            "memory_bytes": sum(column.nbytes for column in self._columns.values()),
+            "seconds_since_refresh": round(time.monotonic() - self._refreshed_at, 1) if self._loaded else None
+        }
+
+
+# Template answered from the window, by name, called with the template's parameters
+_HANDLERS = {
+    "daily_transactions": HotWindow._daily_transactions,
+    "token_volume": HotWindow._token_volume,
+    "top_senders": HotWindow._top_senders,
+}
+
+
+# Global hot window instance
+hot_window = HotWindow()
@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Dict, Any, List, Optional, Set, Tuple
+from ..config import get_settings
+from .admission import plan_estimates
+from .database import db
+from .sql_explainer import COLUMN_DESCRIPTIONS
+from .sql_rewriter import table_aliases, resolve_column
+from .workload import workload
+
+settings = get_settings()
+
+WORKLOAD_TABLE = "query_workload"
+
+# Columns of every table described in the schema context
+TABLE_COLUMNS: Dict[str, Set[str]] = {
+    table: set(columns) for table, columns in COLUMN_DESCRIPTIONS.items()
+}
+
+_PREDICATE = re.compile(
+    r"(?:\b(\w+)\.)?\b([a-z_]\w*)\s*"
+    r"(<>|!=|<=|>=|=|<|>|\bnot\s+in\b|\bin\b|\bnot\s+between\b|\bbetween\b|\bnot\s+like\b|\blike\b)"
+    r"\s*('[^']*'|\S+)?"
+)
+_REVERSED = re.compile(r"(<=|>=|=|<|>)\s*(?:\b(\w+)\.)?\b([a-z_]\w*)\b(?!\s*[.(])")
+_ORDER_BY = re.compile(r"\border\s+by\s+(.+?)(?:\blimit\b|\boffset\b|\)|;|$)", re.DOTALL)
+_ORDER_ITEM = re.compile(r"^(?:(\w+)\.)?(\w+)(?:\s+(?:asc|desc))?(?:\s+nulls\s+(?:first|last))?$")
+_INDEX_COLUMNS = re.compile(r"\((.*)\)\s*(?:where .*)?$", re.IGNORECASE)
+
+EQUALITY, RANGE = "equality", "range"
+
+
+def extract_columns(sql: str) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Find the filtered and sorted columns of a statement, per table
+
+    Only plain column references count: predicates over expressions such as
+    lower(address) or momentumtimestamp / 1000 cannot use a plain index.
+
+    Args:
+        sql: SQL statement
+
+    Returns:
+        {table: {"equality": [...], "range": [...], "order": [...]}}
+    """
+    text = sql.lower()
+    aliases = table_aliases(text)
+    usage: Dict[str, Dict[str, List[str]]] = {}
+
+    def add(kind: str, qualifier: Optional[str], column: str):
+        for table in resolve_column(qualifier, column, aliases):
+            columns = usage.setdefault(table, {EQUALITY: [], RANGE: [], "order": []})[kind]
+            if column not in columns:
+                columns.append(column)
+
+    for qualifier, column, op, operand in _PREDICATE.findall(text):
+        op = re.sub(r"\s+", " ", op)
+        if op in ("=", "in"):
+            add(EQUALITY, qualifier, column)
+        elif op in ("<", ">", "<=", ">=", "between"):
+            add(RANGE, qualifier, column)
+        elif op == "like" and operand.startswith("'") and operand[1:2] not in ("%", "_", "'"):
+            # A constant prefix can be served by a btree index range
+            add(RANGE, qualifier, column)
+
+    for op, qualifier, column in _REVERSED.findall(text):
+        add(EQUALITY if op == "=" else RANGE, qualifier, column)
+
+    for clause in _ORDER_BY.findall(text):
+        for item in clause.split(","):
+            match = _ORDER_ITEM.match(item.strip())
+            if match:
+                add("order", match.group(1), match.group(2))
+    return usage
+
+
+def candidate_indexes(sql: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Propose btree indexes for a statement
+
+    Equality columns come first, followed by one range or sort column, which is
+    the column order a btree can use for all of them at once.
+    """
+    candidates: List[Tuple[str, Tuple[str, ...]]] = []
+    for table, usage in extract_columns(sql).items():
+        equality, ranges, order = usage[EQUALITY], usage[RANGE], usage["order"]
+        proposals = [(column,) for column in equality + ranges]
+        if equality:
+            proposals.append(tuple(equality[:3]))
+            for column in ranges[:1] + order[:1]:
+                if column not in equality:
+                    proposals.append(tuple(equality[:2]) + (column,))
+        elif order:
+            proposals.append((order[0],))
+        for columns in proposals:
+            if (table, columns) not in candidates:
+                candidates.append((table, columns))
+    return candidates
+
+
+def _index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return f"{table}_{'_'.join(columns)}_idx"[:63]
+
+
+class IndexAdvisor:
+    """
+    Recommend indexes for the recorded query workload
+
+    Executed statements are recorded with their runtimes and persisted to the
+    query_workload table, so every worker and the CLI see the same workload.
+    Candidate indexes are derived from the predicate and sort columns of the
+    most expensive statements and, when the HypoPG extension is available,
+    checked as hypothetical indexes against EXPLAIN.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._persistent = False
+
+    async def initialize(self):
+        """Create the workload table"""
+        if not settings.index_advisor_enabled:
+            return
+
+        try:
+            async with db.pool.acquire() as connection:
+                await connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {WORKLOAD_TABLE} (
+                        fingerprint TEXT PRIMARY KEY,
+                        query TEXT NOT NULL,
+                        calls BIGINT NOT NULL,
+                        total_ms DOUBLE PRECISION NOT NULL,
+                        last_seen TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """)
+            self._persistent = True
+            workload.persistent = True
+        except Exception as e:
+            print(f"Index advisor: workload persistence disabled ({str(e)})")
+
+    async def flush(self):
+        """Add the counters recorded since the last flush to the workload table"""
+        pending = workload.take_pending()
+        if not self._persistent or not pending:
+            return
+        async with db.pool.acquire() as connection:
+            await connection.executemany(
+                f"""
+                INSERT INTO {WORKLOAD_TABLE} (fingerprint, query, calls, total_ms)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    calls = {WORKLOAD_TABLE}.calls + EXCLUDED.calls,
+                    total_ms = {WORKLOAD_TABLE}.total_ms + EXCLUDED.total_ms,
+                    last_seen = now()
+                """,
+                [
+                    (hashlib.sha256(key.encode()).hexdigest(), entry["query"], entry["calls"], entry["total_ms"])
+                    for key, entry in pending.items()
+                ]
+            )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.index_advisor_flush_seconds)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Index advisor flush error: {str(e)}")
+
+    def start(self):
+        """Start persisting the workload in the background"""
+        if self._persistent and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._persistent:
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Index advisor flush error: {str(e)}")
+
+    async def load_workload(self, limit: int) -> List[Dict[str, Any]]:
+        """The recorded statements with the most total runtime"""
+        if not self._persistent:
+            return workload.top(limit)
+        await self.flush()
+        async with db.pool.acquire() as connection:
+            rows = await connection.fetch(
+                f"SELECT query, calls, total_ms FROM {WORKLOAD_TABLE} ORDER BY total_ms DESC LIMIT $1",
+                limit
+            )
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    async def _existing_indexes(connection) -> Dict[str, List[List[str]]]:
+        rows = await connection.fetch(
+            "SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = current_schema()"
+        )
+        indexes: Dict[str, List[List[str]]] = {}
+        for row in rows:
+            match = _INDEX_COLUMNS.search(row["indexdef"])
+            if match is None:
+                continue
+            columns = [
+                part.strip().split()[0].strip('"').lower()
+                for part in match.group(1).split(",") if part.strip()
+            ]
+            indexes.setdefault(row["tablename"].lower(), []).append(columns)
+        return indexes
+
+    @staticmethod
+    async def _hypopg_installed(connection) -> bool:
+        # Installing extensions is left to the operator; advising never changes the schema
+        return bool(await connection.fetchval("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'"))
+
+    @staticmethod
+    async def _reset_hypopg(connection) -> bool:
+        try:
+            await connection.execute("SELECT hypopg_reset()")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _cost(connection, query: str) -> Optional[float]:
+        try:
+            plan = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {query}")
+        except Exception:
+            return None
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan_estimates(plan)["total_cost"]
+
+    async def advise(self) -> Dict[str, Any]:
+        """
+        Rank candidate indexes for the recorded workload
+
+        Returns:
+            Dictionary with whether candidates were verified with hypothetical
+            indexes, whether the HypoPG extension is installed, how many statements were analyzed, and the recommendations
+            ordered by estimated time saved
+        """
+        statements = await self.load_workload(settings.index_advisor_max_statements)
+        for statement in statements:
+            statement["candidates"] = candidate_indexes(statement["query"])
+
+        async with db.pool.acquire() as connection:
+            existing = await self._existing_indexes(connection)
+            hypopg_installed = await self._hypopg_installed(connection)
+            hypothetical = hypopg_installed and await self._reset_hypopg(connection)
+
+            def covered(table: str, columns: Tuple[str, ...]) -> bool:
+                return any(index[:len(columns)] == list(columns) for index in existing.get(table, []))
+
+            # Candidates are ranked first by the runtime of the statements proposing them
+            weights: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+            for statement in statements:
+                for candidate in statement["candidates"]:
+                    if not covered(*candidate):
+                        weights[candidate] = weights.get(candidate, 0.0) + statement["total_ms"]
+            candidates = sorted(weights, key=lambda c: -weights[c])[:settings.index_advisor_max_candidates]
+
+            baseline: Dict[str, Optional[float]] = {}
+            if hypothetical:
+                for statement in statements:
+                    baseline[statement["query"]] = await self._cost(connection, statement["query"])
+
+            recommendations = []
+            for table, columns in candidates:
+                affected = [s for s in statements if (table, columns) in s["candidates"]]
+                recommendation = {
+                    "create_statement": (
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_index_name(table, columns)} "
+                        f"ON {table} ({', '.join(columns)})"
+                    ),
+                    "table": table,
+                    "columns": list(columns),
+                    "statements": len(affected),
+                    "workload_ms": round(weights[(table, columns)], 1),
+                    "estimated_cost_reduction": None,
+                    "estimated_time_saved_ms": None,
+                }
+
+                if hypothetical:
+                    index_oid = await connection.fetchval(
+                        "SELECT indexrelid FROM hypopg_create_index($1)",
+                        f"CREATE INDEX ON {table} ({', '.join(columns)})"
+                    )
+                    try:
+                        saved_ms, reductions = 0.0, []
+                        for statement in affected:
+                            before = baseline.get(statement["query"])
+                            after = await self._cost(connection, statement["query"])
+                            if not before or after is None:
+                                continue
+                            reduction = max(0.0, 1 - after / before)
+                            reductions.append(reduction)
+                            saved_ms += statement["total_ms"] * reduction
+                    finally:
+                        await connection.execute("SELECT hypopg_drop_index($1)", index_oid)
+
+                    if not reductions or max(reductions) < settings.index_advisor_min_gain:
+                        continue
+                    recommendation["estimated_cost_reduction"] = round(max(reductions), 3)
+                    recommendation["estimated_time_saved_ms"] = round(saved_ms, 1)
+                recommendations.append(recommendation)
+
+        key = "estimated_time_saved_ms" if hypothetical else "workload_ms"
+        recommendations.sort(key=lambda r: -r[key])
+        return {
+            "hypothetical": hypothetical,
+            "hypopg_installed": hypopg_installed,
+            "statements_analyzed": len(statements),
+            "recommendations": recommendations
+        }
+
+
+# Global index advisor instance
+index_advisor = IndexAdvisor()
@@ -0,0 +1,375 @@
+import asyncio
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional
+import asyncpg
+import orjson
+from ..config import get_settings
+from .database import db, JOB_POOL
+from .query_processor import QueryProcessor
+from .result_encoding import encode_json
+from .scheduler import SchedulerBusy
+from .translation_cache import translation_cache
+
+settings = get_settings()
+
+JOBS_TABLE = "query_jobs"
+PAGES_TABLE = "query_job_pages"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+FINISHED = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+_JOB_COLUMNS = """
+    id, status, question, sql_query, explanation, error, row_count, truncated, pages,
+    result_bytes, created_at, started_at, finished_at, expires_at
+"""
+
+
+class JobManager:
+    """
+    Run long analytical questions in the background and keep their results
+
+    Jobs are rows in query_jobs, so they survive restarts and every API
+    worker can run them: idle workers claim the oldest queued job with
+    FOR UPDATE SKIP LOCKED. A job runs on the job pool with
+    job_timeout_seconds instead of the interactive timeout, and streams its
+    rows into query_job_pages as zlib-compressed JSON pages of
+    job_page_size rows. Finished jobs are deleted, results included, after
+    job_result_ttl_seconds.
+    """
+
+    def __init__(self):
+        self._ready = False
+        self._workers: List[asyncio.Task] = []
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        self._wakeup = asyncio.Event()
+        self._finished = asyncio.Event()
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "requeued": 0, "expired": 0}
+
+    async def initialize(self):
+        """Create the job and result tables"""
+        try:
+            async with db.pool.acquire() as connection:
+                await connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+                        id TEXT PRIMARY KEY,
+                        client_id TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        sql_query TEXT,
+                        explanation TEXT,
+                        error TEXT,
+                        row_count BIGINT NOT NULL DEFAULT 0,
+                        truncated BOOLEAN NOT NULL DEFAULT false,
+                        pages INT NOT NULL DEFAULT 0,
+                        result_bytes BIGINT NOT NULL DEFAULT 0,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        started_at TIMESTAMPTZ,
+                        finished_at TIMESTAMPTZ,
+                        expires_at TIMESTAMPTZ
+                    )
+                """)
+                await connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {JOBS_TABLE}_queued_idx ON {JOBS_TABLE} (created_at) "
+                    f"WHERE status = '{STATUS_QUEUED}'"
+                )
+                await connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {PAGES_TABLE} (
+                        job_id TEXT NOT NULL REFERENCES {JOBS_TABLE} (id) ON DELETE CASCADE,
+                        page INT NOT NULL,
+                        rows BYTEA NOT NULL,
+                        PRIMARY KEY (job_id, page)
+                    )
+                """)
+            self._ready = True
+        except Exception as e:
+            print(f"Query jobs disabled: {str(e)}")
+
+    @property
+    def enabled(self) -> bool:
+        return self._ready
+
+    async def submit(self, question: str, client_id: str) -> Dict[str, Any]:
+        """
+        Queue a question as a job
+
+        Raises:
+            SchedulerBusy: If too many jobs are waiting, overall or for this client
+        """
+        async with db.pool.acquire() as connection:
+            pending = await connection.fetchrow(
+                f"SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE client_id = $1) AS client "
+                f"FROM {JOBS_TABLE} WHERE status IN ('{STATUS_QUEUED}', '{STATUS_RUNNING}')",
+                client_id
+            )
+            if pending["total"] >= settings.job_max_queued or pending["client"] >= settings.job_max_per_client:
+                raise SchedulerBusy("jobs", int(settings.job_poll_seconds * 10))
+            job = await connection.fetchrow(
+                f"INSERT INTO {JOBS_TABLE} (id, client_id, question, status) VALUES ($1, $2, $3, $4) "
+                f"RETURNING {_JOB_COLUMNS}",
+                uuid.uuid4().hex, client_id, question, STATUS_QUEUED
+            )
+        self.stats["submitted"] += 1
+        self._wakeup.set()
+        return dict(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async with db.pool.acquire() as connection:
+            job = await connection.fetchrow(f"SELECT {_JOB_COLUMNS} FROM {JOBS_TABLE} WHERE id = $1", job_id)
+        return dict(job) if job else None
+
+    async def wait(self, job_id: str, seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Return a job once it has finished, or as it is after seconds
+
+        Jobs run by this process wake the waiter as soon as they finish;
+        jobs run elsewhere are re-read every job_poll_seconds.
+        """
+        deadline = time.monotonic() + min(seconds, settings.job_max_wait_seconds)
+        while True:
+            finished = self._finished
+            job = await self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=min(remaining, settings.job_poll_seconds))
+            except asyncio.TimeoutError:
+                pass
+
+    async def get_page(self, job_id: str, page: int) -> Optional[List[Dict[str, Any]]]:
+        """Rows of one result page, or None if the page doesn't exist"""
+        async with db.pool.acquire() as connection:
+            data = await connection.fetchval(
+                f"SELECT rows FROM {PAGES_TABLE} WHERE job_id = $1 AND page = $2", job_id, page
+            )
+        if data is None:
+            return None
+        return orjson.loads(zlib.decompress(data))
+
+    async def delete(self, job_id: str) -> bool:
+        """Cancel a job if it hasn't finished and delete it with its results"""
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelled.add(job_id)
+            task.cancel()
+        async with db.pool.acquire() as connection:
+            # A job still running in another process notices on its next page
+            deleted = await connection.fetchval(
+                f"WITH deleted AS (DELETE FROM {JOBS_TABLE} WHERE id = $1 RETURNING status) "
+                f"SELECT status FROM deleted",
+                job_id
+            )
+        if deleted in (STATUS_QUEUED, STATUS_RUNNING):
+            self.stats["cancelled"] += 1
+        return deleted is not None
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        async with db.pool.acquire() as connection:
+            job = await connection.fetchrow(f"""
+                UPDATE {JOBS_TABLE} SET status = '{STATUS_RUNNING}', started_at = now()
+                WHERE id = (
+                    SELECT id FROM {JOBS_TABLE}
+                    WHERE status = '{STATUS_QUEUED}'
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, question
+            """)
+        return dict(job) if job else None
+
+    async def _execute(self, job: Dict[str, Any]):
+        """Translate a job's question, run it and store the results page by page"""
+        translation = await QueryProcessor.translate(job["question"])
+        async with db.pool.acquire() as connection:
+            await connection.execute(
+                f"UPDATE {JOBS_TABLE} SET sql_query = $2, explanation = $3 WHERE id = $1",
+                job["id"], translation["sql_query"], translation["explanation"]
+            )
+
+        pages = row_count = result_bytes = 0
+        stream = await db.stream_query(
+            translation["executed_sql"],
+            translation["params"],
+            max_rows=settings.job_max_rows,
+            chunk_size=settings.job_page_size,
+            timeout_seconds=settings.job_timeout_seconds,
+            pool_name=JOB_POOL
+        )
+        try:
+            async for chunk in stream.chunks():
+                data = zlib.compress(encode_json(chunk))
+                async with db.pool.acquire() as connection:
+                    try:
+                        await connection.execute(
+                            f"INSERT INTO {PAGES_TABLE} (job_id, page, rows) VALUES ($1, $2, $3)",
+                            job["id"], pages, data
+                        )
+                    except asyncpg.ForeignKeyViolationError:
+                        # The job was deleted while it ran
+                        return
+                pages += 1
+                row_count += len(chunk)
+                result_bytes += len(data)
+        finally:
+            await stream.close()
+
+        await self._finish(
+            job["id"], STATUS_SUCCEEDED,
+            row_count=row_count,
+            truncated=row_count >= settings.job_max_rows,
+            pages=pages,
+            result_bytes=result_bytes
+        )
+        if translation["generated_sql"] is not None:
+            await translation_cache.put(job["question"], translation["generated_sql"], translation["explanation"])
+
+    async def _finish(self, job_id: str, status: str, error: Optional[str] = None, **result):
+        async with db.pool.acquire() as connection:
+            await connection.execute(
+                f"UPDATE {JOBS_TABLE} SET status = $2, error = $3, row_count = $4, truncated = $5, "
+                f"pages = $6, result_bytes = $7, finished_at = now(), "
+                f"expires_at = now() + make_interval(secs => $8) "
+                f"WHERE id = $1 AND status = '{STATUS_RUNNING}'",
+                job_id, status, error,
+                result.get("row_count", 0), result.get("truncated", False),
+                result.get("pages", 0), result.get("result_bytes", 0),
+                float(settings.job_result_ttl_seconds)
+            )
+        self.stats[status] += 1
+        # Wake everyone long-polling in this process
+        self._finished.set()
+        self._finished = asyncio.Event()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        try:
+            await asyncio.wait_for(self._execute(job), timeout=settings.job_timeout_seconds)
+        except asyncio.TimeoutError:
+            await self._finish(job["id"], STATUS_FAILED, "Job timeout exceeded")
+        except ValueError as e:
+            await self._finish(job["id"], STATUS_FAILED, str(e))
+        except asyncpg.PostgresError as e:
+            await self._finish(job["id"], STATUS_FAILED, f"Query execution error: {str(e)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Query job {job['id']} error: {str(e)}")
+            await self._finish(job["id"], STATUS_FAILED, "Internal server error")
+
+    async def _requeue(self, job_id: str):
+        """Hand a job this process was running back to the queue"""
+        async with db.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(f"DELETE FROM {PAGES_TABLE} WHERE job_id = $1", job_id)
+                await connection.execute(
+                    f"UPDATE {JOBS_TABLE} SET status = '{STATUS_QUEUED}', started_at = NULL, "
+                    f"sql_query = NULL, explanation = NULL WHERE id = $1 AND status = '{STATUS_RUNNING}'",
+                    job_id
+                )
+        self.stats["requeued"] += 1
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Query job claim error: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.job_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run_job(job))
+            self._running[job["id"]] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if job["id"] in self._cancelled:
+                    # Deleted by a client; nothing left to record
+                    self._cancelled.discard(job["id"])
+                    continue
+                # The worker is stopping; let another one pick the job up
+                await asyncio.shield(self._requeue(job["id"]))
+                raise
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def cleanup(self) -> int:
+        """
+        Delete expired jobs and fail jobs whose worker died
+
+        Returns:
+            Number of jobs deleted
+        """
+        async with db.pool.acquire() as connection:
+            expired = await connection.fetchval(
+                f"WITH deleted AS (DELETE FROM {JOBS_TABLE} WHERE expires_at < now() RETURNING 1) "
+                f"SELECT COUNT(*) FROM deleted"
+            )
+            # Running for twice the timeout means no worker is looking after the job any more
+            await connection.execute(
+                f"UPDATE {JOBS_TABLE} SET status = '{STATUS_FAILED}', error = 'Job was interrupted', "
+                f"finished_at = now(), expires_at = now() + make_interval(secs => $1) "
+                f"WHERE status = '{STATUS_RUNNING}' AND started_at < now() - make_interval(secs => $2)",
+                float(settings.job_result_ttl_seconds), float(settings.job_timeout_seconds * 2)
+            )
+        self.stats["expired"] += expired
+        return expired
+
+    async def _clean(self):
+        while True:
+            try:
+                await self.cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Query job cleanup error: {str(e)}")
+            await asyncio.sleep(settings.job_cleanup_seconds)
+
+    def start(self):
+        """Start the job workers and the cleanup loop"""
+        if self._ready and not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(settings.job_concurrency)]
+            self._cleanup_task = asyncio.create_task(self._clean())
+
+    async def stop(self):
+        tasks = self._workers + ([self._cleanup_task] if self._cleanup_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._cleanup_task = None
+
+    async def get_stats(self) -> Dict[str, Any]:
+        if not self._ready:
+            return {"enabled": False, **self.stats}
+        async with db.pool.acquire() as connection:
+            rows = await connection.fetch(
+                f"SELECT status, COUNT(*) AS jobs, COALESCE(SUM(result_bytes), 0) AS bytes "
+                f"FROM {JOBS_TABLE} GROUP BY status"
+            )
+        return {
+            "enabled": True,
+            **self.stats,
+            "workers": len(self._workers),
+            "running_here": len(self._running),
+            "jobs": {row["status"]: {"count": row["jobs"], "result_bytes": row["bytes"]} for row in rows}
+        }
+
+
+# Global job manager instance
+job_manager = JobManager()
@@ -0,0 +1,166 @@
+import hashlib
+import re
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, List, Tuple
+from ..config import get_settings
+from .result_cache import normalize_sql
+
+settings = get_settings()
+
+# Literals that are always compared with TEXT columns
+_TEXT_VALUE = re.compile(
+    r"z1[02-9ac-hj-np-z]{38}|zts1[02-9ac-hj-np-z]{22}|[0-9a-f]{64}",
+    re.IGNORECASE
+)
+_INTERVAL = re.compile(
+    r"\bINTERVAL\s+(\x00\d+\x00)(?!\s+(?:YEAR|MONTH|DAY|HOUR|MINUTE|SECOND)S?\b)",
+    re.IGNORECASE
+)
+_STRING = re.compile(r"\x00(\d+)\x00")
+_NUMBER = re.compile(r"(?<![\w.$\x00])(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?(?![\w.\x00])")
+# Numbers that are part of the statement's structure rather than values
+_TYPE_MODIFIER = re.compile(
+    r"\b(?:numeric|decimal|varchar|char|character(?:\s+varying)?|bit|float|time|timestamp|timestamptz|interval)"
+    r"\s*\(\s*(?:\d+\s*,\s*)?$",
+    re.IGNORECASE
+)
+_POSITION = re.compile(r"\b(?:order|group)\s+by\s+(?:[^()]*?,\s*)?$", re.IGNORECASE)
+_POSITION_END = re.compile(r"\s*(?:,|\)|;|$|\b(?:asc|desc|nulls|order|limit|offset|having|window|union|fetch|for)\b)", re.IGNORECASE)
+_ARRAY_INDEX = re.compile(r"\[\s*(?:\d+\s*:\s*)?$")
+
+_INT4_MAX = 2 ** 31 - 1
+_INT8_MAX = 2 ** 63 - 1
+
+
+def parameterize_sql(sql: str) -> Tuple[str, List[Any]]:
+    """
+    Lift the literal values of a statement into bind parameters
+
+    Each parameter is cast to the type Postgres gives the literal it
+    replaces, so the statement plans and evaluates exactly as before.
+    Addresses, hashes and token standards become TEXT parameters; other
+    strings stay inline, since their type depends on where they are used.
+
+    Args:
+        sql: SQL statement without bind parameters
+
+    Returns:
+        Tuple of (parameterized SQL, parameter values)
+    """
+    if re.search(r"\$\d", sql):
+        return sql, []
+
+    literals: List[str] = []
+
+    def stash(match: re.Match) -> str:
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    text = re.sub(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", stash, sql)
+    params: List[Any] = []
+
+    def bind(value: Any, cast: str) -> str:
+        params.append(value)
+        return f"${len(params)}::{cast}"
+
+    def literal(placeholder: str) -> str:
+        return literals[int(placeholder.strip("\x00"))]
+
+    def interval(match: re.Match) -> str:
+        # The text is cast in SQL, so months and years keep their calendar meaning
+        return bind(literal(match.group(1))[1:-1].replace("''", "'"), "text::interval")
+
+    def string(match: re.Match) -> str:
+        value = literal(match.group(0))
+        if value.startswith("'") and _TEXT_VALUE.fullmatch(value[1:-1]):
+            return bind(value[1:-1], "text")
+        return match.group(0)
+
+    def number(match: re.Match) -> str:
+        before, after = text[:match.start()], text[match.end():]
+        if _TYPE_MODIFIER.search(before) or _ARRAY_INDEX.search(before):
+            return match.group(0)
+        if _POSITION.search(before) and _POSITION_END.match(after):
+            return match.group(0)
+        digits, exponent = match.groups()
+        if exponent is None and "." not in digits:
+            value = int(digits)
+            if value > _INT8_MAX:
+                return bind(Decimal(value), "numeric")
+            return bind(value, "int" if value <= _INT4_MAX else "bigint")
+        return bind(Decimal(match.group(0)), "numeric")
+
+    text = _INTERVAL.sub(interval, text)
+    text = _STRING.sub(string, text)
+    text = _NUMBER.sub(number, text)
+
+    # Renumber in order of appearance so equal shapes give equal text
+    order: Dict[str, int] = {}
+
+    def renumber(match: re.Match) -> str:
+        order.setdefault(match.group(1), len(order) + 1)
+        return f"${order[match.group(1)]}"
+
+    text = re.sub(r"\$(\d+)", renumber, text)
+    params = [params[int(index) - 1] for index in order]
+    return _STRING.sub(lambda match: literals[int(match.group(1))], text), params
+
+
+def fingerprint(sql: str) -> str:
+    """Stable identifier of a parameterized statement's shape"""
+    return hashlib.sha256(normalize_sql(sql).encode()).hexdigest()[:16]
+
+
+class FingerprintStats:
+    """
+    Call counts and latency per statement shape
+
+    Bounded to fingerprint_stats_size shapes; the least recently executed
+    shape is dropped first.
+    """
+
+    def __init__(self):
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record(self, query: str, elapsed_ms: float):
+        """
+        Record one execution of a parameterized statement
+
+        Args:
+            query: Parameterized SQL that was executed
+            elapsed_ms: Measured runtime
+        """
+        key = fingerprint(query)
+        entry = self._shapes.get(key)
+        if entry is None:
+            entry = self._shapes[key] = {"query": query, "calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+        self._shapes.move_to_end(key)
+        while len(self._shapes) > settings.fingerprint_stats_size:
+            self._shapes.popitem(last=False)
+
+    def get_stats(self, limit: int = 50) -> Dict[str, Any]:
+        """The statement shapes with the most total runtime"""
+        shapes = sorted(self._shapes.items(), key=lambda item: -item[1]["total_ms"])[:limit]
+        return {
+            "shapes": len(self._shapes),
+            "top": [
+                {
+                    "fingerprint": key,
+                    "query": entry["query"],
+                    "calls": entry["calls"],
+                    "mean_ms": round(entry["total_ms"] / entry["calls"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "total_ms": round(entry["total_ms"], 3)
+                }
+                for key, entry in shapes
+            ]
+        }
+
+
+# Global fingerprint statistics instance
+fingerprint_stats = FingerprintStats()
@@ -1,33 +1,113 @@
-import openai
-from typing import Dict, Any, Tuple
+import asyncio
+from contextlib import nullcontext
+from typing import AsyncContextManager, Dict, Any, List, Tuple
 import sqlparse
 import re
 from ..config import get_settings
-from ..utils.schema_context import SCHEMA_CONTEXT, EXAMPLE_QUERIES
+from .completions import completions
+from .database import db
+from .query_templates import template_engine
+from .schema_retriever import schema_retriever, estimate_tokens
+from .single_flight import SingleFlight
+from .sql_explainer import explain_sql
+from .sql_rewriter import rewrite_sql
+from .telemetry import span
+from .translation_cache import translation_cache, normalize_question
 
 settings = get_settings()
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=settings.openai_api_key)
+DEFAULT_EXPLANATION = "This query retrieves data based on your request."
+
+# Identical questions asked concurrently share one completion
+sql_generation_flight = SingleFlight("sql_generation")
+explanation_flight = SingleFlight("explanation")
+
+
+def _question_key(user_query: str) -> str:
+    template, slots = normalize_question(user_query)
+    return f"{template}|{','.join(slots)}"
 
 
 class QueryProcessor:
     @staticmethod
-    async def natural_language_to_sql(user_query: str) -> Tuple[str, str]:
+    async def translate(
+        question: str,
+        llm_explanation: bool = False,
+        llm_slots: AsyncContextManager = nullcontext()
+    ) -> Dict[str, Any]:
         """
-        Convert natural language query to SQL using ChatGPT
+        Resolve a question to SQL from a template, the translation cache or the language model
+        
+        Args:
+            question: Natural language question from user
+            llm_explanation: Leave the explanation of newly generated SQL to the language model
+            llm_slots: Held while the language model generates SQL
+            
+        Returns:
+            Dict with sql_query (as shown), executed_sql, params, explanation
+            (None when left to the language model), generated_sql (None unless
+            newly generated), rewrites and template (the TemplateMatch, if any)
+        """
+        # Common question shapes are answered locally without the language model
+        with span("template"):
+            template = await template_engine.match(question)
+        with span("translation_cache"):
+            cached = None if template else await translation_cache.get(question)
+        translation = {"params": None, "explanation": None, "generated_sql": None, "rewrites": [], "template": None}
+        if template is not None:
+            translation.update(
+                sql_query=template.display_sql,
+                executed_sql=template.sql_query,
+                params=template.params,
+                explanation=template.explanation,
+                template=template
+            )
+        elif cached is not None:
+            executed_sql, rewrites = await QueryProcessor.rewrite(cached[0])
+            translation.update(sql_query=executed_sql, executed_sql=executed_sql, explanation=cached[1], rewrites=rewrites)
+        else:
+            # Convert natural language to SQL
+            async with llm_slots:
+                generated_sql = await QueryProcessor.generate_sql(question)
+            executed_sql, rewrites = await QueryProcessor.rewrite(generated_sql)
+            translation.update(
+                sql_query=executed_sql,
+                executed_sql=executed_sql,
+                generated_sql=generated_sql,
+                rewrites=rewrites
+            )
+            if not llm_explanation:
+                translation["explanation"] = QueryProcessor.explain_locally(generated_sql)
+        return translation
+    
+    @staticmethod
+    async def generate_sql(user_query: str) -> str:
+        """
+        Translate a natural language question into a validated SQL query
+        
+        Concurrent calls for the same normalized question share one completion.
         
         Args:
             user_query: Natural language question from user
             
         Returns:
-            Tuple of (sql_query, explanation)
+            Cleaned and validated SQL query
         """
+        return await sql_generation_flight.do(
+            _question_key(user_query),
+            lambda: QueryProcessor._generate_sql(user_query)
+        )
+    
+    @staticmethod
+    async def _generate_sql(user_query: str) -> str:
+        # Only send the parts of the schema and the examples relevant to the question
+        context = schema_retriever.select(user_query)
+        
         # Build the prompt with schema context
         system_prompt = f"""
 You are a SQL expert for the NoM blockchain database. Convert natural language queries to PostgreSQL queries.
 
-{SCHEMA_CONTEXT}
+{context["schema"]}
 
 RULES:
 1. Only generate SELECT statements
@@ -43,36 +123,74 @@ RULES:
         
         # Add examples to help ChatGPT
         examples_text = "\n\nEXAMPLES:\n"
-        for example in EXAMPLE_QUERIES[:3]:  # Use first 3 examples
+        for example in context["examples"]:
             examples_text += f"Question: {example['question']}\nSQL: {example['sql']}\n\n"
         
+        messages = [
+            {"role": "system", "content": system_prompt + examples_text},
+            {"role": "user", "content": f"Convert this to SQL: {user_query}"}
+        ]
+        
         try:
-            response = client.chat.completions.create(
-                model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": system_prompt + examples_text},
-                    {"role": "user", "content": f"Convert this to SQL: {user_query}"}
-                ],
-                temperature=0.1,  # Low temperature for consistent results
-                max_tokens=1000
-            )
-            
-            sql_query = response.choices[0].message.content.strip()
+            sql_query, usage = await QueryProcessor._complete_sql(messages)
             
-            # Clean up the query
-            sql_query = QueryProcessor._clean_sql_query(sql_query)
-            
-            # Validate the query
-            QueryProcessor._validate_sql_query(sql_query)
-            
-            # Generate explanation
-            explanation = await QueryProcessor._generate_explanation(user_query, sql_query)
+            prompt_tokens = usage.prompt_tokens if usage else estimate_tokens(
+                system_prompt + examples_text
+            )
+            print(
+                f"SQL prompt: {prompt_tokens} tokens, {len(context['tables'])} tables, "
+                f"{len(context['examples'])} examples (full schema ~{schema_retriever.full_context_tokens} tokens)"
+            )
             
-            return sql_query, explanation
+            return sql_query
             
+        except asyncio.TimeoutError:
+            raise ValueError("Failed to generate SQL query: language model timed out")
         except Exception as e:
             raise ValueError(f"Failed to generate SQL query: {str(e)}")
     
+    @staticmethod
+    async def _complete_sql(messages: List[Dict[str, str]]) -> Tuple[str, Any]:
+        """
+        Ask for SQL, from the fast model first when one is configured
+        
+        The fast model's answer is used when it passes validation and Postgres
+        can plan it; otherwise the question is escalated to openai_model.
+        
+        Returns:
+            Tuple of (cleaned and validated SQL, token usage)
+        """
+        if settings.openai_fast_model:
+            try:
+                sql_query, usage = await completions.complete(
+                    "sql", settings.openai_fast_model, messages,
+                    max_tokens=1000, temperature=0.1,
+                    timeout=settings.openai_timeout_seconds,
+                    validate=QueryProcessor._format_sql
+                )
+                if db.pool:
+                    await db.explain_query(sql_query)
+                return sql_query, usage
+            except ValueError as e:
+                completions.stats["escalations"] += 1
+                print(f"Escalating to {settings.openai_model}: {str(e)}")
+        
+        return await completions.complete(
+            "sql", settings.openai_model, messages,
+            max_tokens=1000,
+            temperature=0.1,  # Low temperature for consistent results
+            timeout=settings.openai_timeout_seconds,
+            validate=QueryProcessor._format_sql
+        )
+    
+    @staticmethod
+    def _format_sql(sql_query: str) -> str:
+        """Clean up and validate a completion; raises ValueError if it isn't a safe SELECT"""
+        with span("sql_format"):
+            sql_query = QueryProcessor._clean_sql_query(sql_query)
+            QueryProcessor._validate_sql_query(sql_query)
+        return sql_query
+    
     @staticmethod
     def _clean_sql_query(query: str) -> str:
         """Clean and format SQL query"""
@@ -118,12 +236,53 @@ RULES:
                 raise ValueError("Query contains forbidden operations")
     
     @staticmethod
-    async def _generate_explanation(user_query: str, sql_query: str) -> str:
+    async def rewrite(sql_query: str) -> Tuple[str, List[str]]:
+        """
+        Make generated predicates index-friendly; the query is run as generated if that fails
+
+        A rewritten statement is planned once with EXPLAIN, so a rewrite that
+        produced invalid SQL falls back to the generated query instead of
+        failing when it executes.
+        """
+        try:
+            with span("rewrite"):
+                rewritten, rewrites = rewrite_sql(sql_query)
+        except Exception as e:
+            print(f"SQL rewriter error: {str(e)}")
+            return sql_query, []
+        if not rewrites:
+            return rewritten, rewrites
+        try:
+            await db.explain_query(rewritten)
+        except ValueError as e:
+            print(f"Rewritten SQL failed to plan, running it as generated: {str(e)}")
+            return sql_query, []
+        return rewritten, rewrites
+    
+    @staticmethod
+    def explain_locally(sql_query: str) -> str:
+        """Describe the query from its parse tree, without calling the language model"""
+        try:
+            with span("explain"):
+                return explain_sql(sql_query)
+        except Exception as e:
+            print(f"SQL explainer error: {str(e)}")
+            return DEFAULT_EXPLANATION
+    
+    @staticmethod
+    async def generate_explanation(user_query: str, sql_query: str) -> str:
         """Generate a human-readable explanation of what the query does"""
+        return await explanation_flight.do(
+            (_question_key(user_query), sql_query),
+            lambda: QueryProcessor._generate_explanation(user_query, sql_query)
+        )
+    
+    @staticmethod
+    async def _generate_explanation(user_query: str, sql_query: str) -> str:
         try:
-            response = client.chat.completions.create(
-                model=settings.openai_model,
-                messages=[
+            explanation, _ = await completions.complete(
+                "explanation", settings.openai_model,
+                [
                     {
                         "role": "system", 
                         "content": "You are a helpful assistant that explains SQL queries in simple terms. Keep explanations brief and focused."
@@ -140,10 +299,12 @@ Provide a brief explanation of what this query does in 1-2 sentences.
 """
                     }
                 ],
+                max_tokens=200,
                 temperature=0.3,
-                max_tokens=200
+                timeout=settings.explanation_timeout_seconds
             )
-            
-            return response.choices[0].message.content.strip()
-        except:
-            return "This query retrieves data based on your request."
\ No newline at end of file
+            return explanation
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return DEFAULT_EXPLANATION
@@ -0,0 +1,353 @@
+import re
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from ..config import get_settings
+from .tokens import token_registry
+from .workload import inline_params
+
+settings = get_settings()
+
+# Momentums are produced every 10 seconds
+MOMENTUMS_PER_DAY = 8640
+
+_PREFIX = (
+    r'(?:(?:please\s+)?(?:show(?:\s+me)?|list|give\s+me|get|find|display|what\s+are|'
+    r'what\s+were|which\s+are)\s+)?(?:all\s+)?(?:the\s+)?'
+)
+_TOKEN = r'(?P<token>[a-z][a-z0-9]{1,9})'
+_COUNT = r'(?P<n>\d{1,4})'
+
+
+class TemplateMatch:
+    """A question answered by a local template instead of the language model"""
+
+    def __init__(self, name: str, sql_query: str, params: List[Any], explanation: str, confidence: float = 1.0):
+        self.name = name
+        self.sql_query = sql_query
+        self.params = params
+        self.explanation = explanation
+        self.confidence = confidence
+
+    @property
+    def display_sql(self) -> str:
+        """The SQL with its bind parameters inlined, for showing to users"""
+        return inline_params(self.sql_query, self.params)
+
+
+def normalize(question: str) -> str:
+    """Lowercase, drop thousands separators and punctuation, collapse whitespace"""
+    text = question.lower()
+    text = re.sub(r'(?<=\d),(?=\d{3}\b)', '', text)
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    text = re.sub(r"[^\w\s.]", ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+async def _top_holders(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    token = await token_registry.by_symbol(slots["token"])
+    if token is None:
+        return None
+    n = min(int(slots["n"]), settings.max_query_results)
+    return TemplateMatch(
+        "top_holders",
+        """SELECT b.address,
+       b.balance / $3::numeric AS balance
+FROM balances b
+WHERE b.tokenstandard = $1
+ORDER BY b.balance DESC
+LIMIT $2""",
+        [token["tokenstandard"], n, Decimal(10) ** token["decimals"]],
+        f"This query lists the {n} accounts holding the largest {token['symbol']} balances, "
+        f"with balances converted to whole {token['symbol']}."
+    )
+
+
+async def _latest_transfers(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    token = await token_registry.by_symbol(slots["token"])
+    if token is None:
+        return None
+    n = min(int(slots["n"]), settings.max_query_results)
+    return TemplateMatch(
+        "latest_transfers",
+        """SELECT ab.hash,
+       ab.address AS sender,
+       ab.toaddress AS receiver,
+       ab.amount / $3::numeric AS amount,
+       to_timestamp(ab.momentumtimestamp / 1000) AS transaction_time
+FROM accountblocks ab
+WHERE ab.tokenstandard = $1
+  AND ab.amount > 0
+ORDER BY ab.momentumtimestamp DESC
+LIMIT $2""",
+        [token["tokenstandard"], n, Decimal(10) ** token["decimals"]],
+        f"This query shows the {n} most recent {token['symbol']} transactions with their "
+        f"sender, receiver, amount and time."
+    )
+
+
+async def _large_transfers(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    token = await token_registry.by_symbol(slots["token"])
+    if token is None:
+        return None
+    scale = Decimal(10) ** token["decimals"]
+    threshold = int(Decimal(slots["amount"]) * scale)
+    params: List[Any] = [token["tokenstandard"], threshold, scale]
+    window = ""
+    period = ""
+    if slots.get("days"):
+        days = int(slots["days"])
+        params.append(days)
+        window = "\n  AND ab.momentumtimestamp > (EXTRACT(EPOCH FROM NOW() - make_interval(days => $4)) * 1000)::bigint"
+        period = f" in the last {days} day{'s' if days != 1 else ''}"
+    return TemplateMatch(
+        "large_transfers",
+        f"""SELECT ab.hash,
+       ab.address AS sender,
+       ab.toaddress AS receiver,
+       ab.amount / $3::numeric AS amount,
+       to_timestamp(ab.momentumtimestamp / 1000) AS transaction_time
+FROM accountblocks ab
+WHERE ab.tokenstandard = $1
+  AND ab.amount > $2{window}
+ORDER BY ab.momentumtimestamp DESC""",
+        params,
+        f"This query finds {token['symbol']} transactions larger than {slots['amount']} "
+        f"{token['symbol']}{period}, newest first."
+    )
+
+
+async def _expiring_fusions(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    days = int(slots["days"])
+    return TemplateMatch(
+        "expiring_fusions",
+        """SELECT f.id,
+       f.address,
+       f.beneficiary,
+       f.qsramount / 100000000.0 AS qsr_amount,
+       f.expirationheight,
+       f.expirationheight - m.tip AS momentums_remaining
+FROM fusions f,
+     (SELECT MAX(height) AS tip FROM momentums) m
+WHERE f.isactive = true
+  AND f.expirationheight BETWEEN m.tip AND m.tip + $1
+ORDER BY f.expirationheight""",
+        [days * MOMENTUMS_PER_DAY],
+        f"This query lists active plasma fusions that expire within the next {days} "
+        f"day{'s' if days != 1 else ''} (about {days * MOMENTUMS_PER_DAY} momentums)."
+    )
+
+
+_SINCE = "(EXTRACT(EPOCH FROM NOW() - make_interval(days => ${})) * 1000)::bigint"
+
+
+def _days(days: int) -> str:
+    return f"{days} day{'s' if days != 1 else ''}"
+
+
+async def _daily_transactions(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    days = int(slots["days"])
+    return TemplateMatch(
+        "daily_transactions",
+        f"""SELECT (to_timestamp(ab.momentumtimestamp / 1000) AT TIME ZONE 'UTC')::date AS day,
+       COUNT(*) AS transaction_count
+FROM accountblocks ab
+WHERE ab.momentumtimestamp > {_SINCE.format(1)}
+GROUP BY 1
+ORDER BY 1""",
+        [days],
+        f"This query counts the account blocks of each UTC day in the last {_days(days)}."
+    )
+
+
+async def _token_volume(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    days = int(slots["days"])
+    return TemplateMatch(
+        "token_volume",
+        f"""SELECT ab.tokenstandard,
+       t.symbol,
+       COUNT(*) AS transfer_count,
+       SUM(ab.amount) / power(10::numeric, MAX(t.decimals)) AS volume
+FROM accountblocks ab
+LEFT JOIN tokens t ON t.tokenstandard = ab.tokenstandard
+WHERE ab.amount > 0
+  AND ab.momentumtimestamp > {_SINCE.format(1)}
+GROUP BY ab.tokenstandard, t.symbol
+ORDER BY transfer_count DESC, ab.tokenstandard""",
+        [days],
+        f"This query sums the transfers of each token in the last {_days(days)}, with volumes "
+        f"converted to whole tokens."
+    )
+
+
+async def _top_senders(slots: Dict[str, str]) -> Optional[TemplateMatch]:
+    token = await token_registry.by_symbol(slots["token"])
+    if token is None:
+        return None
+    n = min(int(slots["n"]), settings.max_query_results)
+    days = int(slots["days"])
+    return TemplateMatch(
+        "top_senders",
+        f"""SELECT ab.address,
+       COUNT(*) AS transfer_count,
+       SUM(ab.amount) / $4::numeric AS amount_sent
+FROM accountblocks ab
+WHERE ab.tokenstandard = $1
+  AND ab.amount > 0
+  AND ab.momentumtimestamp > {_SINCE.format(3)}
+GROUP BY ab.address
+ORDER BY amount_sent DESC, ab.address
+LIMIT $2""",
+        [token["tokenstandard"], n, days, Decimal(10) ** token["decimals"]],
+        f"This query lists the {n} accounts that sent the most {token['symbol']} in the last "
+        f"{_days(days)}, with the number of transfers and the amount sent in whole {token['symbol']}."
+    )
+
+
+_LAST_DAYS = r' (?:in|during|within|over|for) the (?:last|past) (?P<days>\d{1,4}) days?'
+
+TEMPLATES: List[Dict[str, Any]] = [
+    {
+        "name": "top_holders",
+        "patterns": [
+            _PREFIX + r'top ' + _COUNT + r' (?:accounts|addresses|holders|wallets) (?:by|with the (?:highest|largest|most)) '
+            + _TOKEN + r'(?: balances?| holdings?)?',
+            _PREFIX + r'top ' + _COUNT + r' ' + _TOKEN + r' (?:holders|accounts|addresses|wallets)(?: by balance)?',
+        ],
+        "build": _top_holders,
+    },
+    {
+        "name": "latest_transfers",
+        "patterns": [
+            _PREFIX + r'(?:latest|last|most recent|newest|recent) ' + _COUNT + r' ' + _TOKEN
+            + r' (?:transactions|transfers|txs)(?: with (?:their|the) amounts?)?',
+        ],
+        "build": _latest_transfers,
+    },
+    {
+        "name": "large_transfers",
+        "patterns": [
+            _PREFIX + r'(?:transactions|transfers|txs) (?:over|above|greater than|larger than|bigger than|more than) '
+            r'(?P<amount>\d+(?:\.\d+)?) ' + _TOKEN
+            + r'(?: (?:in|during|within) the (?:last|past) (?P<days>\d{1,4}) days?)?',
+        ],
+        "build": _large_transfers,
+    },
+    {
+        "name": "expiring_fusions",
+        "patterns": [
+            _PREFIX + r'(?:active )?(?:plasma )?fusions (?:that )?(?:expiring|expire|ending) (?:in|within) the next '
+            r'(?P<days>\d{1,4}) days?',
+        ],
+        "build": _expiring_fusions,
+    },
+    {
+        "name": "daily_transactions",
+        "patterns": [
+            _PREFIX + r'(?:(?:the )?number of |how many )?(?:transactions|transfers|txs|account blocks) '
+            r'(?:per|each|a) day' + _LAST_DAYS,
+            _PREFIX + r'(?:daily (?:transaction|transfer|tx) counts?|daily (?:transactions|transfers|txs)|'
+            r'(?:transaction|transfer|tx) counts? (?:per|by) day)' + _LAST_DAYS,
+        ],
+        "build": _daily_transactions,
+        "hot_window": True,
+    },
+    {
+        "name": "token_volume",
+        "patterns": [
+            _PREFIX + r'(?:(?:transfer|transaction|trading) )?volumes? (?:per|by|of each|for each) token' + _LAST_DAYS,
+            _PREFIX + r'token (?:transfer |transaction )?volumes?' + _LAST_DAYS,
+        ],
+        "build": _token_volume,
+        "hot_window": True,
+    },
+    {
+        "name": "top_senders",
+        "patterns": [
+            _PREFIX + r'top ' + _COUNT + r' ' + _TOKEN + r' senders' + _LAST_DAYS,
+            _PREFIX + r'top ' + _COUNT + r' (?:senders|accounts|addresses|wallets) (?:of|sending|by) '
+            + _TOKEN + r'(?: sent)?' + _LAST_DAYS,
+        ],
+        "build": _top_senders,
+        "hot_window": True,
+    },
+]
+
+_COMPILED = [
+    (template, [re.compile(pattern) for pattern in template["patterns"]])
+    for template in TEMPLATES
+]
+
+
+class TemplateEngine:
+    """
+    Answer common question shapes with parameterized SQL, without the language model
+
+    A question matches a template when a pattern covers at least
+    template_min_confidence of its normalized text. Slots (counts, token
+    symbols, amounts, time windows) become bind parameters.
+
+    Templates marked hot_window aggregate raw account blocks, which is only
+    cheap when the hot window holds every day asked about. They match only
+    while window_covers(days) is true, so longer periods go to the language
+    model, which answers them from the rollup tables.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0}
+        self.template_hits = {template["name"]: 0 for template in TEMPLATES}
+        # Set by the hot window once it runs
+        self.window_covers: Callable[[int], bool] = lambda days: False
+
+    async def match(self, question: str) -> Optional[TemplateMatch]:
+        """
+        Find a template for a question
+
+        Args:
+            question: Natural language question from user
+
+        Returns:
+            TemplateMatch, or None to fall back to the language model
+        """
+        if not settings.templates_enabled:
+            return None
+
+        text = normalize(question)
+        best = None
+        for template, patterns in _COMPILED:
+            for pattern in patterns:
+                found = pattern.search(text)
+                if found is None:
+                    continue
+                if template.get("hot_window") and not self.window_covers(int(found.group("days"))):
+                    continue
+                confidence = (found.end() - found.start()) / max(len(text), 1)
+                if best is None or confidence > best[0]:
+                    best = (confidence, template, found.groupdict())
+
+        result = None
+        if best is not None and best[0] >= settings.template_min_confidence:
+            build: Callable[[Dict[str, str]], Awaitable[Optional[TemplateMatch]]] = best[1]["build"]
+            result = await build(best[2])
+            if result is not None:
+                result.confidence = round(best[0], 3)
+
+        if result is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        self.template_hits[result.name] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the template hit rate and hits per template"""
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / total if total else 0.0,
+            "templates": dict(self.template_hits)
+        }
+
+
+# Global template engine instance
+template_engine = TemplateEngine()
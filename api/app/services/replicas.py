@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncpg
+from ..config import get_settings
+
+settings = get_settings()
+
+
+class Replica:
+    """A read replica and its last measured state"""
+
+    def __init__(self, name: str, pool: asyncpg.Pool):
+        self.name = name
+        self.pool = pool
+        self.height: Optional[int] = None
+        self.lag: Optional[int] = None
+        self.healthy = False
+        self.error: Optional[str] = None
+        self.queries = 0
+
+    def mark_down(self, error: Exception):
+        self.healthy = False
+        self.error = str(error)
+
+
+class ReplicaSet:
+    """
+    Route analytical queries to read replicas that are close enough to the primary
+
+    Every replica_check_seconds each replica's indexed height is compared
+    with the primary's. A replica is used only while it answers and lags by
+    at most replica_max_lag_momentums; otherwise queries stay on the primary.
+    """
+
+    def __init__(self):
+        self.replicas: List[Replica] = []
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, pool: asyncpg.Pool):
+        self.replicas.append(Replica(name, pool))
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None to use the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        replica = healthy[next(self._turn) % len(healthy)]
+        replica.queries += 1
+        return replica
+
+    def covered_height(self, tip: int) -> int:
+        """Highest momentum height that every source an analytical query can be sent to has indexed"""
+        heights = [replica.height for replica in self.replicas if replica.healthy and replica.height is not None]
+        return min([tip, *heights])
+
+    async def check(self, primary_height: int):
+        """Measure the height of every replica and update its health"""
+        async def measure(replica: Replica):
+            try:
+                async with replica.pool.acquire() as connection:
+                    height = await asyncio.wait_for(
+                        connection.fetchval("SELECT MAX(height) FROM momentums"),
+                        timeout=settings.replica_check_seconds
+                    )
+            except Exception as e:
+                if replica.healthy:
+                    print(f"Replica {replica.name} is down: {str(e)}")
+                replica.mark_down(e)
+                return
+            replica.height = height or 0
+            replica.lag = max(primary_height - replica.height, 0)
+            replica.healthy = replica.lag <= settings.replica_max_lag_momentums
+            replica.error = None if replica.healthy else f"{replica.lag} momentums behind the primary"
+
+        await asyncio.gather(*(measure(replica) for replica in self.replicas))
+
+    async def _run(self, primary_height: Callable[[], Awaitable[int]]):
+        while True:
+            try:
+                await self.check(await primary_height())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Replica check error: {str(e)}")
+            await asyncio.sleep(settings.replica_check_seconds)
+
+    def start(self, primary_height: Callable[[], Awaitable[int]]):
+        """Start checking replica lag in the background"""
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run(primary_height))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def close(self):
+        for replica in self.replicas:
+            await replica.pool.close()
+        self.replicas = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_lag": settings.replica_max_lag_momentums,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "height": replica.height,
+                    "lag": replica.lag,
+                    "queries": replica.queries,
+                    "error": replica.error
+                }
+                for replica in self.replicas
+            ]
+        }
@@ -0,0 +1,216 @@
+import re
+import sys
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from ..config import get_settings
+
+settings = get_settings()
+
+# Tables the indexer only appends to, with the column holding the momentum height
+APPEND_ONLY_TABLES = {
+    "accountblocks": "momentumheight",
+    "rewardtransactions": "momentumheight",
+    "votes": "momentumheight",
+    "momentums": "height",
+}
+
+# Tables whose rows are updated in place as the chain advances
+MUTABLE_TABLES = [
+    "accounts", "balances", "tokens", "pillars", "pillarupdates", "sentinels",
+    "stakes", "projects", "projectphases", "fusions", "cumulativerewards",
+    "dailytransactions", "dailytokenvolume", "dailyrewards", "epochpillarproduction",
+]
+
+# Columns of append-only tables that the indexer still rewrites later
+MUTABLE_COLUMNS = ["pairedaccountblock", "descendantof"]
+
+# Functions whose result changes without a new momentum
+VOLATILE_PATTERN = re.compile(
+    r'\b(now|current_timestamp|current_date|current_time|localtimestamp|clock_timestamp|'
+    r'statement_timestamp|random|timeofday)\b'
+)
+
+IMMUTABLE = "immutable"
+
+
+def normalize_sql(query: str, params: Optional[List[Any]] = None) -> str:
+    """Build a cache key from the SQL text and its parameters"""
+    key = re.sub(r'\s+', ' ', query).strip().rstrip(';').strip()
+    if params:
+        key += "|" + repr(list(params))
+    return key
+
+
+def _height_upper_bound(query: str, column: str) -> Optional[int]:
+    """Find the tightest constant upper bound on a height column"""
+    bounds = []
+    col = r'\b(?:\w+\.)?' + column
+    for match in re.finditer(col + r'\s*(<=|<|=)\s*(\d+)\b', query):
+        value = int(match.group(2))
+        bounds.append(value - 1 if match.group(1) == '<' else value)
+    for match in re.finditer(r'\b(\d+)\s*(>=|>|=)\s*' + col + r'\b', query):
+        value = int(match.group(1))
+        bounds.append(value - 1 if match.group(2) == '>' else value)
+    for match in re.finditer(col + r'\s+between\s+\d+\s+and\s+(\d+)\b', query):
+        bounds.append(int(match.group(1)))
+    return min(bounds) if bounds else None
+
+
+def is_immutable(query: str, tip: int) -> bool:
+    """
+    Decide whether a query's result can no longer change
+
+    Only single-table queries over an append-only table, bounded by a constant
+    momentum height safely below the indexed tip, qualify.
+
+    Args:
+        query: SQL query text
+        tip: Current indexed momentum height
+
+    Returns:
+        True if the result is fixed for every future height
+    """
+    lowered = query.lower()
+    if VOLATILE_PATTERN.search(lowered):
+        return False
+    if len(re.findall(r'\bselect\b', lowered)) != 1 or re.search(r'\bor\b', lowered):
+        return False
+    if any(re.search(rf'\b{table}\b', lowered) for table in MUTABLE_TABLES):
+        return False
+
+    tables = [t for t in APPEND_ONLY_TABLES if re.search(rf'\b{t}\b', lowered)]
+    if len(tables) != 1:
+        return False
+    if tables[0] == "accountblocks":
+        if any(column in lowered for column in MUTABLE_COLUMNS):
+            return False
+        # SELECT * would pick up the columns rewritten later
+        if re.search(r'(?<!\()\*', lowered):
+            return False
+
+    bound = _height_upper_bound(lowered, APPEND_ONLY_TABLES[tables[0]])
+    return bound is not None and bound <= tip - settings.result_cache_finality_margin
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Approximate the memory held by a result set in bytes"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for key, value in row.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """
+    Memory-bounded LRU of query results keyed on SQL text and indexed height
+
+    Results of queries over data that can no longer change are stored under a
+    height-independent key and survive new momentums.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, Any], Tuple[int, Tuple[List[Dict[str, Any]], bool]]]" = OrderedDict()
+        self._bytes = 0
+        self._height: Optional[int] = None
+        self.stats = {
+            "hits": 0,
+            "immutable_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "oversized": 0
+        }
+
+    def get(self, key: str, height: int) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Normalized SQL from normalize_sql
+            height: Current indexed momentum height
+
+        Returns:
+            Cached (rows, truncated) or None on a miss
+        """
+        if not settings.result_cache_enabled:
+            return None
+
+        self._advance(height)
+        for cache_key, counter in (((key, IMMUTABLE), "immutable_hits"), ((key, height), "hits")):
+            item = self._entries.get(cache_key)
+            if item is not None:
+                self._entries.move_to_end(cache_key)
+                self.stats[counter] += 1
+                rows, truncated = item[1]
+                return list(rows), truncated
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, query: str, height: int, result: Tuple[List[Dict[str, Any]], bool]):
+        """
+        Store a result, evicting least recently used entries to stay within budget
+
+        Args:
+            key: Normalized SQL from normalize_sql
+            query: SQL query text
+            height: Indexed momentum height the query ran at
+            result: Tuple of (rows, truncated)
+        """
+        if not settings.result_cache_enabled:
+            return
+
+        size = estimate_size(result[0])
+        if size > settings.result_cache_max_entry_bytes:
+            self.stats["oversized"] += 1
+            return
+
+        cache_key = (key, IMMUTABLE if is_immutable(query, height) else height)
+        self._remove(cache_key)
+        self._entries[cache_key] = (size, result)
+        self._bytes += size
+        self.stats["stores"] += 1
+
+        while self._bytes > settings.result_cache_max_bytes and self._entries:
+            _, (evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.stats["evictions"] += 1
+
+    def clear(self) -> int:
+        """Drop every cached result and return how many were removed"""
+        removed = len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+        return removed
+
+    def _remove(self, cache_key: Tuple[str, Any]):
+        item = self._entries.pop(cache_key, None)
+        if item is not None:
+            self._bytes -= item[0]
+
+    def _advance(self, height: int):
+        """Free entries computed at heights older than the current tip"""
+        if self._height is not None and height <= self._height:
+            return
+        self._height = height
+        stale = [k for k in self._entries if k[1] != IMMUTABLE and k[1] < height]
+        for cache_key in stale:
+            self._remove(cache_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and memory usage"""
+        lookups = self.stats["hits"] + self.stats["immutable_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": (lookups - self.stats["misses"]) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": settings.result_cache_max_bytes,
+            "height": self._height
+        }
+
+
+# Global result cache instance
+result_cache = ResultCache()
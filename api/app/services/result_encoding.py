@@ -0,0 +1,111 @@
+import io
+import json
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple
+import orjson
+from fastapi.encoders import decimal_encoder
+
+# Arrow IPC is only offered when pyarrow is installed
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+FORMAT_ROWS = "rows"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_ARROW = "arrow"
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_MEDIA_TYPE = "application/vnd.nom.columnar+json"
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """
+    Pick the response format from the request field, then the Accept header
+
+    Args:
+        requested: Format named in the request body, if any
+        accept: Value of the Accept header
+
+    Returns:
+        One of FORMAT_ROWS, FORMAT_COLUMNAR or FORMAT_ARROW
+    """
+    if requested:
+        return requested
+    accept = (accept or "").lower()
+    if ARROW_MEDIA_TYPE in accept:
+        return FORMAT_ARROW
+    if COLUMNAR_MEDIA_TYPE in accept:
+        return FORMAT_COLUMNAR
+    return FORMAT_ROWS
+
+
+def to_columns(results: List[Dict[str, Any]]) -> Tuple[List[str], List[List[Any]]]:
+    """Split row dictionaries into column names and positional row arrays"""
+    if not results:
+        return [], []
+    columns = list(results[0].keys())
+    return columns, [list(row.values()) for row in results]
+
+
+def _default(value: Any) -> Any:
+    # Match the number handling of the regular JSON responses
+    if isinstance(value, Decimal):
+        return decimal_encoder(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def encode_columnar(payload: Dict[str, Any], results: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode a query response as columnar JSON
+
+    The response fields are kept as they are and results is replaced by a
+    columns array and a rows array of arrays, so column names are sent once.
+    """
+    columns, rows = to_columns(results)
+    return encode_json({**payload, "columns": columns, "rows": rows})
+
+
+def encode_json(body: Any) -> bytes:
+    """Encode a value as JSON, with numbers handled like the regular responses"""
+    try:
+        return orjson.dumps(body, default=_default)
+    except orjson.JSONEncodeError:
+        # Integers wider than 64 bits are not supported by orjson
+        return json.dumps(body, default=_default).encode()
+
+
+def _arrow_column(values: List[Any]) -> "pa.Array":
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        # Mixed types or numerics wider than decimal128 are sent as text
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def encode_arrow(payload: Dict[str, Any], results: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode query results as an Arrow IPC stream
+
+    The other response fields (question, sql_query, explanation, row_count,
+    truncated) are stored in the schema metadata.
+    """
+    columns, _ = to_columns(results)
+    arrays = [_arrow_column([row[column] for row in results]) for column in columns]
+    metadata = {
+        key: json.dumps(value) if not isinstance(value, str) else value
+        for key, value in payload.items()
+        if value is not None
+    }
+    table = pa.Table.from_arrays(arrays, names=columns).replace_schema_metadata(metadata)
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
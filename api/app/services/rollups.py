@@ -0,0 +1,267 @@
+import asyncio
+from typing import Dict, Any, List, Optional
+from ..config import get_settings
+from .database import db
+
+settings = get_settings()
+
+WATERMARK_TABLE = "rollup_watermarks"
+
+# Day of a momentum timestamp (Unix ms) in UTC
+_DAY = "(to_timestamp({column} / 1000) AT TIME ZONE 'UTC')::date"
+
+# Every rollup folds in the source rows of momentums in the height range ($1, $2].
+# Its update must be additive, so applying each range exactly once gives the full total.
+ROLLUPS: List[Dict[str, Any]] = [
+    {
+        "name": "dailytransactions",
+        "create": """
+            CREATE TABLE IF NOT EXISTS dailytransactions (
+                day DATE PRIMARY KEY,
+                transactioncount BIGINT NOT NULL
+            )
+        """,
+        "update": f"""
+            INSERT INTO dailytransactions (day, transactioncount)
+            SELECT {_DAY.format(column="momentumtimestamp")}, COUNT(*)
+            FROM accountblocks
+            WHERE momentumheight > $1 AND momentumheight <= $2
+            GROUP BY 1
+            ON CONFLICT (day) DO UPDATE SET
+                transactioncount = dailytransactions.transactioncount + EXCLUDED.transactioncount
+        """,
+    },
+    {
+        "name": "dailytokenvolume",
+        "create": """
+            CREATE TABLE IF NOT EXISTS dailytokenvolume (
+                day DATE NOT NULL,
+                tokenstandard TEXT NOT NULL,
+                transfercount BIGINT NOT NULL,
+                volume NUMERIC NOT NULL,
+                PRIMARY KEY (day, tokenstandard)
+            )
+        """,
+        "update": f"""
+            INSERT INTO dailytokenvolume (day, tokenstandard, transfercount, volume)
+            SELECT {_DAY.format(column="momentumtimestamp")}, tokenstandard, COUNT(*), SUM(amount)
+            FROM accountblocks
+            WHERE momentumheight > $1 AND momentumheight <= $2
+              AND amount > 0
+            GROUP BY 1, 2
+            ON CONFLICT (day, tokenstandard) DO UPDATE SET
+                transfercount = dailytokenvolume.transfercount + EXCLUDED.transfercount,
+                volume = dailytokenvolume.volume + EXCLUDED.volume
+        """,
+    },
+    {
+        "name": "dailyrewards",
+        "create": """
+            CREATE TABLE IF NOT EXISTS dailyrewards (
+                day DATE NOT NULL,
+                address TEXT NOT NULL,
+                rewardtype SMALLINT NOT NULL,
+                tokenstandard TEXT NOT NULL,
+                rewardcount BIGINT NOT NULL,
+                amount NUMERIC NOT NULL,
+                PRIMARY KEY (day, address, rewardtype, tokenstandard)
+            )
+        """,
+        "update": f"""
+            INSERT INTO dailyrewards (day, address, rewardtype, tokenstandard, rewardcount, amount)
+            SELECT {_DAY.format(column="momentumtimestamp")}, address, rewardtype, tokenstandard,
+                   COUNT(*), SUM(amount)
+            FROM rewardtransactions
+            WHERE momentumheight > $1 AND momentumheight <= $2
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (day, address, rewardtype, tokenstandard) DO UPDATE SET
+                rewardcount = dailyrewards.rewardcount + EXCLUDED.rewardcount,
+                amount = dailyrewards.amount + EXCLUDED.amount
+        """,
+    },
+    {
+        "name": "epochpillarproduction",
+        "create": """
+            CREATE TABLE IF NOT EXISTS epochpillarproduction (
+                epoch BIGINT NOT NULL,
+                producerowner TEXT NOT NULL,
+                producername TEXT,
+                momentumcount BIGINT NOT NULL,
+                PRIMARY KEY (epoch, producerowner)
+            )
+        """,
+        # Epochs are 24 hours long and start at the genesis momentum
+        "update": """
+            INSERT INTO epochpillarproduction (epoch, producerowner, producername, momentumcount)
+            SELECT (m.timestamp - g.timestamp) / 86400000, m.producerowner, MAX(m.producername), COUNT(*)
+            FROM momentums m,
+                 (SELECT timestamp FROM momentums WHERE height = 1) g
+            WHERE m.height > $1 AND m.height <= $2
+              AND m.producerowner IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (epoch, producerowner) DO UPDATE SET
+                producername = EXCLUDED.producername,
+                momentumcount = epochpillarproduction.momentumcount + EXCLUDED.momentumcount
+        """,
+    },
+]
+
+ROLLUP_TABLES = [rollup["name"] for rollup in ROLLUPS]
+
+
+class RollupMaintainer:
+    """
+    Keep the rollup tables up to date with the indexed chain
+
+    Each rollup has a watermark: the last momentum height folded into it.
+    Every run folds in the rows of momentums above the watermark, up to
+    rollup_finality_margin below the tip, in batches of at most
+    rollup_batch_momentums, and advances the watermark in the same
+    transaction. History is never recomputed. Several API workers can run
+    the maintainer at once; the watermark row lock serialises them.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._ready = False
+        self.stats = {"runs": 0, "batches": 0, "errors": 0}
+
+    async def initialize(self):
+        """Create the rollup and watermark tables"""
+        if not settings.rollups_enabled:
+            return
+
+        try:
+            async with db.pool.acquire() as connection:
+                await connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+                        name TEXT PRIMARY KEY,
+                        height BIGINT NOT NULL
+                    )
+                """)
+                for rollup in ROLLUPS:
+                    await connection.execute(rollup["create"])
+                    await connection.execute(
+                        f"INSERT INTO {WATERMARK_TABLE} (name, height) VALUES ($1, 0) "
+                        f"ON CONFLICT (name) DO NOTHING",
+                        rollup["name"]
+                    )
+            self._ready = True
+        except Exception as e:
+            print(f"Rollups disabled: {str(e)}")
+
+    async def _target_height(self, connection) -> int:
+        tip = await connection.fetchval("SELECT MAX(height) FROM momentums")
+        return max((tip or 0) - settings.rollup_finality_margin, 0)
+
+    async def _fold_batch(self, rollup: Dict[str, Any], target: int, batch_size: int) -> int:
+        """
+        Fold one batch of momentums into a rollup
+
+        Returns:
+            Number of momentums folded in (0 when the rollup is caught up)
+        """
+        async with db.pool.acquire() as connection:
+            async with connection.transaction():
+                # Lock the watermark so concurrent maintainers never fold the same range twice
+                low = await connection.fetchval(
+                    f"SELECT height FROM {WATERMARK_TABLE} WHERE name = $1 FOR UPDATE",
+                    rollup["name"]
+                )
+                high = min(target, low + batch_size)
+                if high <= low:
+                    return 0
+                await connection.execute(rollup["update"], low, high)
+                await connection.execute(
+                    f"UPDATE {WATERMARK_TABLE} SET height = $2 WHERE name = $1",
+                    rollup["name"], high
+                )
+        self.stats["batches"] += 1
+        return high - low
+
+    async def run_once(self, batch_size: Optional[int] = None, max_batches: Optional[int] = 1) -> int:
+        """
+        Fold new momentums into every rollup
+
+        Args:
+            batch_size: Momentums per transaction (default rollup_batch_momentums)
+            max_batches: Batches per rollup, or None to run until caught up
+
+        Returns:
+            Number of momentums folded in, summed over the rollups
+        """
+        batch_size = batch_size or settings.rollup_batch_momentums
+        async with db.pool.acquire() as connection:
+            target = await self._target_height(connection)
+
+        folded = 0
+        for rollup in ROLLUPS:
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                count = await self._fold_batch(rollup, target, batch_size)
+                if count == 0:
+                    break
+                folded += count
+                batches += 1
+        self.stats["runs"] += 1
+        return folded
+
+    async def backfill(self, batch_size: Optional[int] = None) -> int:
+        """Fold in all of history, one bounded batch per transaction"""
+        if not self._ready:
+            raise RuntimeError("Rollup tables are not initialized")
+        batch_size = batch_size or settings.rollup_batch_momentums
+        total = 0
+        while True:
+            folded = await self.run_once(batch_size=batch_size, max_batches=1)
+            if folded == 0:
+                return total
+            total += folded
+            print(f"Rollup backfill: {total} momentums folded in")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Rollup maintenance error: {str(e)}")
+            await asyncio.sleep(settings.rollup_interval_seconds)
+
+    def start(self):
+        """Start maintaining the rollups in the background"""
+        if self._ready and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Return each rollup's watermark and how far it is behind the tip"""
+        if not self._ready:
+            return {"enabled": False, **self.stats}
+        async with db.pool.acquire() as connection:
+            tip = await connection.fetchval("SELECT MAX(height) FROM momentums") or 0
+            rows = await connection.fetch(f"SELECT name, height FROM {WATERMARK_TABLE}")
+        watermarks = {row["name"]: row["height"] for row in rows}
+        return {
+            "enabled": True,
+            **self.stats,
+            "tip": tip,
+            "rollups": {
+                name: {"watermark": watermarks.get(name, 0), "lag": tip - watermarks.get(name, 0)}
+                for name in ROLLUP_TABLES
+            }
+        }
+
+
+# Global rollup maintainer instance
+rollup_maintainer = RollupMaintainer()
@@ -0,0 +1,158 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, AsyncIterator
+from ..config import get_settings
+
+settings = get_settings()
+
+LANE_INTERACTIVE = "interactive"
+LANE_ANALYTICAL = "analytical"
+
+
+class SchedulerBusy(Exception):
+    """Raised when a lane's queue is too deep to accept more work"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"The {lane} query queue is full, please retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    Bounded-concurrency execution lane with per-client fair queuing
+
+    When every slot is taken, callers wait in a queue per client and freed
+    slots are handed out round-robin across clients, so one client submitting
+    many queries cannot starve the others.
+    """
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.active = 0
+        self.queued = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._wait_ms_avg = 0.0
+        self._service_ms_avg = 0.0
+        self.stats = {
+            "admitted": 0,
+            "queued_total": 0,
+            "rejected": 0,
+            "max_wait_ms": 0.0
+        }
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client_id: str) -> AsyncIterator[None]:
+        """
+        Hold one execution slot of the lane for the duration of the block
+
+        Args:
+            client_id: Identifier of the client the work is done for
+
+        Raises:
+            SchedulerBusy: If the lane or the client's queue is full
+        """
+        enqueued_at = time.monotonic()
+
+        if self.active < self.concurrency and self.queued == 0:
+            self.active += 1
+        else:
+            client_queue = self._queues.get(client_id)
+            if (self.queued >= settings.scheduler_max_queue_depth
+                    or (client_queue and len(client_queue) >= settings.scheduler_max_client_queue)):
+                self.stats["rejected"] += 1
+                raise SchedulerBusy(self.name, self._retry_after())
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(client_id, deque()).append(waiter)
+            self.queued += 1
+            self.stats["queued_total"] += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before we were cancelled
+                    self._release()
+                else:
+                    self._discard(client_id, waiter)
+                raise
+
+        wait_ms = (time.monotonic() - enqueued_at) * 1000
+        self._wait_ms_avg = 0.9 * self._wait_ms_avg + 0.1 * wait_ms
+        self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], wait_ms)
+        self.stats["admitted"] += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            service_ms = (time.monotonic() - started) * 1000
+            self._service_ms_avg = 0.9 * self._service_ms_avg + 0.1 * service_ms
+            self._release()
+
+    def _release(self):
+        """Hand the freed slot to the next client in round-robin order"""
+        while self._queues:
+            client_id, client_queue = next(iter(self._queues.items()))
+            waiter = client_queue.popleft()
+            self.queued -= 1
+            if client_queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, client_id: str, waiter: asyncio.Future):
+        client_queue = self._queues.get(client_id)
+        if client_queue is None or waiter not in client_queue:
+            return
+        client_queue.remove(waiter)
+        self.queued -= 1
+        if not client_queue:
+            del self._queues[client_id]
+
+    def _retry_after(self) -> int:
+        """Estimate how long the current queue takes to drain, in seconds"""
+        backlog_ms = (self.queued + 1) * max(self._service_ms_avg, 1.0) / self.concurrency
+        return max(1, math.ceil(backlog_ms / 1000))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queue_depth": self.queued,
+            "queued_clients": len(self._queues),
+            "utilization": self.active / self.concurrency,
+            "avg_wait_ms": round(self._wait_ms_avg, 3),
+            "avg_service_ms": round(self._service_ms_avg, 3)
+        }
+
+
+class QueryScheduler:
+    """Routes query execution into interactive and analytical lanes"""
+
+    def __init__(self):
+        self.lanes = {
+            LANE_INTERACTIVE: Lane(LANE_INTERACTIVE, settings.interactive_query_concurrency),
+            LANE_ANALYTICAL: Lane(LANE_ANALYTICAL, settings.heavy_query_concurrency)
+        }
+
+    def slot(self, lane: str, client_id: str):
+        """Return the context manager holding a slot in the given lane"""
+        return self.lanes[lane].slot(client_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait time and utilization per lane"""
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
+
+
+# Global query scheduler instance
+scheduler = QueryScheduler()
@@ -0,0 +1,180 @@
+import re
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from ..config import get_settings
+from ..utils.schema_context import SCHEMA_CONTEXT, EXAMPLE_QUERIES, JOIN_PARTNERS
+
+settings = get_settings()
+
+_TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9]*')
+_SECTION_PATTERN = re.compile(r'^\s*\d+\.\s+(\w+)\s+-', re.MULTILINE)
+
+# Words that carry no signal about which table a question is about
+STOPWORDS = {
+    "a", "all", "an", "and", "any", "are", "as", "at", "be", "by", "can", "do", "each",
+    "for", "from", "get", "give", "have", "how", "i", "in", "is", "it", "last", "list",
+    "many", "me", "most", "much", "my", "next", "of", "on", "or", "over", "show",
+    "than", "that", "the", "their", "them", "there", "this", "to", "top", "us", "was",
+    "what", "whats", "when", "where", "which", "who", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with a crude plural strip so 'pillars' matches 'pillar'"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def split_schema_context(context: str) -> Tuple[str, Dict[str, str], str]:
+    """
+    Split SCHEMA_CONTEXT into its preamble, one section per table and the notes
+
+    Returns:
+        Tuple of (preamble, {table name: section text}, notes)
+    """
+    notes_start = context.index("IMPORTANT NOTES:")
+    body, notes = context[:notes_start], context[notes_start:]
+
+    matches = list(_SECTION_PATTERN.finditer(body))
+    preamble = body[:matches[0].start()]
+    sections = {}
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(body)
+        sections[match.group(1).lower()] = body[match.start():end].rstrip() + "\n"
+    return preamble, sections, notes
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and SQL)"""
+    return len(text) // 4
+
+
+class BM25Index:
+    """Okapi BM25 over a small in-memory corpus, scored with NumPy"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        tokenized = [tokenize(doc) for doc in documents]
+        self.vocabulary = {
+            term: index
+            for index, term in enumerate(sorted({t for doc in tokenized for t in doc}))
+        }
+
+        self.term_counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(tokenized):
+            for term in doc:
+                self.term_counts[row, self.vocabulary[term]] += 1
+
+        doc_lengths = self.term_counts.sum(axis=1)
+        doc_freq = (self.term_counts > 0).sum(axis=0)
+        n_docs = len(documents)
+        self.idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        # Precompute the BM25 term weight of every (document, term) pair
+        norm = k1 * (1 - b + b * doc_lengths / max(doc_lengths.mean(), 1.0))
+        tf = self.term_counts
+        self.weights = self.idf * (tf * (k1 + 1)) / (tf + norm[:, None])
+
+    def score(self, query: str) -> np.ndarray:
+        """Return one BM25 score per document"""
+        query_vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term in tokenize(query):
+            index = self.vocabulary.get(term)
+            if index is not None:
+                query_vector[index] = 1.0
+        return self.weights @ query_vector
+
+    def top(self, query: str, k: int, min_ratio: float = 0.0) -> List[int]:
+        """
+        Indices of the k best matching documents
+
+        Only documents with a positive score of at least min_ratio times the
+        best score are returned.
+        """
+        scores = self.score(query)
+        order = np.argsort(-scores, kind="stable")[:k]
+        threshold = float(scores[order[0]]) * min_ratio if len(order) else 0.0
+        return [int(i) for i in order if scores[i] > 0 and scores[i] >= threshold]
+
+
+class SchemaRetriever:
+    """
+    Select the schema sections and few-shot examples relevant to a question
+
+    The index is built once from SCHEMA_CONTEXT and EXAMPLE_QUERIES, so no
+    network access is needed at request time.
+    """
+
+    def __init__(self):
+        self._built = False
+
+    def build(self):
+        """Build the table and example indexes"""
+        self.preamble, self.sections, self.notes = split_schema_context(SCHEMA_CONTEXT)
+        self.table_names = list(self.sections)
+        self.table_index = BM25Index([
+            f"{name} {text}" for name, text in self.sections.items()
+        ])
+        self.example_index = BM25Index([
+            f"{example['question']} {example['sql']}" for example in EXAMPLE_QUERIES
+        ])
+        self.full_context_tokens = estimate_tokens(SCHEMA_CONTEXT)
+        self._built = True
+
+    def select(self, question: str) -> Dict[str, Any]:
+        """
+        Pick the relevant tables and examples for a question
+
+        Args:
+            question: Natural language question from user
+
+        Returns:
+            Dictionary with schema (prompt text), tables and examples
+        """
+        if not self._built:
+            self.build()
+
+        if not settings.schema_retrieval_enabled:
+            return {
+                "schema": SCHEMA_CONTEXT,
+                "tables": list(self.table_names),
+                "examples": EXAMPLE_QUERIES[:settings.prompt_top_examples]
+            }
+
+        matched = [
+            self.table_names[i]
+            for i in self.table_index.top(question, settings.prompt_top_tables, min_ratio=0.35)
+        ]
+        if not matched:
+            # Nothing recognisable in the question, let the model see everything
+            tables = list(self.table_names)
+        else:
+            tables = list(matched)
+            for table in matched:
+                for partner in JOIN_PARTNERS.get(table, []):
+                    if partner not in tables:
+                        tables.append(partner)
+
+        example_ids = self.example_index.top(question, settings.prompt_top_examples)
+        if not example_ids:
+            example_ids = list(range(min(settings.prompt_top_examples, len(EXAMPLE_QUERIES))))
+
+        # Keep the original table order so the prompt reads like the full schema
+        schema = self.preamble + "".join(
+            self.sections[name] + "\n" for name in self.table_names if name in tables
+        ) + self.notes
+
+        return {
+            "schema": schema,
+            "tables": [name for name in self.table_names if name in tables],
+            "examples": [EXAMPLE_QUERIES[i] for i in example_ids]
+        }
+
+
+# Global schema retriever instance
+schema_retriever = SchemaRetriever()
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one shared execution
+
+    The first caller starts the work as a separate task and later callers with
+    the same key wait on it. Results and exceptions are delivered to every
+    waiter. A waiter that is cancelled only stops waiting; the shared work is
+    cancelled once nobody is waiting for it any more.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {
+            "executed": 0,
+            "deduplicated": 0
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn, or join an in-flight call with the same key
+
+        Args:
+            key: Identity of the work
+            fn: Coroutine function performing the work
+
+        Returns:
+            The result of the shared call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.stats["executed"] += 1
+        else:
+            self.stats["deduplicated"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _finish(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter left early
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.stats["executed"] + self.stats["deduplicated"]
+        return {
+            **self.stats,
+            "in_flight": len(self._calls),
+            "dedup_rate": self.stats["deduplicated"] / calls if calls else 0.0
+        }
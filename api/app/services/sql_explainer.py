@@ -0,0 +1,387 @@
+import re
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+import sqlparse
+from sqlparse.sql import Identifier, IdentifierList, Parenthesis, Where
+from sqlparse.tokens import Keyword, DML, Number, Punctuation
+from ..utils.schema_context import SCHEMA_CONTEXT
+from .schema_retriever import split_schema_context
+from .tokens import token_registry
+
+REWARD_TYPES = {
+    0: "staking",
+    1: "delegation",
+    2: "liquidity",
+    3: "sentinel",
+    4: "pillar",
+}
+
+AGGREGATES = {
+    "count": "the number of",
+    "sum": "the total",
+    "avg": "the average",
+    "min": "the minimum",
+    "max": "the maximum",
+}
+
+OPERATORS = {
+    "=": "is",
+    "!=": "is not",
+    "<>": "is not",
+    ">": "is greater than",
+    ">=": "is at least",
+    "<": "is less than",
+    "<=": "is at most",
+    "LIKE": "matches",
+    "ILIKE": "matches",
+    "NOT LIKE": "does not match",
+    "IN": "is one of",
+    "NOT IN": "is not one of",
+}
+
+_COLUMN_LINE = re.compile(r'^\s*-\s*(\w+)\s*\([^)]*\)\s*:\s*(.+)$', re.MULTILINE)
+_TABLE_LINE = re.compile(r'^\s*\d+\.\s+(\w+)\s+-\s+(.+)$', re.MULTILINE)
+_CONDITION = re.compile(
+    r'^(?P<lhs>.+?)\s*(?P<op>NOT\s+LIKE|NOT\s+IN|ILIKE|LIKE|IN|<>|!=|>=|<=|=|>|<)\s*(?P<rhs>.+)$',
+    re.IGNORECASE | re.DOTALL
+)
+_INTERVAL = re.compile(r"now\(\)\s*-\s*interval\s*'([^']+)'", re.IGNORECASE)
+_QUALIFIED = re.compile(r'^(?:(\w+)\.)?(\w+)$')
+_COLUMN_REFERENCE = re.compile(r"'[^']*'|\b(?:(\w+)\.)?([a-z_]\w*)\b(?!\s*\()", re.IGNORECASE)
+
+
+def _short_phrase(description: str) -> str:
+    # Drop parenthesised details such as units for a shorter phrase
+    phrase = re.sub(r'\s*\([^)]*\)', '', description).strip().rstrip('.')
+    return phrase[0].lower() + phrase[1:] if phrase else phrase
+
+
+def _load_descriptions() -> Tuple[Dict[str, str], Dict[str, Dict[str, str]]]:
+    """Read table and per-table column descriptions out of SCHEMA_CONTEXT"""
+    _, sections, _ = split_schema_context(SCHEMA_CONTEXT)
+    tables: Dict[str, str] = {}
+    columns: Dict[str, Dict[str, str]] = {}
+    for name, text in sections.items():
+        header = _TABLE_LINE.search(text)
+        if header:
+            tables[name] = _short_phrase(header.group(2))
+        columns[name] = {
+            column.lower(): _short_phrase(description)
+            for column, description in _COLUMN_LINE.findall(text)
+        }
+    return tables, columns
+
+
+TABLE_DESCRIPTIONS, COLUMN_DESCRIPTIONS = _load_descriptions()
+
+
+_OPEN_BETWEEN = re.compile(r'\bBETWEEN\s+[^\s]+$', re.IGNORECASE)
+
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    """Split on a keyword that is not inside parentheses or quotes"""
+    parts, depth, quoted, start = [], 0, False, 0
+    pattern = re.compile(r'\s+' + separator + r'\s+', re.IGNORECASE)
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0:
+            match = pattern.match(text, i)
+            if match:
+                parts.append(text[start:i])
+                start = i = match.end()
+                continue
+        i += 1
+    parts.append(text[start:])
+    parts = [part.strip() for part in parts if part.strip()]
+
+    if separator.upper() == "AND":
+        # Put "x BETWEEN a AND b" back together
+        merged: List[str] = []
+        for part in parts:
+            if merged and _OPEN_BETWEEN.search(merged[-1]):
+                merged[-1] = f"{merged[-1]} AND {part}"
+            else:
+                merged.append(part)
+        parts = merged
+    return parts
+
+
+def _column_name(expression: str) -> Optional[str]:
+    match = _QUALIFIED.match(expression.strip())
+    return match.group(2).lower() if match else None
+
+
+def _describe_column(expression: str, tables: Dict[str, str]) -> str:
+    """
+    Describe a column reference using the schema descriptions
+
+    Args:
+        expression: Column, optionally qualified, or an expression over columns
+        tables: Alias or table name -> table name for the tables in the query
+    """
+    references = []
+    for match in _COLUMN_REFERENCE.finditer(expression):
+        if match.group(2) is None:
+            continue
+        qualifier, column = (match.group(1) or "").lower(), match.group(2).lower()
+        candidates = [tables[qualifier]] if qualifier in tables else list(dict.fromkeys(tables.values()))
+        for table in candidates:
+            description = COLUMN_DESCRIPTIONS.get(table, {}).get(column)
+            if description:
+                references.append(description)
+                break
+
+    # Expressions over a single column, such as to_timestamp(x / 1000), read as that column
+    if len(set(references)) == 1:
+        return references[0]
+    name = _column_name(expression)
+    return name if name else expression.strip()
+
+
+def _token_symbol(literal: str) -> Optional[str]:
+    token = token_registry.by_standard(literal.strip("'"))
+    return token["symbol"] if token else None
+
+
+def _format_amount(raw: str, decimals: int) -> Optional[str]:
+    try:
+        value = Decimal(raw) / (Decimal(10) ** decimals)
+    except InvalidOperation:
+        return None
+    return f"{value.normalize():,f}"
+
+
+def _is_subquery(identifier: Identifier) -> bool:
+    return any(isinstance(token, Parenthesis) for token in identifier.tokens)
+
+
+class _Statement:
+    """The clauses of a SELECT statement, pulled out of the sqlparse token tree"""
+
+    def __init__(self, sql: str):
+        statement = sqlparse.parse(sql)[0]
+        self.distinct = False
+        self.select: List[str] = []
+        self.tables: List[Tuple[str, Optional[str]]] = []
+        self.where: Optional[str] = None
+        self.group_by: List[str] = []
+        self.order_by: List[Tuple[str, str]] = []
+        self.limit: Optional[int] = None
+
+        state = None
+        for token in statement.tokens:
+            if token.is_whitespace or token.ttype is Punctuation:
+                continue
+            if token.ttype is DML:
+                state = "select"
+                continue
+            if token.ttype in Keyword:
+                keyword = token.normalized
+                if keyword == "DISTINCT":
+                    self.distinct = True
+                elif keyword == "FROM" or "JOIN" in keyword:
+                    state = "from"
+                elif keyword == "ON":
+                    state = "on"
+                elif keyword == "GROUP BY":
+                    state = "group"
+                elif keyword == "ORDER BY":
+                    state = "order"
+                elif keyword == "LIMIT":
+                    state = "limit"
+                else:
+                    state = None
+                continue
+            if isinstance(token, Where):
+                self.where = str(token).strip()[len("WHERE"):].strip().rstrip(';').strip()
+                continue
+
+            items = list(token.get_identifiers()) if isinstance(token, IdentifierList) else [token]
+            for item in items:
+                if state == "select":
+                    self.select.append(str(item).strip())
+                elif state == "from" and isinstance(item, Identifier) and not _is_subquery(item):
+                    self.tables.append((item.get_real_name().lower(), item.get_alias()))
+                elif state == "group":
+                    self.group_by.append(str(item).strip())
+                elif state == "order":
+                    ordering = item.get_ordering() if isinstance(item, Identifier) else None
+                    text = str(item).strip()
+                    if ordering:
+                        text = text[:-len(ordering)].strip()
+                    self.order_by.append((text, ordering or "ASC"))
+                elif state == "limit" and item.ttype in Number:
+                    self.limit = int(str(item))
+
+
+_AGGREGATE = re.compile(r'^(count|sum|avg|min|max)\s*\((distinct\s+)?(.*)\)$', re.IGNORECASE | re.DOTALL)
+_AGGREGATE_CALL = re.compile(r'\b(?:count|sum|avg|min|max)\s*\(', re.IGNORECASE)
+
+
+def _describe_select_item(item: str, tables: Dict[str, str]) -> str:
+    expression, alias = item, None
+    match = re.match(r'^(.*?)\s+AS\s+(\w+)$', item, re.IGNORECASE | re.DOTALL)
+    if match:
+        expression, alias = match.group(1), match.group(2)
+
+    aggregate = _AGGREGATE.match(expression.strip())
+    if aggregate:
+        function, distinct, argument = aggregate.groups()
+        if function.lower() == "count":
+            if argument.strip() == "*":
+                return "the number of rows"
+            return f"the number of {'distinct ' if distinct else ''}{_describe_column(argument, tables)} values"
+        return f"{AGGREGATES[function.lower()]} {_describe_column(argument, tables)}"
+
+    if alias:
+        return alias.replace("_", " ")
+    return _describe_column(expression, tables)
+
+
+def _strip_parentheses(text: str) -> str:
+    """Remove parentheses that wrap the whole expression"""
+    while text.startswith("(") and text.endswith(")"):
+        depth = 0
+        for index, char in enumerate(text):
+            depth += char == "("
+            depth -= char == ")"
+            if depth == 0 and index < len(text) - 1:
+                return text
+        text = text[1:-1].strip()
+    return text
+
+
+def _describe_condition(condition: str, tables: Dict[str, str], token_decimals: Optional[Tuple[str, int]]) -> str:
+    condition = _strip_parentheses(condition)
+    alternatives = _split_top_level(condition, "OR")
+    if len(alternatives) > 1:
+        return "either " + " or ".join(
+            _describe_condition(part, tables, token_decimals) for part in alternatives
+        )
+    conjuncts = _split_top_level(condition, "AND")
+    if len(conjuncts) > 1:
+        return " and ".join(_describe_condition(part, tables, token_decimals) for part in conjuncts)
+
+    between = re.match(r'^(.+?)\s+BETWEEN\s+(.+?)\s+AND\s+(.+)$', condition, re.IGNORECASE | re.DOTALL)
+    if between:
+        subject = _describe_column(between.group(1), tables)
+        return f"{subject} is between {between.group(2)} and {between.group(3)}"
+
+    match = _CONDITION.match(condition)
+    if match is None:
+        return condition
+    lhs, rhs = match.group("lhs"), match.group("rhs").strip()
+    op = re.sub(r'\s+', ' ', match.group("op").upper())
+    column = _column_name(lhs) or ""
+    subject = _describe_column(lhs, tables)
+
+    symbol = _token_symbol(rhs) if column == "tokenstandard" else None
+    if symbol:
+        return f"the token is {symbol}"
+    if column == "rewardtype" and rhs.isdigit() and int(rhs) in REWARD_TYPES:
+        return f"the reward type is {REWARD_TYPES[int(rhs)]}"
+    if column.endswith("timestamp"):
+        interval = _INTERVAL.search(rhs)
+        if interval and op in (">", ">="):
+            return f"it happened in the last {interval.group(1)}"
+        if rhs.isdigit():
+            moment = datetime.fromtimestamp(int(rhs) / 1000, tz=timezone.utc)
+            rhs = moment.strftime("%Y-%m-%d %H:%M UTC")
+    if column in ("amount", "balance") and rhs.isdigit() and token_decimals:
+        formatted = _format_amount(rhs, token_decimals[1])
+        if formatted:
+            rhs = f"{formatted} {token_decimals[0]}"
+    if column in ("qsramount", "znnamount") and rhs.isdigit():
+        formatted = _format_amount(rhs, 8)
+        if formatted:
+            rhs = f"{formatted} {column[:3].upper()}"
+    if rhs.lower() in ("true", "false") and op == "=":
+        return f"{subject} is {rhs.lower()}"
+    return f"{subject} {OPERATORS.get(op, op.lower())} {rhs}"
+
+
+def explain_sql(sql: str) -> str:
+    """
+    Describe what a SELECT statement does without calling the language model
+
+    Args:
+        sql: Validated SELECT statement
+
+    Returns:
+        One or two sentences summarising the tables, filters, aggregates,
+        ordering and limit of the query
+    """
+    statement = _Statement(sqlparse.format(sql, strip_comments=True))
+    if not statement.tables:
+        if re.search(r'\bFROM\b', sql, re.IGNORECASE):
+            return "This query reads from a subquery."
+        return "This query computes a value without reading any table."
+
+    tables: Dict[str, str] = {}
+    for name, alias in statement.tables:
+        tables[name] = name
+        if alias:
+            tables[alias.lower()] = name
+
+    # AND binds tighter than OR, so a top-level OR leaves the WHERE clause as one condition
+    conditions = []
+    if statement.where:
+        where = _strip_parentheses(statement.where)
+        if len(_split_top_level(where, "OR")) > 1:
+            conditions = [where]
+        else:
+            conditions = _split_top_level(where, "AND")
+
+    # Amount filters read better in whole tokens when the query is pinned to one token
+    token_decimals = None
+    for condition in conditions:
+        match = re.match(r"^(?:\w+\.)?tokenstandard\s*=\s*('[^']+')$", condition, re.IGNORECASE)
+        if match:
+            token = token_registry.by_standard(match.group(1).strip("'"))
+            if token:
+                token_decimals = (token["symbol"], token["decimals"])
+
+    if "*" in statement.select:
+        what = "all columns"
+    else:
+        what = ", ".join(dict.fromkeys(_describe_select_item(item, tables) for item in statement.select))
+    # Arithmetic on an aggregate, such as SUM(amount) / 1e8, is still a calculation
+    aggregated = any(_AGGREGATE_CALL.search(item) for item in statement.select)
+
+    main_table = statement.tables[0][0]
+    source = f"{main_table} ({TABLE_DESCRIPTIONS.get(main_table, main_table).lower()})"
+    joined = list(dict.fromkeys(table for table, _ in statement.tables[1:]))
+    if joined:
+        source += " joined with " + ", ".join(joined)
+
+    verb = "calculates" if aggregated else "lists"
+    if statement.distinct:
+        what = "distinct " + what
+    sentence = f"This query {verb} {what} from {source}"
+    if statement.group_by:
+        sentence += " for each " + ", ".join(_describe_column(column, tables) for column in statement.group_by)
+    if conditions:
+        sentence += " where " + ", and ".join(
+            _describe_condition(condition, tables, token_decimals) for condition in conditions
+        )
+    sentence += "."
+
+    details = []
+    if statement.order_by:
+        details.append("sorted by " + ", ".join(
+            f"{_describe_select_item(column, tables)} {'descending' if direction == 'DESC' else 'ascending'}"
+            for column, direction in statement.order_by
+        ))
+    if statement.limit is not None:
+        details.append(f"limited to {statement.limit} row{'s' if statement.limit != 1 else ''}")
+    if details:
+        sentence += " Results are " + " and ".join(details) + "."
+    return sentence
@@ -0,0 +1,378 @@
+import re
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from typing import Dict, List, Optional, Tuple
+import sqlparse
+from sqlparse.sql import Parenthesis
+from sqlparse.tokens import Keyword
+from ..utils.schema_context import SCHEMA_CONTEXT
+from .schema_retriever import split_schema_context
+
+_COLUMN_TYPE = re.compile(r'^\s*-\s+(\w+)\s+\((\w+)', re.MULTILINE)
+
+INTEGER_TYPES = {"BIGINT", "INT", "INTEGER", "SMALLINT", "SERIAL"}
+
+# Columns holding canonical lowercase values (bech32 addresses, hex hashes, token standards)
+LOWERCASE_COLUMNS = {
+    "address", "toaddress", "owneraddress", "produceraddress", "withdrawaddress", "beneficiary",
+    "owner", "producer", "producerowner", "delegate", "voteraddress", "sourceaddress",
+    "hash", "momentumhash", "pairedaccountblock", "descendantof", "tokenstandard",
+}
+
+_NOT_ALIASES = {
+    "where", "join", "on", "group", "order", "limit", "offset", "left", "right", "inner",
+    "outer", "cross", "full", "natural", "lateral", "union", "using", "having", "window",
+    "and", "or", "select", "from", "as", "fetch", "for",
+}
+
+
+def _load_column_types() -> Dict[str, Dict[str, str]]:
+    """Read the declared type of every column out of SCHEMA_CONTEXT"""
+    _, sections, _ = split_schema_context(SCHEMA_CONTEXT)
+    return {
+        table: {column.lower(): kind.upper() for column, kind in _COLUMN_TYPE.findall(text)}
+        for table, text in sections.items()
+    }
+
+
+COLUMN_TYPES = _load_column_types()
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """Map every known table name and alias in a lowercase statement to its table"""
+    aliases: Dict[str, str] = {}
+    for table in COLUMN_TYPES:
+        for match in re.finditer(rf"\b{table}\b(?!\.)(?:\s+(?:as\s+)?(\w+))?", sql):
+            aliases[table] = table
+            alias = match.group(1)
+            if alias and alias not in _NOT_ALIASES and alias not in COLUMN_TYPES:
+                aliases[alias] = table
+    return aliases
+
+
+def resolve_column(qualifier: Optional[str], column: str, aliases: Dict[str, str]) -> List[str]:
+    """Tables in the statement that a column reference can belong to"""
+    if qualifier:
+        table = aliases.get(qualifier.lower())
+        return [table] if table and column in COLUMN_TYPES[table] else []
+    return sorted(table for table in set(aliases.values()) if column in COLUMN_TYPES[table])
+
+
+def _is_integer(reference: str, aliases: Dict[str, str]) -> bool:
+    qualifier, _, column = reference.lower().rpartition(".")
+    tables = resolve_column(qualifier or None, column, aliases)
+    return bool(tables) and all(COLUMN_TYPES[table][column] in INTEGER_TYPES for table in tables)
+
+
+# Operand boundaries at the top level of an expression: keywords that end it or bind
+# looser than arithmetic, comparison operators (but not casts or JSON arrows), and punctuation
+_BOUNDARY = re.compile(
+    r"\s*(?:\b(?:AND|OR|ORDER|GROUP|LIMIT|OFFSET|HAVING|UNION|INTERSECT|EXCEPT|THEN|ELSE|END|WHEN|WINDOW|"
+    r"AS|IS|ISNULL|NOTNULL|FROM|WHERE|NOT|BETWEEN|IN|LIKE|ILIKE|SIMILAR|COLLATE|ASC|DESC|NULLS)\b|"
+    r"(?<![-<>!=~#@])(?:<>|!=|<=|>=|=|<|>)(?![>=])|[,;)]|$)",
+    re.IGNORECASE
+)
+_REFERENCE = r"((?:[a-z_]\w*\.)?[a-z_]\w*)"
+_ARITHMETIC_BEFORE = re.compile(r"[-+*/%^.]\s*$|::\s*$")
+
+_TO_TIMESTAMP = re.compile(
+    r"\bto_timestamp\s*\(\s*" + _REFERENCE + r"\s*/\s*(1000(?:\.0*)?)\s*\)\s*(>=|<=|>|<)\s*",
+    re.IGNORECASE
+)
+_EPOCH_COMPARISON = re.compile(_REFERENCE + r"\s*(>=|<=|>|<)\s*(?=\(*\s*EXTRACT\s*\(\s*EPOCH\b)", re.IGNORECASE)
+_CASE_FOLD = re.compile(
+    r"\b(lower|upper)\s*\(\s*" + _REFERENCE + r"\s*\)\s*(=|LIKE)\s*(\x00\d+\x00)",
+    re.IGNORECASE
+)
+_SCALED = re.compile(
+    _REFERENCE + r"\s*/\s*(\d+\.\d*|\d+\s*::\s*numeric)\s*(>=|<=|>|<|=)\s*(\d+(?:\.\d+)?)(?!\s*[-+*/%^.\d(])",
+    re.IGNORECASE
+)
+
+
+def _operand_end(text: str, start: int) -> int:
+    """End of the expression starting at start, at the first top-level boundary"""
+    depth = 0
+    index = start
+    while index < len(text):
+        char = text[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0:
+            boundary = _BOUNDARY.match(text, index)
+            # A keyword only counts where a word starts, not in the middle of an identifier
+            if boundary and boundary.end() > index and not (
+                (char.isalnum() or char == "_") and (text[index - 1:index].isalnum() or text[index - 1:index] == "_")
+            ):
+                break
+        index += 1
+    while index > start and text[index - 1].isspace():
+        index -= 1
+    return index
+
+
+def _integer_bound(op: str, value: str) -> str:
+    """
+    Integer bound equivalent to comparing an integer column with a fractional value
+
+    col > x  <=>  col > floor(x)      col >= x  <=>  col >= ceil(x)
+    col < x  <=>  col < ceil(x)       col <= x  <=>  col <= floor(x)
+    """
+    function = "floor" if op in (">", "<=") else "ceil"
+    return f"{function}({value})::bigint"
+
+
+def _decimal_bound(op: str, value: Decimal) -> str:
+    rounding = ROUND_FLOOR if op in (">", "<=") else ROUND_CEILING
+    return str(value.to_integral_value(rounding=rounding))
+
+
+class _Rewrite:
+    def __init__(self, sql: str):
+        # String literals are set aside so patterns never match inside them
+        self.literals: List[str] = []
+
+        def stash(match: re.Match) -> str:
+            self.literals.append(match.group(0))
+            return f"\x00{len(self.literals) - 1}\x00"
+
+        self.text = re.sub(r"'(?:[^']|'')*'", stash, sql)
+        self.aliases = table_aliases(re.sub(r"\x00\d+\x00", "''", sql.lower()))
+        self.applied: List[str] = []
+
+    def restore(self, text: str) -> str:
+        return re.sub(r"\x00(\d+)\x00", lambda m: self.literals[int(m.group(1))], text)
+
+    def _preceded_by_arithmetic(self, start: int) -> bool:
+        return bool(_ARITHMETIC_BEFORE.search(self.text[:start]))
+
+    def _replace(self, start: int, end: int, replacement: str):
+        self.applied.append(f"{self.restore(self.text[start:end])} → {self.restore(replacement)}")
+        self.text = self.text[:start] + replacement + self.text[end:]
+
+    def _apply(self, pattern: re.Pattern, build):
+        position = 0
+        while True:
+            match = pattern.search(self.text, position)
+            if match is None:
+                return
+            rewritten = None if self._preceded_by_arithmetic(match.start()) else build(match)
+            if rewritten is None:
+                position = match.end()
+                continue
+            end, replacement = rewritten
+            self._replace(match.start(), end, replacement)
+            position = match.start() + len(replacement)
+
+    def to_timestamp(self, match: re.Match) -> Optional[Tuple[int, str]]:
+        """to_timestamp(col / 1000) > T  =>  col >= (floor(epoch(T)) + 1) * 1000"""
+        column, divisor, op = match.group(1), match.group(2), match.group(3)
+        if not column.lower().endswith("timestamp") or not _is_integer(column, self.aliases):
+            return None
+        end = _operand_end(self.text, match.end())
+        if end == match.end():
+            return None
+        epoch = f"EXTRACT(EPOCH FROM ({self.text[match.end():end]})::timestamptz)"
+        if "." in divisor:
+            return end, f"{column} {op} {_integer_bound(op, f'{epoch} * 1000')}"
+
+        # Integer division truncates to whole seconds first
+        if op == ">":
+            return end, f"{column} >= ((floor({epoch}) + 1) * 1000)::bigint"
+        if op == ">=":
+            return end, f"{column} >= (ceil({epoch}) * 1000)::bigint"
+        if op == "<":
+            return end, f"{column} < (ceil({epoch}) * 1000)::bigint"
+        return end, f"{column} < ((floor({epoch}) + 1) * 1000)::bigint"
+
+    def epoch_comparison(self, match: re.Match) -> Optional[Tuple[int, str]]:
+        """col > EXTRACT(EPOCH ...) * 1000 compares in numeric; bound it as a bigint instead"""
+        column, op = match.group(1), match.group(2)
+        if not _is_integer(column, self.aliases):
+            return None
+        end = _operand_end(self.text, match.end())
+        operand = self.text[match.end():end]
+        if re.search(r"::\s*(bigint|int8|integer|int)\s*$", operand, re.IGNORECASE):
+            return None
+        return end, f"{column} {op} {_integer_bound(op, operand)}"
+
+    def case_fold(self, match: re.Match) -> Optional[Tuple[int, str]]:
+        """lower(address) = 'z1...'  =>  address = 'z1...' (the column is stored lowercase)"""
+        function, column, op, literal = match.groups()
+        if column.lower().rpartition(".")[2] not in LOWERCASE_COLUMNS:
+            return None
+        if function.lower() == "upper":
+            value = self.literals[int(literal.strip("\x00"))]
+            if op.upper() != "=" or value != value.upper():
+                return None
+            self.literals.append(value.lower())
+            literal = f"\x00{len(self.literals) - 1}\x00"
+        return match.end(), f"{column} {op.upper()} {literal}"
+
+    def scaled(self, match: re.Match) -> Optional[Tuple[int, str]]:
+        """amount / 100000000.0 > 1000  =>  amount > 100000000000 (the token has 8 decimals)"""
+        column, divisor, op, constant = match.groups()
+        if not _is_integer(column, self.aliases):
+            return None
+        scale = Decimal(re.sub(r"\s*::\s*numeric", "", divisor, flags=re.IGNORECASE))
+        # Dividing by a power of ten is exact in numeric; other divisors round
+        if scale <= 0 or scale.normalize().as_tuple().digits != (1,):
+            return None
+        bound = Decimal(constant) * scale
+        if op == "=":
+            if bound != bound.to_integral_value():
+                return None
+            return match.end(), f"{column} = {bound.to_integral_value()}"
+        return match.end(), f"{column} {op} {_decimal_bound(op, bound)}"
+
+    def run(self) -> str:
+        self._apply(_TO_TIMESTAMP, self.to_timestamp)
+        self._apply(_EPOCH_COMPARISON, self.epoch_comparison)
+        self._apply(_CASE_FOLD, self.case_fold)
+        self._apply(_SCALED, self.scaled)
+        return self.restore(self.text)
+
+
+def rewrite_sql(sql: str) -> Tuple[str, List[str]]:
+    """
+    Rewrite predicates that defeat indexes into comparisons on the raw columns
+
+    Every rewrite preserves the query's result. Integer-division and
+    timestamp rewrites assume non-negative values, which holds for heights,
+    amounts and timestamps. Case-folding rewrites rely on addresses, hashes
+    and token standards being stored in lowercase.
+
+    Args:
+        sql: Cleaned and validated SELECT statement
+
+    Returns:
+        Tuple of (rewritten SQL, description of each rewrite applied)
+    """
+    rewrite = _Rewrite(sql)
+    rewritten = rewrite.run()
+    return rewritten, rewrite.applied
+
+
+def hoist_limit(sql: str, limit: int) -> Optional[str]:
+    """
+    Put a row cap directly on a query that sorts but has no LIMIT
+
+    A LIMIT on the sorting query itself lets the planner pick a top-N sort or
+    an ordered index scan that stops early.
+
+    Returns:
+        The query with LIMIT appended, or None if it can't be hoisted
+    """
+    statement = sqlparse.parse(sql.strip().rstrip(";"))[0]
+    ordered = False
+    for token in statement.tokens:
+        if isinstance(token, Parenthesis) or token.ttype not in Keyword:
+            continue
+        keyword = token.normalized
+        if keyword == "ORDER BY":
+            ordered = True
+        elif keyword in ("LIMIT", "OFFSET", "FETCH", "FOR"):
+            return None
+    if not ordered:
+        return None
+    return f"{str(statement).strip()}\nLIMIT {int(limit)}"
+
+
+# Pairs of (query, expected rewrite) over literal rows including the boundary
+# values; python -m app.cli check-rewrites checks the rewrites and runs both
+# sides of each pair against the database to confirm they return the same rows.
+REWRITE_CORPUS: List[Tuple[str, str]] = [
+    (
+        "SELECT amount FROM (VALUES (99999999999::bigint), (100000000000), (100000000001)) AS accountblocks(amount) "
+        "WHERE amount / 100000000.0 > 1000",
+        "SELECT amount FROM (VALUES (99999999999::bigint), (100000000000), (100000000001)) AS accountblocks(amount) "
+        "WHERE amount > 100000000000",
+    ),
+    (
+        "SELECT amount FROM (VALUES (0::bigint), (12345678), (12345679)) AS accountblocks(amount) "
+        "WHERE amount / 100000000.0 >= 0.123456785",
+        "SELECT amount FROM (VALUES (0::bigint), (12345678), (12345679)) AS accountblocks(amount) "
+        "WHERE amount >= 12345679",
+    ),
+    (
+        "SELECT amount FROM (VALUES (12345678::bigint), (12345679)) AS accountblocks(amount) "
+        "WHERE amount / 100000000.0 <= 0.123456785",
+        "SELECT amount FROM (VALUES (12345678::bigint), (12345679)) AS accountblocks(amount) "
+        "WHERE amount <= 12345678",
+    ),
+    (
+        "SELECT amount FROM (VALUES (100000000::bigint), (150000000)) AS accountblocks(amount) "
+        "WHERE amount / 100000000.0 = 1.5",
+        "SELECT amount FROM (VALUES (100000000::bigint), (150000000)) AS accountblocks(amount) "
+        "WHERE amount = 150000000",
+    ),
+    (
+        "SELECT momentumtimestamp FROM (VALUES (1700000000999::bigint), (1700000001000), (1700000001999)) "
+        "AS accountblocks(momentumtimestamp) WHERE to_timestamp(momentumtimestamp / 1000) > to_timestamp(1700000000.5)",
+        "SELECT momentumtimestamp FROM (VALUES (1700000000999::bigint), (1700000001000), (1700000001999)) "
+        "AS accountblocks(momentumtimestamp) WHERE momentumtimestamp >= "
+        "((floor(EXTRACT(EPOCH FROM (to_timestamp(1700000000.5))::timestamptz)) + 1) * 1000)::bigint",
+    ),
+    (
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000999), (1700000001000)) "
+        "AS accountblocks(momentumtimestamp) WHERE to_timestamp(momentumtimestamp / 1000) <= to_timestamp(1700000000)",
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000999), (1700000001000)) "
+        "AS accountblocks(momentumtimestamp) WHERE momentumtimestamp < "
+        "((floor(EXTRACT(EPOCH FROM (to_timestamp(1700000000))::timestamptz)) + 1) * 1000)::bigint",
+    ),
+    (
+        "SELECT momentumtimestamp FROM (VALUES (1700000000499::bigint), (1700000000500), (1700000000501)) "
+        "AS accountblocks(momentumtimestamp) WHERE to_timestamp(momentumtimestamp / 1000.0) < to_timestamp(1700000000.5)",
+        "SELECT momentumtimestamp FROM (VALUES (1700000000499::bigint), (1700000000500), (1700000000501)) "
+        "AS accountblocks(momentumtimestamp) WHERE momentumtimestamp < "
+        "ceil(EXTRACT(EPOCH FROM (to_timestamp(1700000000.5))::timestamptz) * 1000)::bigint",
+    ),
+    (
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000001)) "
+        "AS accountblocks(momentumtimestamp) WHERE momentumtimestamp > (EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000)",
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000001)) "
+        "AS accountblocks(momentumtimestamp) WHERE momentumtimestamp > "
+        "floor((EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000))::bigint",
+    ),
+    (
+        "SELECT address FROM (VALUES ('z1qqjnwjjpnue8xmmpanz6csze6tcmtzzdtfsww7'), ('z1qzal6c5s9rjnnxd2z7dvdhjxpmmj4fmw56a0mz')) "
+        "AS accounts(address) WHERE lower(address) = 'z1qqjnwjjpnue8xmmpanz6csze6tcmtzzdtfsww7'",
+        "SELECT address FROM (VALUES ('z1qqjnwjjpnue8xmmpanz6csze6tcmtzzdtfsww7'), ('z1qzal6c5s9rjnnxd2z7dvdhjxpmmj4fmw56a0mz')) "
+        "AS accounts(address) WHERE address = 'z1qqjnwjjpnue8xmmpanz6csze6tcmtzzdtfsww7'",
+    ),
+    (
+        "SELECT tokenstandard FROM (VALUES ('zts1znnxxxxxxxxxxxxx9z4ulx'), ('zts1qsrxxxxxxxxxxxxxmrhjll')) "
+        "AS tokens(tokenstandard) WHERE upper(tokenstandard) = 'ZTS1ZNNXXXXXXXXXXXXX9Z4ULX'",
+        "SELECT tokenstandard FROM (VALUES ('zts1znnxxxxxxxxxxxxx9z4ulx'), ('zts1qsrxxxxxxxxxxxxxmrhjll')) "
+        "AS tokens(tokenstandard) WHERE tokenstandard = 'zts1znnxxxxxxxxxxxxx9z4ulx'",
+    ),
+    (
+        # Comparisons in the select list end at their alias
+        "SELECT momentumtimestamp, momentumtimestamp > EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000 AS recent "
+        "FROM (VALUES (1700000000000::bigint), (1700000000001)) AS accountblocks(momentumtimestamp)",
+        "SELECT momentumtimestamp, momentumtimestamp > "
+        "floor(EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000)::bigint AS recent "
+        "FROM (VALUES (1700000000000::bigint), (1700000000001)) AS accountblocks(momentumtimestamp)",
+    ),
+    (
+        "SELECT momentumtimestamp, to_timestamp(momentumtimestamp / 1000) > to_timestamp(1700000000.5) AS recent "
+        "FROM (VALUES (1700000000999::bigint), (1700000001000), (1700000001999)) AS accountblocks(momentumtimestamp)",
+        "SELECT momentumtimestamp, momentumtimestamp >= "
+        "((floor(EXTRACT(EPOCH FROM (to_timestamp(1700000000.5))::timestamptz)) + 1) * 1000)::bigint AS recent "
+        "FROM (VALUES (1700000000999::bigint), (1700000001000), (1700000001999)) AS accountblocks(momentumtimestamp)",
+    ),
+    (
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000001)) AS accountblocks(momentumtimestamp) "
+        "WHERE momentumtimestamp > EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000 IS TRUE",
+        "SELECT momentumtimestamp FROM (VALUES (1700000000000::bigint), (1700000000001)) AS accountblocks(momentumtimestamp) "
+        "WHERE momentumtimestamp > floor(EXTRACT(EPOCH FROM to_timestamp(1700000000.0005)) * 1000)::bigint IS TRUE",
+    ),
+    (
+        # Part of a larger expression: left alone
+        "SELECT amount FROM (VALUES (100::bigint)) AS accountblocks(amount) WHERE 2 * amount / 100.0 > 1",
+        "SELECT amount FROM (VALUES (100::bigint)) AS accountblocks(amount) WHERE 2 * amount / 100.0 > 1",
+    ),
+]
@@ -0,0 +1,301 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import get_settings
+from .database import db
+from .result_cache import APPEND_ONLY_TABLES, MUTABLE_COLUMNS
+from .scheduler import SchedulerBusy
+from .sql_rewriter import table_aliases
+
+settings = get_settings()
+
+MODE_INCREMENTAL = "incremental"
+MODE_FULL = "full"
+
+SUBSCRIPTION_CLIENT = "subscriptions"
+
+# Tables whose new rows can be found by momentum height alone
+DELTA_TABLES = {table: APPEND_ONLY_TABLES[table] for table in ("accountblocks", "rewardtransactions", "votes")}
+
+_AGGREGATE = re.compile(
+    r"\b(count|sum|avg|min|max|array_agg|string_agg|json_agg|jsonb_agg|bool_and|bool_or|every|"
+    r"stddev|stddev_pop|stddev_samp|variance|var_pop|var_samp|percentile_cont|percentile_disc|mode)\s*\("
+)
+_NOT_INCREMENTAL = re.compile(r"\b(group\s+by|having|distinct|over|offset|fetch|union|intersect|except|with)\b")
+_JOIN = re.compile(r"\bjoin\b")
+_FIRST_ORDER_KEY = re.compile(r"\border\s+by\s+(?:(\w+)\.)?(\w+)(\s+desc)?\b")
+_WHERE = re.compile(r"\bwhere\b", re.IGNORECASE)
+_CLAUSE_AFTER_WHERE = re.compile(r"\b(group\s+by|order\s+by|limit|offset|fetch)\b", re.IGNORECASE)
+_CLAUSE_AFTER_FROM = re.compile(r"\b(where|group\s+by|order\s+by|limit|offset|fetch)\b", re.IGNORECASE)
+
+
+def delta_column(sql: str) -> Optional[str]:
+    """
+    Decide whether new results of a query can be computed from new rows alone
+
+    That holds for a single SELECT over one instance of one of DELTA_TABLES
+    (no joins, not even self-joins, and no other FROM items) without
+    aggregation, grouping, DISTINCT or window functions, selecting only
+    columns the indexer never rewrites. A LIMIT is only allowed behind an
+    ORDER BY on the momentum height (or timestamp) descending, so new rows
+    always sort first.
+
+    Args:
+        sql: SQL query text
+
+    Returns:
+        The qualified momentum height column to filter on, or None if the
+        query has to be re-evaluated in full
+    """
+    lowered = sql.lower().strip().rstrip(';')
+    if len(re.findall(r"\bselect\b", lowered)) != 1:
+        return None
+    if _AGGREGATE.search(lowered) or _NOT_INCREMENTAL.search(lowered):
+        return None
+
+    # New rows of one table instance can't be matched against the rows of another,
+    # so self-joins are as unsafe as joins of different tables
+    if _JOIN.search(lowered) or "," in _from_clause(lowered):
+        return None
+
+    aliases = table_aliases(lowered)
+    tables = set(aliases.values())
+    if len(tables) != 1 or next(iter(tables)) not in DELTA_TABLES:
+        return None
+    table = next(iter(tables))
+    if table == "accountblocks":
+        if any(column in lowered for column in MUTABLE_COLUMNS) or re.search(r"(?<!\()\*", lowered):
+            return None
+
+    column = DELTA_TABLES[table]
+    if re.search(r"\blimit\b", lowered):
+        order = _FIRST_ORDER_KEY.search(lowered)
+        if not order or not order.group(3) or order.group(2) not in (column, "momentumtimestamp"):
+            return None
+
+    qualifier = next((alias for alias, target in aliases.items() if alias != table), table)
+    return f"{qualifier}.{column}"
+
+
+def _from_clause(sql: str) -> str:
+    """The FROM list of a single SELECT, skipping FROM inside function calls such as EXTRACT"""
+    depth = 0
+    for match in re.finditer(r"[()]|\bfrom\b", sql):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            end = _CLAUSE_AFTER_FROM.search(sql, match.end())
+            return sql[match.end():end.start() if end else len(sql)]
+    return ""
+
+
+def delta_query(sql: str, column: str, after: int, upto: int) -> str:
+    """Restrict a query to rows with after < column <= upto"""
+    query = sql.strip().rstrip(';').strip()
+    bounds = f"{column} > {int(after)} AND {column} <= {int(upto)}"
+    where = _WHERE.search(query)
+    if where:
+        end = _CLAUSE_AFTER_WHERE.search(query, where.end())
+        end = end.start() if end else len(query)
+        condition = query[where.end():end].strip()
+        return f"{query[:where.start()]}WHERE ({condition}) AND {bounds}\n{query[end:]}".rstrip()
+    start = re.search(r"\bfrom\b", query, re.IGNORECASE).end()
+    end = _CLAUSE_AFTER_FROM.search(query, start)
+    end = end.start() if end else len(query)
+    return f"{query[:end].rstrip()}\nWHERE {bounds}\n{query[end:]}".rstrip()
+
+
+def _row_key(row: Dict[str, Any]) -> str:
+    return json.dumps(row, sort_keys=True, default=str)
+
+
+class Subscription:
+    """A registered query and the events waiting to be sent to its subscriber"""
+
+    def __init__(self, subscription_id: int, sql: str, params: Optional[List[Any]], column: Optional[str]):
+        self.id = subscription_id
+        self.sql = sql
+        self.params = params
+        self.column = column
+        self.mode = MODE_INCREMENTAL if column else MODE_FULL
+        self.height = 0
+        self.keys: Dict[str, Dict[str, Any]] = {}
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=settings.subscription_queue_size)
+        self.created_at = time.time()
+        self.pushed = 0
+
+    def push(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; a subscriber that falls this far behind is dropped"""
+        try:
+            self.events.put_nowait(event)
+            self.pushed += 1
+            return True
+        except asyncio.QueueFull:
+            while not self.events.empty():
+                self.events.get_nowait()
+            self.events.put_nowait({"event": "error", "error": "Subscriber is too slow, subscription closed"})
+            return False
+
+
+class SubscriptionManager:
+    """
+    Keep registered queries up to date as the indexer commits momentums
+
+    One shared watcher polls the indexed tip. When it advances, every
+    subscription is brought up to the new height: queries over append-only
+    tables only run over the momentums added since their last height and
+    push the rows found there; other queries run in full and push the rows
+    that are new or changed (and the ones that went away). The tip is
+    capped at the height every healthy replica has reached, so a query
+    served by a replica never skips momentums.
+    """
+
+    def __init__(self):
+        self.subscriptions: Dict[int, Subscription] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+        self._slots = asyncio.Semaphore(settings.subscription_concurrency)
+        self.height = 0
+        self.stats = {"subscribed": 0, "evaluations": 0, "incremental": 0, "full": 0, "errors": 0, "dropped": 0}
+
+    async def _covered_height(self) -> int:
+        return db.replicas.covered_height(await db.get_indexed_height())
+
+    async def subscribe(
+        self,
+        sql: str,
+        params: Optional[List[Any]] = None,
+        client_id: str = SUBSCRIPTION_CLIENT
+    ) -> Tuple[Subscription, List[Dict[str, Any]], bool]:
+        """
+        Register a query and evaluate it once
+
+        Args:
+            sql: Validated SELECT query
+            params: Query parameters for parameterized queries
+            client_id: Client the first evaluation is queued for; re-evaluations
+                are shared work and run as SUBSCRIPTION_CLIENT
+
+        Returns:
+            Tuple of (subscription, initial results, truncated)
+        """
+        subscription = Subscription(next(self._ids), sql, params, delta_column(sql))
+        height = await self._covered_height()
+        if subscription.column:
+            # Bound the first result too, so the first delta starts exactly where it ends
+            query = delta_query(sql, subscription.column, 0, height)
+        else:
+            query = sql
+        results, truncated = await db.execute_query(query, params, client_id=client_id)
+
+        subscription.height = height
+        if subscription.mode == MODE_FULL:
+            subscription.keys = {_row_key(row): row for row in results}
+        self.subscriptions[subscription.id] = subscription
+        self.stats["subscribed"] += 1
+        return subscription, results, truncated
+
+    @property
+    def full(self) -> bool:
+        return len(self.subscriptions) >= settings.subscription_max
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.pop(subscription.id, None)
+
+    async def _evaluate(self, subscription: Subscription, height: int):
+        """Bring one subscription up to height and push what changed"""
+        async with self._slots:
+            if subscription.mode == MODE_INCREMENTAL:
+                query = delta_query(subscription.sql, subscription.column, subscription.height, height)
+            else:
+                query = subscription.sql
+            try:
+                results, truncated = await db.execute_query(
+                    query, subscription.params, client_id=SUBSCRIPTION_CLIENT
+                )
+            except (SchedulerBusy, ValueError) as e:
+                # Keep the old height; the next tip advance retries the same range
+                self.stats["errors"] += 1
+                print(f"Subscription {subscription.id} evaluation failed: {str(e)}")
+                return
+        if subscription.id not in self.subscriptions:
+            return
+
+        self.stats["evaluations"] += 1
+        self.stats[subscription.mode] += 1
+        subscription.height = height
+        if subscription.mode == MODE_INCREMENTAL:
+            rows, removed = results, []
+        else:
+            keys = {_row_key(row): row for row in results}
+            rows = [row for key, row in keys.items() if key not in subscription.keys]
+            removed = [row for key, row in subscription.keys.items() if key not in keys]
+            subscription.keys = keys
+        if not rows and not removed:
+            return
+
+        event = {"event": "rows", "height": height, "rows": rows, "removed": removed, "truncated": truncated}
+        if not subscription.push(event):
+            self.stats["dropped"] += 1
+            self.unsubscribe(subscription)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.subscriptions:
+                    height = await self._covered_height()
+                    if height > self.height:
+                        self.height = height
+                        behind = [s for s in self.subscriptions.values() if s.height < height]
+                        await asyncio.gather(*(self._evaluate(s, height) for s in behind))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Subscription watcher error: {str(e)}")
+            await asyncio.sleep(settings.subscription_poll_seconds)
+
+    def start(self):
+        """Start watching the indexed tip in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in list(self.subscriptions.values()):
+            subscription.push({"event": "error", "error": "Server is shutting down"})
+        self.subscriptions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "height": self.height,
+            "active": len(self.subscriptions),
+            "subscriptions": [
+                {
+                    "id": subscription.id,
+                    "mode": subscription.mode,
+                    "height": subscription.height,
+                    "pushed": subscription.pushed,
+                    "queued": subscription.events.qsize(),
+                    "sql": subscription.sql
+                }
+                for subscription in self.subscriptions.values()
+            ]
+        }
+
+
+# Global subscription manager instance
+subscription_manager = SubscriptionManager()
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from prometheus_client import Counter, Histogram
+from ..config import get_settings
+
+settings = get_settings()
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_SECONDS = Histogram(
+    "nlq_request_seconds", "End-to-end request latency", ["route", "status"], buckets=_LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "nlq_stage_seconds", "Latency of each request stage", ["stage"], buckets=_LATENCY_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    "nlq_llm_seconds", "Language model completion latency", ["purpose"], buckets=_LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "nlq_llm_tokens", "Language model tokens per completion", ["purpose", "direction"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+POOL_WAIT_SECONDS = Histogram(
+    "nlq_pool_wait_seconds", "Time waiting for a pooled connection", ["lane"], buckets=_LATENCY_BUCKETS
+)
+DB_SECONDS = Histogram(
+    "nlq_db_seconds", "Query execution time in Postgres", ["lane"], buckets=_LATENCY_BUCKETS
+)
+ROWS_RETURNED = Histogram(
+    "nlq_rows_returned", "Rows returned per query", ["source"],
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 10000, 100000)
+)
+RESPONSE_BYTES = Histogram(
+    "nlq_response_bytes", "Serialized response size", ["route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+SLOW_REQUESTS = Counter("nlq_slow_requests_total", "Requests slower than slow_request_ms", ["route"])
+
+# Stage timings of the current request, in milliseconds
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("timings", default=None)
+# Statements executed for the current request
+_queries: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("queries", default=None)
+# When the handler of the current request returned
+_handler_done: ContextVar[Optional[List[float]]] = ContextVar("handler_done", default=None)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of a stage, for the metrics and the current request's Server-Timing"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def observe_llm(purpose: str, seconds: float, usage: Any):
+    """Record a completion's latency and token usage"""
+    LLM_SECONDS.labels(purpose).observe(seconds)
+    observe_stage(f"llm_{purpose}", seconds)
+    if usage is not None:
+        LLM_TOKENS.labels(purpose, "in").observe(usage.prompt_tokens)
+        LLM_TOKENS.labels(purpose, "out").observe(usage.completion_tokens)
+
+
+def observe_query(lane: str, query: str, params: Optional[List[Any]], pool_wait: float, execution: float):
+    """Record one statement's pool wait and execution time"""
+    POOL_WAIT_SECONDS.labels(lane).observe(pool_wait)
+    DB_SECONDS.labels(lane).observe(execution)
+    observe_stage("pool_wait", pool_wait)
+    observe_stage("db", execution)
+    queries = _queries.get()
+    if queries is not None:
+        queries.append({"sql": query, "params": list(params or []), "lane": lane, "db_ms": round(execution * 1000, 3)})
+
+
+def observe_rows(source: str, count: int):
+    ROWS_RETURNED.labels(source).observe(count)
+
+
+def handler_done():
+    """Mark the end of the handler; the time until the response is ready counts as serialization"""
+    done = _handler_done.get()
+    if done is not None and not done:
+        done.append(time.perf_counter())
+
+
+class RequestTimer:
+    """Collect the stage timings of one request"""
+
+    def __init__(self, route_of: Callable[[], str]):
+        self._route_of = route_of
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.queries: List[Dict[str, Any]] = []
+        self._done: List[float] = []
+        _timings.set(self.timings)
+        _queries.set(self.queries)
+        _handler_done.set(self._done)
+
+    def finish(self, status: int, size: Optional[int]) -> Dict[str, Any]:
+        """
+        Close the request's timings and record its metrics
+
+        Returns:
+            Summary of the request: route, status, total and per-stage milliseconds
+        """
+        now = time.perf_counter()
+        if self._done:
+            observe_stage("serialize", now - self._done[0])
+        total = now - self.started
+        route = self._route_of()
+        REQUEST_SECONDS.labels(route, str(status)).observe(total)
+        if size is not None:
+            RESPONSE_BYTES.labels(route).observe(size)
+        return {"route": route, "status": status, "total_ms": round(total * 1000, 3), "timings": self.timings}
+
+    def server_timing(self, total_ms: float) -> str:
+        """Server-Timing header value with every stage and the total"""
+        entries = [f"{stage};dur={ms:.1f}" for stage, ms in self.timings.items()]
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+
+class SlowRequestLog:
+    """
+    Ring buffer of the slowest recent requests
+
+    Requests over slow_request_ms are kept with their stage timings and SQL.
+    When slow_request_explain is set, each statement is run again under
+    EXPLAIN ANALYZE in the background, one at a time, and the plan is added
+    to the entry. At most one request is explained per
+    slow_request_explain_interval_seconds, so a burst of slow requests
+    doesn't double the load that made them slow.
+    """
+
+    def __init__(self):
+        self._entries: deque = deque(maxlen=settings.slow_request_log_size)
+        self._explain_lock = asyncio.Lock()
+        self._explained_at: Optional[float] = None
+        self._tasks: set = set()
+
+    def capture(
+        self,
+        summary: Dict[str, Any],
+        queries: List[Dict[str, Any]],
+        explain: Callable[[str, List[Any]], Awaitable[Any]]
+    ):
+        SLOW_REQUESTS.labels(summary["route"]).inc()
+        entry = {"at": time.time(), **summary, "queries": queries}
+        self._entries.append(entry)
+        if settings.slow_request_explain and queries and self._explain_due():
+            task = asyncio.create_task(self._explain(queries, explain))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _explain_due(self) -> bool:
+        """Claim the next EXPLAIN ANALYZE if none is running and the interval has passed"""
+        now = time.monotonic()
+        if self._explain_lock.locked():
+            return False
+        if self._explained_at is not None and now - self._explained_at < settings.slow_request_explain_interval_seconds:
+            return False
+        self._explained_at = now
+        return True
+
+    async def _explain(self, queries: List[Dict[str, Any]], explain: Callable[[str, List[Any]], Awaitable[Any]]):
+        async with self._explain_lock:
+            for query in queries:
+                try:
+                    query["explain_analyze"] = await explain(query["sql"], query["params"])
+                except Exception as e:
+                    query["explain_analyze_error"] = str(e)
+
+    def get_entries(self) -> List[Dict[str, Any]]:
+        return [
+            {**entry, "queries": [{**query, "params": [str(param) for param in query["params"]]} for query in entry["queries"]]}
+            for entry in reversed(self._entries)
+        ]
+
+
+# Global slow request log instance
+slow_requests = SlowRequestLog()
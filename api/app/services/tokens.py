@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
+from ..config import get_settings
+from .database import db
+
+settings = get_settings()
+
+# Native tokens, always known even before the tokens table has been read
+ZNN_STANDARD = "zts1znnxxxxxxxxxxxxx9z4ulx"
+QSR_STANDARD = "zts1qsrxxxxxxxxxxxxxmrhjll"
+
+NATIVE_TOKENS = [
+    {"tokenstandard": ZNN_STANDARD, "symbol": "ZNN", "name": "Zenon", "decimals": 8, "holdercount": 0},
+    {"tokenstandard": QSR_STANDARD, "symbol": "QSR", "name": "Quasar", "decimals": 8, "holdercount": 0},
+]
+
+
+class TokenRegistry:
+    """
+    In-memory view of the tokens table for resolving symbols and standards
+
+    Symbols are not unique on NoM, so a symbol resolves to the native token if
+    there is one, otherwise to the token with the most holders.
+    """
+
+    def __init__(self):
+        self._by_standard: Dict[str, Dict[str, Any]] = {}
+        self._by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._index(NATIVE_TOKENS)
+
+    def _index(self, tokens: List[Dict[str, Any]]):
+        by_standard = {token["tokenstandard"]: token for token in NATIVE_TOKENS}
+        for token in tokens:
+            by_standard[token["tokenstandard"]] = token
+
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        for token in by_standard.values():
+            by_symbol.setdefault((token["symbol"] or "").upper(), []).append(token)
+        for candidates in by_symbol.values():
+            candidates.sort(key=lambda t: (
+                t["tokenstandard"] not in (ZNN_STANDARD, QSR_STANDARD),
+                -(t["holdercount"] or 0)
+            ))
+
+        self._by_standard = by_standard
+        self._by_symbol = by_symbol
+
+    async def refresh(self, force: bool = False):
+        """Reload the tokens table if the cached copy is older than token_registry_ttl_seconds"""
+        if not force and time.monotonic() - self._loaded_at < settings.token_registry_ttl_seconds:
+            return
+
+        async with self._lock:
+            if not force and time.monotonic() - self._loaded_at < settings.token_registry_ttl_seconds:
+                return
+            try:
+                async with db.pool.acquire() as connection:
+                    rows = await connection.fetch(
+                        "SELECT tokenstandard, symbol, name, decimals, holdercount FROM tokens"
+                    )
+                self._index([dict(row) for row in rows])
+            except Exception as e:
+                print(f"Token registry refresh failed: {str(e)}")
+            # Don't retry on every request while the database is unavailable
+            self._loaded_at = time.monotonic()
+
+    async def by_symbol(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Resolve a token symbol such as 'znn' to its token record"""
+        await self.refresh()
+        candidates = self._by_symbol.get(symbol.upper())
+        return candidates[0] if candidates else None
+
+    def by_standard(self, token_standard: str) -> Optional[Dict[str, Any]]:
+        """Look up an already loaded token record by its token standard"""
+        return self._by_standard.get(token_standard)
+
+
+# Global token registry instance
+token_registry = TokenRegistry()
@@ -0,0 +1,272 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from ..config import get_settings
+from ..utils.schema_context import SCHEMA_CONTEXT
+from .database import db
+
+settings = get_settings()
+
+# Bump when the prompt in QueryProcessor changes in a way that affects the output
+PROMPT_VERSION = "2"
+
+CACHE_TABLE = "nl_translation_cache"
+
+# Standalone number literals; digits inside addresses and token standards are left alone
+_NUMBER_PATTERN = re.compile(r'(?<![\w.])(\d+(?:,\d{3})*(?:\.\d+)?)(?!\w|\.\d)')
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s{}]")
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_question(question: str) -> Tuple[str, List[str]]:
+    """
+    Normalize a question into a template with number literals lifted into slots
+
+    Args:
+        question: Natural language question from user
+
+    Returns:
+        Tuple of (template, slot values)
+    """
+    slots: List[str] = []
+
+    def lift(match: re.Match) -> str:
+        slots.append(match.group(1).replace(",", ""))
+        return "{%d}" % (len(slots) - 1)
+
+    template = question.lower()
+    template = _NUMBER_PATTERN.sub(lift, template)
+    template = template.replace("'", "")
+    template = _PUNCTUATION_PATTERN.sub(" ", template)
+    template = _WHITESPACE_PATTERN.sub(" ", template).strip()
+    return template, slots
+
+
+def _literal_pattern(value: str) -> re.Pattern:
+    return re.compile(r'(?<![\w.])' + re.escape(value) + r'(?!\w|\.\d)')
+
+
+def _templatize(sql_query: str, explanation: str, slots: List[str]) -> Optional[Tuple[str, str]]:
+    """Replace slot values in the SQL with placeholders if each maps to exactly one literal"""
+    if not slots or len(set(slots)) != len(slots):
+        return None
+
+    sql_template = sql_query.replace("{", "{{").replace("}", "}}")
+    explanation_template = explanation.replace("{", "{{").replace("}", "}}")
+    for index, value in enumerate(slots):
+        pattern = _literal_pattern(value)
+        if len(pattern.findall(sql_template)) != 1:
+            return None
+        sql_template = pattern.sub("{%d}" % index, sql_template)
+        explanation_template = pattern.sub("{%d}" % index, explanation_template)
+    return sql_template, explanation_template
+
+
+class TranslationCache:
+    """
+    Two-tier cache of NL→SQL translations
+
+    The memory tier is a per-process LRU with TTL, the persistent tier is a table
+    in the indexer database shared by all workers. Entries are keyed on the
+    normalized question and a version derived from the schema context and the
+    models (the fast tier included), so changing any of them invalidates
+    everything cached before.
+    """
+
+    def __init__(self):
+        self.version = hashlib.sha256(
+            f"{PROMPT_VERSION}|{settings.openai_model}|{settings.openai_fast_model}|{SCHEMA_CONTEXT}".encode()
+        ).hexdigest()[:16]
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._persistent = False
+        self.stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0
+        }
+
+    async def initialize(self):
+        """Create the persistent table and drop entries from older versions"""
+        if not settings.translation_cache_enabled or not settings.translation_cache_persistent:
+            return
+
+        try:
+            async with db.pool.acquire() as connection:
+                await connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+                        cache_key TEXT PRIMARY KEY,
+                        version TEXT NOT NULL,
+                        sql_query TEXT NOT NULL,
+                        explanation TEXT NOT NULL,
+                        templated BOOL NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """)
+                await connection.execute(
+                    f"DELETE FROM {CACHE_TABLE} WHERE version <> $1", self.version
+                )
+            self._persistent = True
+        except Exception as e:
+            print(f"Translation cache: persistent tier disabled ({str(e)})")
+
+    def _keys(self, template: str, slots: List[str]) -> Tuple[str, str]:
+        template_key = hashlib.sha256(f"{self.version}|{template}".encode()).hexdigest()
+        exact_key = hashlib.sha256(
+            f"{self.version}|{template}|{','.join(slots)}".encode()
+        ).hexdigest()
+        return template_key, exact_key
+
+    @staticmethod
+    def _render(entry: Dict[str, Any], slots: List[str]) -> Tuple[str, str]:
+        if not entry["templated"]:
+            return entry["sql_query"], entry["explanation"]
+        return entry["sql_query"].format(*slots), entry["explanation"].format(*slots)
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, entry = item
+        if time.monotonic() - stored_at > settings.translation_cache_ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key: str, entry: Dict[str, Any]):
+        self._entries[key] = (time.monotonic(), entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.translation_cache_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, question: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up a cached translation
+
+        Args:
+            question: Natural language question from user
+
+        Returns:
+            Tuple of (sql_query, explanation) or None on a miss
+        """
+        if not settings.translation_cache_enabled:
+            return None
+
+        template, slots = normalize_question(question)
+        template_key, exact_key = self._keys(template, slots)
+
+        for key in (template_key, exact_key):
+            entry = self._memory_get(key)
+            if entry is not None and (entry["templated"] or key == exact_key):
+                self.stats["memory_hits"] += 1
+                return self._render(entry, slots)
+
+        if self._persistent:
+            try:
+                async with db.pool.acquire() as connection:
+                    rows = await connection.fetch(
+                        f"""
+                        SELECT cache_key, sql_query, explanation, templated
+                        FROM {CACHE_TABLE}
+                        WHERE cache_key = ANY($1::text[]) AND version = $2
+                            AND created_at > now() - make_interval(secs => $3)
+                        """,
+                        [template_key, exact_key],
+                        self.version,
+                        float(settings.translation_cache_ttl_seconds)
+                    )
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Translation cache lookup error: {str(e)}")
+                rows = []
+
+            for row in sorted(rows, key=lambda r: r["cache_key"] != template_key):
+                entry = {
+                    "sql_query": row["sql_query"],
+                    "explanation": row["explanation"],
+                    "templated": row["templated"]
+                }
+                if entry["templated"] or row["cache_key"] == exact_key:
+                    self._memory_put(row["cache_key"], entry)
+                    self.stats["persistent_hits"] += 1
+                    return self._render(entry, slots)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, question: str, sql_query: str, explanation: str):
+        """
+        Store a validated translation
+
+        Args:
+            question: Natural language question from user
+            sql_query: Validated SQL generated for the question
+            explanation: Explanation of the SQL
+        """
+        if not settings.translation_cache_enabled:
+            return
+
+        template, slots = normalize_question(question)
+        template_key, exact_key = self._keys(template, slots)
+
+        templated = _templatize(sql_query, explanation, slots)
+        if templated is not None:
+            key = template_key
+            entry = {"sql_query": templated[0], "explanation": templated[1], "templated": True}
+        else:
+            key = exact_key
+            entry = {"sql_query": sql_query, "explanation": explanation, "templated": False}
+
+        self._memory_put(key, entry)
+        self.stats["stores"] += 1
+
+        if self._persistent:
+            try:
+                async with db.pool.acquire() as connection:
+                    await connection.execute(
+                        f"""
+                        INSERT INTO {CACHE_TABLE}
+                            (cache_key, version, sql_query, explanation, templated)
+                        VALUES ($1, $2, $3, $4, $5)
+                        ON CONFLICT (cache_key) DO UPDATE SET
+                            sql_query = EXCLUDED.sql_query,
+                            explanation = EXCLUDED.explanation,
+                            templated = EXCLUDED.templated,
+                            created_at = now()
+                        """,
+                        key, self.version, entry["sql_query"], entry["explanation"], entry["templated"]
+                    )
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Translation cache store error: {str(e)}")
+
+    async def purge(self) -> int:
+        """Remove every cached translation from both tiers and return how many were removed"""
+        removed = len(self._entries)
+        self._entries.clear()
+
+        if self._persistent:
+            async with db.pool.acquire() as connection:
+                result = await connection.execute(f"DELETE FROM {CACHE_TABLE}")
+            removed = max(removed, int(result.split()[-1]))
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes"""
+        lookups = self.stats["memory_hits"] + self.stats["persistent_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "persistent": self._persistent,
+            "version": self.version
+        }
+
+
+# Global translation cache instance
+translation_cache = TranslationCache()
@@ -0,0 +1,84 @@
+import re
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
+from ..config import get_settings
+from .result_cache import normalize_sql
+
+settings = get_settings()
+
+
+def sql_literal(value: Any) -> str:
+    """Render a bind parameter as a SQL literal"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return "'" + value.isoformat() + "'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def inline_params(query: str, params: Optional[List[Any]]) -> str:
+    """Replace $n placeholders with the literal values of their parameters"""
+    if not params:
+        return query
+    return re.sub(r'\$(\d+)', lambda match: sql_literal(params[int(match.group(1)) - 1]), query)
+
+
+class WorkloadRecorder:
+    """
+    Bounded record of executed statements and their runtimes
+
+    Statements are stored with their parameters inlined, so they can be
+    explained again later. Counters not yet persisted by the index advisor
+    are kept separately until it takes them.
+    """
+
+    def __init__(self):
+        self._statements: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Set by the index advisor once it can persist the workload
+        self.persistent = False
+
+    def record(self, query: str, params: Optional[List[Any]], elapsed_ms: float):
+        """
+        Record one execution of a statement
+
+        Args:
+            query: SQL query that was executed
+            params: Its bind parameters
+            elapsed_ms: Measured runtime
+        """
+        if not settings.index_advisor_enabled:
+            return
+
+        sql = inline_params(query, params)
+        key = normalize_sql(sql)
+        targets = [self._statements]
+        if self.persistent and (key in self._pending or len(self._pending) < settings.index_advisor_workload_size):
+            targets.append(self._pending)
+        for entries in targets:
+            entry = entries.setdefault(key, {"query": sql, "calls": 0, "total_ms": 0.0})
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+
+        self._statements.move_to_end(key)
+        while len(self._statements) > settings.index_advisor_workload_size:
+            self._statements.popitem(last=False)
+
+    def take_pending(self) -> Dict[str, Dict[str, Any]]:
+        """Return and clear the counters recorded since the last call"""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """The statements with the most total runtime"""
+        return sorted(self._statements.values(), key=lambda entry: -entry["total_ms"])[:limit]
+
+
+# Global workload recorder instance
+workload = WorkloadRecorder()
@@ -176,6 +176,33 @@ DATABASE SCHEMA:
     - tokenstandard (TEXT): Token received (lowercase!)
     - sourceaddress (TEXT): Source contract address (lowercase!)
 
+15. dailytransactions - Rollup: number of transactions per day (UTC)
+    - day (DATE PRIMARY KEY): Calendar day
+    - transactioncount (BIGINT): Number of account blocks in momentums of that day
+
+16. dailytokenvolume - Rollup: transfer count and volume per token per day (UTC)
+    - day (DATE): Calendar day
+    - tokenstandard (TEXT): Token identifier
+    - transfercount (BIGINT): Number of account blocks with a non-zero amount of the token
+    - volume (NUMERIC): Sum of transferred amounts (in smallest unit)
+    - PRIMARY KEY(day, tokenstandard)
+
+17. dailyrewards - Rollup: rewards received per address per reward type per day (UTC)
+    - day (DATE): Calendar day
+    - address (TEXT): Recipient address
+    - rewardtype (SMALLINT): Type of reward (same values as rewardtransactions)
+    - tokenstandard (TEXT): Token received
+    - rewardcount (BIGINT): Number of reward transactions
+    - amount (NUMERIC): Total reward amount (in smallest unit)
+    - PRIMARY KEY(day, address, rewardtype, tokenstandard)
+
+18. epochpillarproduction - Rollup: momentums produced per pillar per epoch
+    - epoch (BIGINT): Epoch number (24 hour periods since the genesis momentum)
+    - producerowner (TEXT): Owner address of the producing pillar
+    - producername (TEXT): Name of the producing pillar
+    - momentumcount (BIGINT): Momentums produced in the epoch
+    - PRIMARY KEY(epoch, producerowner)
+
 IMPORTANT NOTES:
 - Token Standards: 
   - ZNN: 'zts1znnxxxxxxxxxxxxx9z4ulx'
@@ -193,6 +220,11 @@ IMPORTANT NOTES:
   - 3 = Sentinel rewards (paid in ZNN/QSR)
   - 4 = Pillar rewards (paid in ZNN)
 
+- Rollup tables (dailytransactions, dailytokenvolume, dailyrewards, epochpillarproduction)
+  are pre-aggregated and much faster than scanning accountblocks, rewardtransactions or
+  momentums. Use them for per-day or per-epoch counts and totals. They trail the newest
+  momentums by a few minutes at most.
+
 QUERY GUIDELINES:
 - Use lowercase table names
 - Join tables appropriately based on relationships
@@ -281,6 +313,66 @@ SELECT
     MAX(to_timestamp(momentumtimestamp / 1000)) as newest_transaction
 FROM accountblocks
 WHERE momentumtimestamp > (EXTRACT(EPOCH FROM NOW() - INTERVAL '30 days') * 1000);
+"""
+    },
+    {
+        "question": "How many transactions were there per day in the last 14 days?",
+        "sql": """
+SELECT 
+    day,
+    transactioncount
+FROM dailytransactions
+WHERE day > CURRENT_DATE - 14
+ORDER BY day DESC;
+"""
+    },
+    {
+        "question": "What was the daily ZNN volume this month?",
+        "sql": """
+SELECT 
+    day,
+    transfercount,
+    volume / 100000000.0 as znn_volume
+FROM dailytokenvolume
+WHERE tokenstandard = 'zts1znnxxxxxxxxxxxxx9z4ulx'
+    AND day >= date_trunc('month', CURRENT_DATE)
+ORDER BY day;
+"""
+    },
+    {
+        "question": "Which addresses received the most staking rewards in the last 7 days?",
+        "sql": """
+SELECT 
+    address,
+    SUM(amount) / 100000000.0 as qsr_rewards
+FROM dailyrewards
+WHERE rewardtype = 0
+    AND day > CURRENT_DATE - 7
+GROUP BY address
+ORDER BY qsr_rewards DESC
+LIMIT 10;
 """
     }
-]
\ No newline at end of file
+]
+
+# Tables commonly joined with each table, so retrieved schema context stays joinable
+JOIN_PARTNERS = {
+    "momentums": ["accountblocks"],
+    "accountblocks": ["accounts", "tokens", "momentums"],
+    "accounts": ["balances", "pillars"],
+    "balances": ["accounts", "tokens"],
+    "tokens": ["balances"],
+    "pillars": ["accounts", "momentums"],
+    "sentinels": [],
+    "stakes": ["accounts"],
+    "projects": ["projectphases", "votes"],
+    "projectphases": ["projects", "votes"],
+    "votes": ["projects", "projectphases", "pillars"],
+    "fusions": ["accounts"],
+    "cumulativerewards": ["accounts", "tokens"],
+    "rewardtransactions": ["accounts", "tokens"],
+    "dailytransactions": [],
+    "dailytokenvolume": ["tokens"],
+    "dailyrewards": ["accounts", "tokens"],
+    "epochpillarproduction": ["pillars"],
+}
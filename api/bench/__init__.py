@@ -0,0 +1,7 @@
+"""
+Offline end-to-end benchmark for the query API
+
+    python -m bench.synthetic_data --accountblocks 10000000
+    python -m bench.stub_llm --latency-ms 800
+    python -m bench.load --concurrency 16 --requests 2000 --output run.json
+"""
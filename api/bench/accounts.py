@@ -0,0 +1,24 @@
+import hashlib
+from typing import List
+import numpy as np
+
+# Shared by the data generator and the load driver, which must agree on the
+# addresses of a chain generated with the same seed
+
+_BECH32 = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+
+def bech32_string(seed: str, length: int) -> str:
+    digest = hashlib.sha512(seed.encode()).digest()
+    return "".join(_BECH32[byte % 32] for byte in digest[:length])
+
+
+def addresses(seed: int, count: int, kind: str = "account") -> List[str]:
+    """The synthetic chain's addresses, identical for the same seed"""
+    return ["z1" + bech32_string(f"{seed}:{kind}:{index}", 38) for index in range(count)]
+
+
+def zipf_weights(count: int, skew: float) -> np.ndarray:
+    """Probabilities proportional to 1 / rank^skew"""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
@@ -0,0 +1,192 @@
+"""
+Replay the benchmark question mix against POST /api/v1/query
+
+Questions are drawn from the weighted mix and filled with addresses and
+values of the synthetic chain (same --seed and --accounts as the data
+generator). A fixed number of workers keep one request in flight each. The
+report has latency percentiles, throughput, and a per-stage breakdown read
+from the API's Server-Timing headers; --output saves it as JSON and
+--baseline prints the change against an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+import numpy as np
+from .questions import QUESTIONS
+from .accounts import addresses, zipf_weights
+
+TOKENS = ["ZNN", "QSR"]
+
+
+class QuestionMix:
+    """Weighted, seeded stream of questions with their placeholders filled"""
+
+    def __init__(self, seed: int, accounts: int, address_skew: float):
+        self.rng = np.random.default_rng(seed + 1)
+        self.addresses = addresses(seed, accounts)
+        self.address_weights = zipf_weights(accounts, address_skew)
+        weights = np.array([entry["weight"] for entry in QUESTIONS], dtype=np.float64)
+        self.weights = weights / weights.sum()
+
+    def next(self) -> str:
+        entry = QUESTIONS[self.rng.choice(len(QUESTIONS), p=self.weights)]
+        values = {
+            "address": self.addresses[self.rng.choice(len(self.addresses), p=self.address_weights)],
+            "token": TOKENS[int(self.rng.integers(len(TOKENS)))],
+            "limit": int(self.rng.choice([5, 10, 20, 50])),
+            "days": int(self.rng.choice([1, 7, 14, 30])),
+            "amount": int(self.rng.choice([100, 1000, 10000])),
+        }
+        return entry["question"].format(**values)
+
+
+def _server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, rest = entry.strip().partition(";")
+        if rest.startswith("dur="):
+            stages[name] = float(rest[4:])
+    return stages
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    array = np.array(values)
+    return {
+        "mean": round(float(array.mean()), 2),
+        "p50": round(float(np.percentile(array, 50)), 2),
+        "p95": round(float(np.percentile(array, 95)), 2),
+        "p99": round(float(np.percentile(array, 99)), 2),
+        "max": round(float(array.max()), 2),
+    }
+
+
+async def _worker(client: httpx.AsyncClient, mix: QuestionMix, remaining: List[int], samples: List[Dict[str, Any]]):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        question = mix.next()
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/query", json={"question": question})
+            status = response.status_code
+            timings = _server_timing(response.headers.get("server-timing"))
+            error = response.json().get("error") if status == 200 else response.text[:200]
+        except httpx.HTTPError as e:
+            status, timings, error = 0, {}, str(e)
+        samples.append({
+            "question": question,
+            "status": status,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "timings": timings,
+            "error": error,
+        })
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = QuestionMix(args.seed, args.accounts, args.address_skew)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            await _worker(client, mix, [args.warmup], [])
+
+        samples: List[Dict[str, Any]] = []
+        remaining = [args.requests]
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker(client, mix, remaining, samples) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    succeeded = [sample for sample in samples if sample["status"] == 200 and not sample["error"]]
+    stages: Dict[str, List[float]] = {}
+    for sample in succeeded:
+        for stage, duration in sample["timings"].items():
+            stages.setdefault(stage, []).append(duration)
+
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+
+    return {
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "baseline")
+        },
+        "environment": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _commit(),
+            "python": platform.python_version(),
+        },
+        "requests": len(samples),
+        "errors": len(samples) - len(succeeded),
+        "statuses": statuses,
+        "duration_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _percentiles([sample["latency_ms"] for sample in succeeded]),
+        "stages_ms": {stage: _percentiles(values) for stage, values in sorted(stages.items())},
+        "sample_errors": [sample for sample in samples if sample["error"]][:10],
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _change(current: float, baseline: Optional[float]) -> str:
+    if not baseline:
+        return ""
+    return f" ({(current - baseline) / baseline:+.1%})"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    previous = baseline or {}
+    print(
+        f"{report['requests']} requests, {report['errors']} errors, "
+        f"{report['requests_per_second']} req/s{_change(report['requests_per_second'], previous.get('requests_per_second'))}"
+    )
+    latency = report["latency_ms"]
+    for key in ("p50", "p95", "p99"):
+        if key in latency:
+            print(f"  {key}: {latency[key]:.1f} ms{_change(latency[key], previous.get('latency_ms', {}).get(key))}")
+    print("Stages (mean / p95 ms):")
+    for stage, values in report["stages_ms"].items():
+        before = previous.get("stages_ms", {}).get(stage, {}).get("mean")
+        print(f"  {stage:<18} {values['mean']:>9.1f} / {values['p95']:>9.1f}{_change(values['mean'], before)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.load", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests to measure")
+    parser.add_argument("--warmup", type=int, default=0, help="Requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Seed the synthetic data was generated with")
+    parser.add_argument("--accounts", type=int, default=100_000, help="Accounts the synthetic data was generated with")
+    parser.add_argument("--address-skew", type=float, default=1.1)
+    parser.add_argument("--output", help="Save the report as JSON")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# The question mix replayed by the load driver. Placeholders are filled with
+# values from the synthetic chain; the stub LLM answers each question with its
+# SQL, filled with the same values. Weights are relative frequencies.
+QUESTIONS: List[Dict[str, Any]] = [
+    {
+        "question": "Show the last {limit} transactions sent by {address}",
+        "sql": """
+SELECT hash, toaddress, amount, tokenstandard, to_timestamp(momentumtimestamp / 1000) AS time
+FROM accountblocks
+WHERE address = '{address}'
+ORDER BY momentumheight DESC
+LIMIT {limit}
+""",
+        "weight": 20,
+    },
+    {
+        "question": "What is the {token} balance of {address}?",
+        "sql": """
+SELECT b.balance / POWER(10, t.decimals) AS balance
+FROM balances b
+JOIN tokens t ON t.tokenstandard = b.tokenstandard
+WHERE b.address = '{address}' AND t.symbol = '{token}'
+""",
+        "weight": 15,
+    },
+    {
+        "question": "Show me all transactions over {amount} ZNN in the last {days} days",
+        "sql": """
+SELECT ab.hash, ab.address AS sender, ab.toaddress AS receiver, ab.amount / 100000000.0 AS znn_amount
+FROM accountblocks ab
+WHERE ab.tokenstandard = 'zts1znnxxxxxxxxxxxxx9z4ulx'
+    AND ab.amount / 100000000.0 > {amount}
+    AND to_timestamp(ab.momentumtimestamp / 1000) > NOW() - INTERVAL '{days} days'
+ORDER BY ab.momentumtimestamp DESC
+""",
+        "weight": 10,
+    },
+    {
+        "question": "What are the top {limit} accounts by {token} balance?",
+        "sql": """
+SELECT b.address, b.balance / POWER(10, t.decimals) AS balance
+FROM balances b
+JOIN tokens t ON t.tokenstandard = b.tokenstandard
+WHERE t.symbol = '{token}'
+ORDER BY b.balance DESC
+LIMIT {limit}
+""",
+        "weight": 10,
+    },
+    {
+        "question": "How many transactions were there per day in the last {days} days?",
+        "sql": """
+SELECT (to_timestamp(momentumtimestamp / 1000) AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS transactions
+FROM accountblocks
+WHERE momentumtimestamp > EXTRACT(EPOCH FROM NOW() - INTERVAL '{days} days') * 1000
+GROUP BY 1
+ORDER BY 1 DESC
+""",
+        "weight": 8,
+    },
+    {
+        "question": "Which addresses received the most staking rewards in the last {days} days?",
+        "sql": """
+SELECT address, SUM(amount) / 100000000.0 AS qsr_rewards
+FROM rewardtransactions
+WHERE rewardtype = 0
+    AND momentumtimestamp > EXTRACT(EPOCH FROM NOW() - INTERVAL '{days} days') * 1000
+GROUP BY address
+ORDER BY qsr_rewards DESC
+LIMIT 10
+""",
+        "weight": 6,
+    },
+    {
+        "question": "List all active pillars with their voting activity",
+        "sql": """
+SELECT name, owneraddress, votingactivity, weight / 100000000.0 AS weight_znn, producedmomentumcount
+FROM pillars
+WHERE isrevoked = false
+ORDER BY rank ASC
+""",
+        "weight": 6,
+    },
+    {
+        "question": "Which pillar produced the most momentums in the last {days} days?",
+        "sql": """
+SELECT producername, COUNT(*) AS momentums
+FROM momentums
+WHERE timestamp > EXTRACT(EPOCH FROM NOW() - INTERVAL '{days} days') * 1000
+GROUP BY producername
+ORDER BY momentums DESC
+LIMIT 10
+""",
+        "weight": 5,
+    },
+    {
+        "question": "Show the active plasma fusions of {address}",
+        "sql": """
+SELECT id, beneficiary, qsramount / 100000000.0 AS qsr, expirationheight
+FROM fusions
+WHERE address = '{address}' AND isactive = true
+ORDER BY momentumheight DESC
+""",
+        "weight": 5,
+    },
+    {
+        "question": "Show the active stakes of {address}",
+        "sql": """
+SELECT id, znnamount / 100000000.0 AS znn, to_timestamp(expirationtimestamp / 1000) AS expires
+FROM stakes
+WHERE address = '{address}' AND isactive = true
+ORDER BY starttimestamp DESC
+""",
+        "weight": 5,
+    },
+    {
+        "question": "Show top {limit} most active non-contract accounts",
+        "sql": """
+SELECT address, blockcount AS transaction_count
+FROM accounts
+WHERE address NOT LIKE 'z1qxemdeddedx%'
+ORDER BY blockcount DESC
+LIMIT {limit}
+""",
+        "weight": 5,
+    },
+    {
+        "question": "How did pillars vote on Accelerator-Z projects created in the last {days} days?",
+        "sql": """
+SELECT p.name AS project, v.vote, COUNT(*) AS votes
+FROM projects p
+JOIN votes v ON v.projectid = p.id
+WHERE p.creationtimestamp > EXTRACT(EPOCH FROM NOW() - INTERVAL '{days} days') * 1000
+GROUP BY p.name, v.vote
+ORDER BY p.name, v.vote
+""",
+        "weight": 5,
+    },
+]
+
+EXPLANATION = "This query retrieves data based on your request."
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def _pattern(question: str) -> re.Pattern:
+    parts = _PLACEHOLDER.split(question)
+    regex = ""
+    for index, part in enumerate(parts):
+        regex += re.escape(part) if index % 2 == 0 else rf"(?P<{part}>.+?)"
+    return re.compile(regex + r"\??$", re.IGNORECASE)
+
+
+_PATTERNS = [(_pattern(entry["question"].rstrip("?")), entry) for entry in QUESTIONS]
+
+
+def answer(question: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """
+    Find the SQL for a question from the mix
+
+    Returns:
+        Tuple of (SQL with the question's values filled in, the values), or None
+    """
+    question = question.strip()
+    for pattern, entry in _PATTERNS:
+        match = pattern.match(question)
+        if match:
+            values = match.groupdict()
+            return entry["sql"].strip().format(**values), values
+    return None
@@ -0,0 +1,135 @@
+"""
+OpenAI-compatible stub server with configurable latency and canned SQL
+
+Point the API at it with OPENAI_BASE_URL=http://localhost:8100/v1. SQL
+requests are answered from the benchmark's question mix; explanation
+requests get a fixed sentence.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Dict
+from fastapi import FastAPI, HTTPException
+import uvicorn
+from .questions import EXPLANATION, answer
+
+app = FastAPI(title="Stub LLM")
+
+config = {
+    "latency_ms": 800.0,
+    "jitter_ms": 200.0,
+    "tokens_per_second": 0.0,
+    "slow_rate": 0.0,
+    "slow_ms": 10000.0,
+    "error_rate": 0.0,
+    "invalid_models": [],
+}
+stats = {"requests": 0, "unknown": 0, "slow": 0, "errors": 0, "invalid": 0}
+
+_SQL_PREFIX = "Convert this to SQL:"
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Dict[str, Any]):
+    messages = request.get("messages") or []
+    if not messages:
+        raise HTTPException(status_code=400, detail="messages is required")
+    stats["requests"] += 1
+    if random.random() < config["error_rate"]:
+        stats["errors"] += 1
+        raise HTTPException(status_code=503, detail="Simulated overload")
+
+    prompt = messages[-1].get("content", "")
+    if prompt.startswith(_SQL_PREFIX) and request.get("model") in config["invalid_models"]:
+        # A weak model answering with prose instead of SQL
+        stats["invalid"] += 1
+        content = "Here is the query you asked for."
+    elif prompt.startswith(_SQL_PREFIX):
+        answered = answer(prompt[len(_SQL_PREFIX):])
+        if answered is None:
+            stats["unknown"] += 1
+            content = "SELECT 1 AS unknown_question"
+        else:
+            content = answered[0]
+    else:
+        content = EXPLANATION
+
+    completion_tokens = _tokens(content)
+    latency = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+    if config["tokens_per_second"] > 0:
+        latency += completion_tokens / config["tokens_per_second"] * 1000
+    if random.random() < config["slow_rate"]:
+        # The occasional straggler that hedging is meant to cut off
+        stats["slow"] += 1
+        latency += config["slow_ms"]
+    await asyncio.sleep(max(latency, 0.0) / 1000)
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {
+            "prompt_tokens": sum(_tokens(message.get("content", "")) for message in messages),
+            "completion_tokens": completion_tokens,
+            "total_tokens": sum(_tokens(message.get("content", "")) for message in messages) + completion_tokens
+        }
+    }
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "bench"}]}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**config, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.stub_llm")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mean completion latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Uniform jitter around the mean")
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=0.0,
+        help="Add generation time per completion token (0 disables)"
+    )
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of completions that are stragglers")
+    parser.add_argument("--slow-ms", type=float, default=10000.0, help="Extra latency of a straggler")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument(
+        "--invalid-model", action="append", default=[],
+        help="Model that answers SQL requests with prose, to exercise escalation (repeatable)"
+    )
+    args = parser.parse_args()
+
+    config.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        invalid_models=args.invalid_model
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
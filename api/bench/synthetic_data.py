@@ -0,0 +1,478 @@
+"""
+Fill the indexer schema with a synthetic chain
+
+The tables are created from the column types in schema_context.py, with the
+indexer's primary keys and indexes. Momentums are 10 seconds apart and end
+at the current time; activity grows linearly over the chain's history.
+Senders, receivers and reward recipients follow a Zipf distribution over
+the accounts and most transfers are ZNN or QSR, so a few hot addresses and
+tokens dominate as they do on the real chain. Values are deterministic for
+a given --seed.
+"""
+import argparse
+import asyncio
+import base64
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+import asyncpg
+import numpy as np
+from app.config import get_settings
+from app.services.sql_rewriter import COLUMN_TYPES
+from app.services.tokens import ZNN_STANDARD, QSR_STANDARD
+from .accounts import addresses, bech32_string, zipf_weights
+
+settings = get_settings()
+
+TABLES = [
+    "momentums", "accountblocks", "accounts", "balances", "tokens", "pillars", "sentinels",
+    "stakes", "projects", "projectphases", "votes", "fusions", "cumulativerewards", "rewardtransactions",
+]
+
+PRIMARY_KEYS = {
+    "momentums": "height",
+    "accountblocks": "hash",
+    "accounts": "address",
+    "tokens": "tokenstandard",
+    "pillars": "owneraddress",
+    "sentinels": "owner",
+    "stakes": "id",
+    "projects": "id",
+    "projectphases": "id",
+    "votes": "id",
+    "fusions": "id",
+    "cumulativerewards": "id",
+    "rewardtransactions": "hash",
+}
+
+# Same as the indexer creates
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS balances_address_token_idx ON balances (address, tokenstandard)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cumulativerewards_address_type_token_idx "
+    "ON cumulativerewards (address, rewardtype, tokenstandard)",
+    "CREATE INDEX IF NOT EXISTS accountblocks_momentum_idx ON accountblocks (momentumheight)",
+    "CREATE INDEX IF NOT EXISTS rewardtransactions_momentum_idx ON rewardtransactions (momentumheight)",
+    "CREATE INDEX IF NOT EXISTS accountblocks_address_momentum_idx ON accountblocks (address, momentumheight, hash)",
+    "CREATE INDEX IF NOT EXISTS accountblocks_toaddress_momentum_idx ON accountblocks (toaddress, momentumheight, hash)",
+    "CREATE INDEX IF NOT EXISTS momentums_hash_idx ON momentums (hash)",
+    "CREATE INDEX IF NOT EXISTS fusions_address_momentum_idx ON fusions (address, momentumheight, id)",
+    "CREATE INDEX IF NOT EXISTS stakes_address_start_idx ON stakes (address, starttimestamp, id)",
+]
+
+MOMENTUM_INTERVAL_MS = 10_000
+MOMENTUMS_PER_DAY = 8640
+
+CONTRACTS = {
+    "pillar": "z1qxemdeddedxpyllarxxxxxxxxxxxxxxxsy3fmg",
+    "plasma": "z1qxemdeddedxplasmaxxxxxxxxxxxxxxxxsctrp",
+    "token": "z1qxemdeddedxt0kenxxxxxxxxxxxxxxxxh9amk0",
+    "stake": "z1qxemdeddedxstakexxxxxxxxxxxxxxxxjv8v62",
+    "sentinel": "z1qxemdeddedxsentynelxxxxxxxxxxxxxwy0r2r",
+    "accelerator": "z1qxemdeddedxaccelerat0rxxxxxxxxxxp4tk22",
+    "liquidity": "z1qxemdeddedxlyquydytyxxxxxxxxxxxxflaaae",
+}
+CONTRACT_METHODS = {
+    "pillar": ["Delegate", "Undelegate", "CollectReward"],
+    "plasma": ["Fuse", "CancelFuse"],
+    "token": ["IssueToken", "Mint", "Burn"],
+    "stake": ["Stake", "Cancel", "CollectReward"],
+    "sentinel": ["Register", "CollectReward"],
+    "accelerator": ["VoteByName", "CreateProject"],
+    "liquidity": ["CollectReward"],
+}
+
+# Reward type: (probability, paying contract)
+REWARD_TYPES = [(0.45, "stake"), (0.35, "pillar"), (0.02, "liquidity"), (0.08, "sentinel"), (0.10, "pillar")]
+
+
+def _hashes(rng: np.random.Generator, count: int) -> List[str]:
+    data = rng.bytes(32 * count).hex()
+    return [data[index * 64:(index + 1) * 64] for index in range(count)]
+
+
+def _sql_type(kind: str) -> str:
+    return {"BOOL": "BOOLEAN"}.get(kind, kind)
+
+
+def _schema() -> List[str]:
+    statements = []
+    for table in TABLES:
+        columns = [
+            f"{column} {_sql_type(kind)}" + (" PRIMARY KEY" if PRIMARY_KEYS.get(table) == column else "")
+            for column, kind in COLUMN_TYPES[table].items()
+        ]
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+    return statements + INDEXES
+
+
+class ChainGenerator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.now = int(time.time() * 1000)
+        self.genesis = self.now - args.momentums * MOMENTUM_INTERVAL_MS
+        self.addresses = addresses(args.seed, args.accounts)
+        self.weights = zipf_weights(args.accounts, args.address_skew)
+        self.block_counts = np.zeros(args.accounts, dtype=np.int64)
+
+        self.tokens = self._tokens()
+        self.token_weights = np.array([0.55, 0.35] + list(0.10 * zipf_weights(len(self.tokens) - 2, 1.2)))
+        self.token_transactions = np.zeros(len(self.tokens), dtype=np.int64)
+
+        # Pillars are owned by some of the most active accounts
+        self.pillar_owners = [self.addresses[index * 3] for index in range(args.pillars)]
+        self.pillar_names = [f"Pillar{index:03d}" for index in range(args.pillars)]
+        self.pillar_producers = addresses(args.seed, args.pillars, "producer")
+        self.pillar_weights = zipf_weights(args.pillars, 0.6)
+        self.produced = np.zeros(args.pillars, dtype=np.int64)
+
+    def _timestamp(self, heights: np.ndarray) -> np.ndarray:
+        return self.genesis + heights.astype(np.int64) * MOMENTUM_INTERVAL_MS
+
+    def _tokens(self) -> List[Dict[str, Any]]:
+        tokens = [
+            {"tokenstandard": ZNN_STANDARD, "name": "Zenon", "symbol": "ZNN", "decimals": 8},
+            {"tokenstandard": QSR_STANDARD, "name": "Quasar", "symbol": "QSR", "decimals": 8},
+        ]
+        decimals = [0, 2, 6, 8, 8, 8, 18]
+        for index in range(self.args.tokens):
+            tokens.append({
+                "tokenstandard": "zts1" + bech32_string(f"{self.args.seed}:token:{index}", 22),
+                "name": f"Token {index}",
+                "symbol": f"TK{index}",
+                "decimals": decimals[index % len(decimals)],
+            })
+        return tokens
+
+    def _block_counts_per_momentum(self) -> np.ndarray:
+        # Activity grows linearly over the chain's history
+        heights = np.arange(1, self.args.momentums + 1, dtype=np.float64)
+        expected = self.args.accountblocks * heights / heights.sum()
+        return self.rng.poisson(expected)
+
+    def momentums_and_blocks(self) -> Iterator[Tuple[List[tuple], List[tuple]]]:
+        """Yield (momentums, accountblocks) rows in batches of about batch_size blocks"""
+        counts = self._block_counts_per_momentum()
+        cumulative = np.cumsum(counts)
+        contract_names = list(CONTRACTS)
+        start = 0
+        while start < len(counts):
+            # Take momentums until the batch holds about batch_size blocks
+            done = int(cumulative[start - 1]) if start else 0
+            end = min(int(np.searchsorted(cumulative, done + self.args.batch_size)) + 1, len(counts))
+            heights = np.arange(start + 1, end + 1, dtype=np.int64)
+            batch_counts = counts[start:end]
+            start = end
+
+            momentum_hashes = _hashes(self.rng, len(heights))
+            producers = self.rng.choice(self.args.pillars, size=len(heights), p=self.pillar_weights)
+            np.add.at(self.produced, producers, 1)
+            momentum_rows = [
+                (int(height), momentum_hash, int(timestamp), int(count),
+                 self.pillar_producers[producer], self.pillar_owners[producer], self.pillar_names[producer])
+                for height, momentum_hash, timestamp, count, producer in zip(
+                    heights, momentum_hashes, self._timestamp(heights), batch_counts, producers
+                )
+            ]
+
+            size = int(batch_counts.sum())
+            if size == 0:
+                yield momentum_rows, []
+                continue
+            block_heights = np.repeat(heights, batch_counts)
+            offsets = np.repeat(np.arange(len(heights)), batch_counts)
+            senders = self.rng.choice(self.args.accounts, size=size, p=self.weights)
+            receivers = self.rng.choice(self.args.accounts, size=size, p=self.weights)
+            token_indexes = self.rng.choice(len(self.tokens), size=size, p=self.token_weights)
+            # 2 = user send, 3 = user receive, 4 = contract send, 5 = contract receive
+            block_types = self.rng.choice([2, 3, 4, 5], size=size, p=[0.5, 0.35, 0.1, 0.05])
+            contracts = self.rng.choice(len(contract_names), size=size)
+            amounts = (self.rng.lognormal(mean=3.0, sigma=2.5, size=size) * 10 ** 8).astype(np.int64)
+            amounts[block_types == 3] = 0
+
+            # Account heights continue from the previous batches
+            order = np.argsort(senders, kind="stable")
+            sorted_senders = senders[order]
+            first = np.searchsorted(sorted_senders, sorted_senders, side="left")
+            rank = np.empty(size, dtype=np.int64)
+            rank[order] = np.arange(size) - first
+            account_heights = self.block_counts[senders] + rank + 1
+            np.add.at(self.block_counts, senders, 1)
+            np.add.at(self.token_transactions, token_indexes, 1)
+
+            hashes = _hashes(self.rng, size)
+            standards = [token["tokenstandard"] for token in self.tokens]
+            rows = []
+            for index, (offset, timestamp, height, block_type, account_height, sender, receiver, amount,
+                        token, contract) in enumerate(zip(
+                            offsets.tolist(), self._timestamp(block_heights).tolist(), block_heights.tolist(),
+                            block_types.tolist(), account_heights.tolist(), senders.tolist(), receivers.tolist(),
+                            amounts.tolist(), token_indexes.tolist(), contracts.tolist()
+                        )):
+                to_address = self.addresses[receiver]
+                method = ""
+                if block_type == 4:
+                    contract_name = contract_names[contract]
+                    to_address = CONTRACTS[contract_name]
+                    methods = CONTRACT_METHODS[contract_name]
+                    method = methods[index % len(methods)]
+                rows.append((
+                    hashes[index], momentum_hashes[offset], timestamp, height, block_type, account_height,
+                    self.addresses[sender], to_address, amount, standards[token], "", method,
+                    "{}" if method else None, "", ""
+                ))
+            yield momentum_rows, rows
+
+    def reward_transactions(self) -> Iterator[List[tuple]]:
+        """Yield reward rows in batches, and total them per address, type and token"""
+        self.reward_totals: Dict[Tuple[int, int, int], int] = {}
+        probabilities = [probability for probability, _ in REWARD_TYPES]
+        remaining = self.args.rewards
+        while remaining > 0:
+            size = min(remaining, self.args.batch_size)
+            remaining -= size
+            heights = np.sort(self.rng.integers(1, self.args.momentums + 1, size=size))
+            recipients = self.rng.choice(self.args.accounts, size=size, p=self.weights)
+            reward_types = self.rng.choice(len(REWARD_TYPES), size=size, p=probabilities)
+            amounts = (self.rng.lognormal(mean=1.0, sigma=1.5, size=size) * 10 ** 8).astype(np.int64)
+            # Staking pays QSR, delegation and pillar rewards pay ZNN, the others either
+            qsr = (reward_types == 0) | (((reward_types == 2) | (reward_types == 3)) & (self.rng.random(size) < 0.5))
+            hashes = _hashes(self.rng, size)
+            timestamps = self._timestamp(heights)
+            rows = []
+            for index in range(size):
+                reward_type = int(reward_types[index])
+                token = 1 if qsr[index] else 0
+                key = (int(recipients[index]), reward_type, token)
+                self.reward_totals[key] = self.reward_totals.get(key, 0) + int(amounts[index])
+                rows.append((
+                    hashes[index], self.addresses[recipients[index]], reward_type, int(timestamps[index]),
+                    int(heights[index]), int(self.block_counts[recipients[index]]) + index % 7, int(amounts[index]),
+                    self.tokens[token]["tokenstandard"], CONTRACTS[REWARD_TYPES[reward_type][1]]
+                ))
+            yield rows
+
+    def cumulative_rewards(self) -> List[tuple]:
+        return [
+            (index + 1, self.addresses[address], reward_type, amount, self.tokens[token]["tokenstandard"])
+            for index, ((address, reward_type, token), amount) in enumerate(sorted(self.reward_totals.items()))
+        ]
+
+    def accounts(self) -> List[tuple]:
+        delegating = self.rng.random(self.args.accounts) < 0.3
+        pillars = self.rng.choice(self.args.pillars, size=self.args.accounts, p=self.pillar_weights)
+        since = self.rng.integers(self.genesis, self.now, size=self.args.accounts)
+        keys = self.rng.bytes(32 * self.args.accounts)
+        return [
+            (
+                address, int(self.block_counts[index]),
+                base64.b64encode(keys[index * 32:(index + 1) * 32]).decode(),
+                self.pillar_names[pillars[index]] if delegating[index] else "",
+                int(since[index]) if delegating[index] else 0
+            )
+            for index, address in enumerate(self.addresses)
+        ] + [(address, 0, "", "", 0) for address in CONTRACTS.values()]
+
+    def balances(self) -> List[tuple]:
+        rows = []
+        self.holders = np.zeros(len(self.tokens), dtype=np.int64)
+        # Balances follow activity: the hottest accounts hold the most
+        scale = self.weights / self.weights[0]
+        znn = (self.rng.lognormal(2.0, 1.5, self.args.accounts) * (1 + 100 * scale) * 10 ** 8).astype(np.int64)
+        qsr = (self.rng.lognormal(3.0, 1.5, self.args.accounts) * (1 + 100 * scale) * 10 ** 8).astype(np.int64)
+        others = self.rng.choice(np.arange(2, len(self.tokens)), size=self.args.accounts)
+        holds_other = self.rng.random(self.args.accounts) < 0.1
+        for index, address in enumerate(self.addresses):
+            rows.append((address, ZNN_STANDARD, int(znn[index])))
+            rows.append((address, QSR_STANDARD, int(qsr[index])))
+            if holds_other[index] and len(self.tokens) > 2:
+                token = self.tokens[others[index]]
+                rows.append((address, token["tokenstandard"], int(self.rng.integers(1, 10 ** 6)) * 10 ** min(token["decimals"], 8)))
+                self.holders[others[index]] += 1
+        self.holders[0] = self.holders[1] = self.args.accounts
+        self.supply = {ZNN_STANDARD: int(znn.sum()), QSR_STANDARD: int(qsr.sum())}
+        return rows
+
+    def token_rows(self) -> List[tuple]:
+        rows = []
+        for index, token in enumerate(self.tokens):
+            native = index < 2
+            supply = self.supply[token["tokenstandard"]] if native else int(10 ** 9 * 10 ** min(token["decimals"], 8))
+            rows.append((
+                token["tokenstandard"], token["name"], token["symbol"], "" if native else f"token{index}.example",
+                token["decimals"], CONTRACTS["token"] if native else self.addresses[index + 10],
+                supply, supply * 2, True, native or index % 2 == 0, native,
+                0, self.now, int(self.holders[index]), int(self.token_transactions[index])
+            ))
+        return rows
+
+    def pillars(self) -> List[tuple]:
+        weights = (self.pillar_weights * 50_000_000 * 10 ** 8).astype(np.int64)
+        expected = MOMENTUMS_PER_DAY // max(self.args.pillars, 1)
+        return [
+            (
+                owner, self.pillar_producers[index], owner, self.pillar_names[index], index, 0, 100 - index % 50,
+                index % 4 == 0, 0, 0, int(weights[index]),
+                min(int(expected * self.pillar_weights[index] * self.args.pillars), 32767), min(expected, 32767),
+                150_000 * 10 ** 8, self.genesis, float(self.rng.uniform(0.3, 1.0)), int(self.produced[index]),
+                False
+            )
+            for index, owner in enumerate(self.pillar_owners)
+        ]
+
+    def sentinels(self) -> List[tuple]:
+        owners = addresses(self.args.seed, self.args.sentinels, "sentinel")
+        registered = self.rng.integers(self.genesis, self.now, size=len(owners))
+        return [
+            (owner, int(registered[index]), index % 3 == 0, str(int(self.rng.integers(0, 7 * 86400))), index % 10 != 0)
+            for index, owner in enumerate(owners)
+        ]
+
+    def stakes(self) -> List[tuple]:
+        count = self.args.accounts // 10
+        owners = self.rng.choice(self.args.accounts, size=count, p=self.weights)
+        months = self.rng.integers(1, 13, size=count)
+        starts = self.rng.integers(self.genesis, self.now, size=count)
+        amounts = (self.rng.lognormal(4.0, 1.5, count) * 10 ** 8).astype(np.int64) + 10 ** 8
+        hashes = _hashes(self.rng, count)
+        rows = []
+        for index in range(count):
+            duration = int(months[index]) * 30 * 86400
+            expiration = int(starts[index]) + duration * 1000
+            rows.append((
+                hashes[index], self.addresses[owners[index]], int(starts[index]), expiration,
+                int(amounts[index]), duration, expiration > self.now, ""
+            ))
+        return rows
+
+    def fusions(self) -> List[tuple]:
+        count = self.args.accounts // 5
+        owners = self.rng.choice(self.args.accounts, size=count, p=self.weights)
+        beneficiaries = np.where(
+            self.rng.random(count) < 0.7, owners, self.rng.choice(self.args.accounts, size=count, p=self.weights)
+        )
+        heights = self.rng.integers(1, self.args.momentums + 1, size=count)
+        amounts = (self.rng.integers(1, 100, size=count) * 10 * 10 ** 8).astype(np.int64)
+        hashes = _hashes(self.rng, count * 2)
+        timestamps = self._timestamp(heights)
+        return [
+            (
+                hashes[index], self.addresses[owners[index]], self.addresses[beneficiaries[index]],
+                hashes[count + index], int(timestamps[index]), int(heights[index]), int(amounts[index]),
+                int(heights[index]) + 10 * 360, bool(self.rng.random() < 0.8), ""
+            )
+            for index in range(count)
+        ]
+
+    def projects_phases_and_votes(self) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        projects, phases, votes = [], [], []
+        hashes = _hashes(self.rng, self.args.projects * 8)
+        vote_id = 1
+        for index in range(self.args.projects):
+            project_id, voting_id = hashes[index * 8], hashes[index * 8 + 1]
+            height = int(self.rng.integers(1, self.args.momentums + 1))
+            created = int(self._timestamp(np.array([height]))[0])
+            status = int(self.rng.choice([0, 1, 3, 4], p=[0.2, 0.5, 0.2, 0.1]))
+            project_votes = []
+            for pillar, owner in enumerate(self.pillar_owners):
+                if self.rng.random() < 0.7:
+                    vote = int(self.rng.choice([0, 1, 2], p=[0.2, 0.7, 0.1]))
+                    project_votes.append(vote)
+                    vote_height = min(height + int(self.rng.integers(1, MOMENTUMS_PER_DAY * 14)), self.args.momentums)
+                    votes.append((
+                        vote_id, hashes[index * 8 + 2], int(self._timestamp(np.array([vote_height]))[0]), vote_height,
+                        owner, project_id, "", voting_id, vote
+                    ))
+                    vote_id += 1
+            yes, no = project_votes.count(1), project_votes.count(0)
+            projects.append((
+                project_id, voting_id, self.addresses[int(self.rng.choice(self.args.accounts, p=self.weights))],
+                f"Project {index}", f"Synthetic project {index}", f"https://example.com/projects/{index}",
+                int(self.rng.integers(1, 5000)) * 10 ** 8, int(self.rng.integers(1, 50000)) * 10 ** 8,
+                created, created, status, yes, no, len(project_votes)
+            ))
+            if status == 1:
+                for phase in range(int(self.rng.integers(1, 4))):
+                    phases.append((
+                        hashes[index * 8 + 3 + phase], project_id, hashes[index * 8 + 6], f"Phase {phase + 1}",
+                        f"Phase {phase + 1} of project {index}", f"https://example.com/projects/{index}/{phase}",
+                        int(self.rng.integers(1, 1000)) * 10 ** 8, int(self.rng.integers(1, 10000)) * 10 ** 8,
+                        created, created, int(self.rng.choice([0, 1, 2])), 0, 0, 0
+                    ))
+        return projects, phases, votes
+
+
+async def _copy(connection: asyncpg.Connection, table: str, rows: List[tuple]):
+    if rows:
+        await connection.copy_records_to_table(table, records=rows, columns=list(COLUMN_TYPES[table]))
+
+
+async def generate(args: argparse.Namespace):
+    generator = ChainGenerator(args)
+    connection = await asyncpg.connect(args.dsn)
+    try:
+        if args.reset:
+            await connection.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)} CASCADE")
+        for statement in _schema():
+            await connection.execute(statement)
+        existing = await connection.fetchval("SELECT COUNT(*) FROM momentums")
+        if existing:
+            raise SystemExit(f"momentums already holds {existing} rows; use --reset to replace the data")
+
+        started = time.perf_counter()
+        blocks = 0
+        for momentum_rows, block_rows in generator.momentums_and_blocks():
+            await _copy(connection, "momentums", momentum_rows)
+            await _copy(connection, "accountblocks", block_rows)
+            blocks += len(block_rows)
+            print(f"accountblocks: {blocks} rows ({blocks / (time.perf_counter() - started):.0f}/s)")
+
+        for rows in generator.reward_transactions():
+            await _copy(connection, "rewardtransactions", rows)
+        await _copy(connection, "cumulativerewards", generator.cumulative_rewards())
+        await _copy(connection, "accounts", generator.accounts())
+        await _copy(connection, "balances", generator.balances())
+        await _copy(connection, "tokens", generator.token_rows())
+        await _copy(connection, "pillars", generator.pillars())
+        await _copy(connection, "sentinels", generator.sentinels())
+        await _copy(connection, "stakes", generator.stakes())
+        await _copy(connection, "fusions", generator.fusions())
+        projects, phases, votes = generator.projects_phases_and_votes()
+        await _copy(connection, "projects", projects)
+        await _copy(connection, "projectphases", phases)
+        await _copy(connection, "votes", votes)
+        await connection.execute("SELECT setval(pg_get_serial_sequence('votes', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM votes), false)")
+        await connection.execute(
+            "SELECT setval(pg_get_serial_sequence('cumulativerewards', 'id'), "
+            "(SELECT COALESCE(MAX(id), 0) + 1 FROM cumulativerewards), false)"
+        )
+
+        print("Analyzing tables")
+        await connection.execute(f"ANALYZE {', '.join(TABLES)}")
+        print(f"Generated {blocks} account blocks in {time.perf_counter() - started:.0f}s")
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.synthetic_data", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dsn", default=settings.database_url, help="Database to fill (default: DATABASE_URL)")
+    parser.add_argument("--accountblocks", type=int, default=1_000_000)
+    parser.add_argument("--momentums", type=int, default=MOMENTUMS_PER_DAY * 90, help="Chain length (10 s apart)")
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--rewards", type=int, default=None, help="Reward transactions (default: accountblocks / 5)")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens besides ZNN and QSR")
+    parser.add_argument("--pillars", type=int, default=60)
+    parser.add_argument("--sentinels", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--address-skew", type=float, default=1.1, help="Zipf exponent of account activity")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per COPY")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate the tables first")
+    args = parser.parse_args()
+    if args.rewards is None:
+        args.rewards = args.accountblocks // 5
+    asyncio.run(generate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -126,6 +126,23 @@ class DatabaseService {
     ]);
     await _conn.execute(
         'CREATE UNIQUE INDEX ON ${Table.cumulativeRewards} (address, rewardType, tokenStandard)');
+    // Keyset pagination and rollup maintenance indexes for the API
+    await Future.wait([
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS accountblocks_momentum_idx ON ${Table.accountBlocks} (momentumHeight)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS rewardtransactions_momentum_idx ON ${Table.rewardTransactions} (momentumHeight)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS accountblocks_address_momentum_idx ON ${Table.accountBlocks} (address, momentumHeight, hash)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS accountblocks_toaddress_momentum_idx ON ${Table.accountBlocks} (toAddress, momentumHeight, hash)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS momentums_hash_idx ON ${Table.momentums} (hash)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS fusions_address_momentum_idx ON ${Table.fusions} (address, momentumHeight, id)'),
+      _conn.execute(
+          'CREATE INDEX IF NOT EXISTS stakes_address_start_idx ON ${Table.stakes} (address, startTimestamp, id)'),
+    ]);
     print('Connected to database');
   }
 